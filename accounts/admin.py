@@ -4,19 +4,22 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
 from django.contrib.admin.sites import NotRegistered
 from django.contrib.auth.password_validation import validate_password
-from django.core.mail import send_mail
 from django.db import transaction
 from django.http import HttpRequest
 from django.utils import timezone
 
+from .jobs import enqueue
 from .models import (
     ArticulationCard,
     ArticulationCardImage,
+    BackgroundJob,
     ChildProfile,
     ColoringPage,
+    GameFeatureState,
     GameResult,
     MyStoryEntry,
     MyStoryImage,
+    PredictionSnapshot,
     SpecialistActivity,
     SpecialistActivityStep,
     SentenceExercise,
@@ -26,6 +29,7 @@ from .models import (
     SpecialistStudentNote,
     Story,
     StoryListen,
+    UserActivityCounters,
     UserBadge,
     WordPuzzleWord,
 )
@@ -100,7 +104,7 @@ class SpecialistInviteAdmin(admin.ModelAdmin):
 
     @admin.action(description='Send invite email')
     def send_invite_email(self, request, queryset):
-        sent = 0
+        queued = 0
         failed = 0
 
         for inv in queryset:
@@ -109,27 +113,16 @@ class SpecialistInviteAdmin(admin.ModelAdmin):
                 continue
 
             invite_url = request.build_absolute_uri(f"/register/specialist/?invite={inv.token}")
-            subject = 'Запрошення для реєстрації спеціаліста — IncludoLand'
-            body = (
-                'Вітаємо!\n\n'
-                'Вас запросили зареєструватися як спеціаліст у IncludoLand.\n'
-                'Перейдіть за посиланням (одноразове):\n'
-                f"{invite_url}\n\n"
-                'Якщо ви не очікували цього листа — просто проігноруйте його.\n'
-            )
-
-            try:
-                send_mail(subject, body, None, [inv.email], fail_silently=False)
-                sent += 1
-            except Exception:
-                failed += 1
+            # Delivered by `manage.py run_worker`; SMTP errors are retried there.
+            enqueue('invites.send_email', {'invite_id': inv.id, 'invite_url': invite_url})
+            queued += 1
 
-        if sent:
-            self.message_user(request, f"Sent {sent} invite(s).", level=messages.SUCCESS)
+        if queued:
+            self.message_user(request, f"Queued {queued} invite email(s).", level=messages.SUCCESS)
         if failed:
             self.message_user(
                 request,
-                f"Failed to send {failed} invite(s). Check email settings.",
+                f"Skipped {failed} invite(s) without an email address.",
                 level=messages.WARNING,
             )
 
@@ -403,6 +396,29 @@ class UserBadgeAdmin(admin.ModelAdmin):
     list_select_related = ('user',)
 
 
+@admin.register(UserActivityCounters)
+class UserActivityCountersAdmin(admin.ModelAdmin):
+    list_display = ('user', 'games_total', 'story_listens', 'stories_listened', 'updated_at')
+    search_fields = ('user__username', 'user__email')
+    list_select_related = ('user',)
+
+
+@admin.register(GameFeatureState)
+class GameFeatureStateAdmin(admin.ModelAdmin):
+    list_display = ('user', 'game_type', 'attempts_count', 'first_attempt_at', 'updated_at')
+    list_filter = ('game_type',)
+    search_fields = ('user__username', 'user__email')
+    list_select_related = ('user',)
+
+
+@admin.register(PredictionSnapshot)
+class PredictionSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('user', 'game_type', 'predicted_score', 'confidence', 'analysis_mode', 'model_version', 'computed_at')
+    list_filter = ('game_type', 'analysis_mode')
+    search_fields = ('user__username', 'user__email')
+    list_select_related = ('user',)
+
+
 @admin.register(WordPuzzleWord)
 class WordPuzzleWordAdmin(admin.ModelAdmin):
     list_display = ('word', 'emoji', 'created_by', 'is_active', 'created_at', 'updated_at')
@@ -438,3 +454,21 @@ class ColoringPageAdmin(admin.ModelAdmin):
     list_filter = ('file_type', 'is_active')
     search_fields = ('title', 'created_by__username', 'created_by__email')
     list_select_related = ('created_by',)
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'max_attempts', 'run_after', 'locked_by', 'updated_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'last_error')
+    readonly_fields = ('locked_at', 'locked_by', 'last_error', 'result', 'created_at', 'updated_at')
+    actions = ['retry_now']
+
+    @admin.action(description='Retry selected jobs now')
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=BackgroundJob.Status.RUNNING).update(
+            status=BackgroundJob.Status.QUEUED,
+            attempts=0,
+            run_after=timezone.now(),
+        )
+        self.message_user(request, f"Queued {updated} job(s).", level=messages.SUCCESS)
@@ -5,3 +5,9 @@ class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
     verbose_name = 'Облікові записи'
+
+    def ready(self):
+        from . import tasks  # noqa: F401  (registers background job handlers)
+        from .media import connect_media_signals
+
+        connect_media_signals(self)
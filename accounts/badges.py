@@ -0,0 +1,215 @@
+from .counters import get_activity_counters
+from .models import GameResult, UserBadge
+
+
+# Each badge is unlocked once the user's `metric` count reaches `threshold`.
+# `metric` is either 'games' (optionally narrowed to `game_type`) or 'stories'
+# (distinct stories listened). Add new badges here, not as code in the views.
+BADGE_DEFINITIONS = [
+    {
+        'code': 'first_game',
+        'title': 'Старт',
+        'subtitle': 'Перша зіграна гра',
+        'tone': 'red',
+        'icon': 'target',
+        'metric': 'games',
+        'game_type': None,
+        'threshold': 1,
+    },
+    {
+        'code': 'math_5',
+        'title': 'Математик',
+        'subtitle': '5 ігор з математики',
+        'tone': 'orange',
+        'icon': 'calc',
+        'metric': 'games',
+        'game_type': GameResult.GameType.MATH,
+        'threshold': 5,
+    },
+    {
+        'code': 'memory_5',
+        'title': "Памʼять",
+        'subtitle': '5 ігор на памʼять',
+        'tone': 'teal',
+        'icon': 'compass',
+        'metric': 'games',
+        'game_type': GameResult.GameType.MEMORY,
+        'threshold': 5,
+    },
+    {
+        'code': 'words_5',
+        'title': 'Слова',
+        'subtitle': '5 ігор зі словами',
+        'tone': 'green',
+        'icon': 'book',
+        'metric': 'games',
+        'game_type': GameResult.GameType.WORDS,
+        'threshold': 5,
+    },
+    {
+        'code': 'sound_5',
+        'title': 'Слухач',
+        'subtitle': '5 ігор зі звуками',
+        'tone': 'yellow',
+        'icon': 'target',
+        'metric': 'games',
+        'game_type': GameResult.GameType.SOUND,
+        'threshold': 5,
+    },
+    {
+        'code': 'articulation_5',
+        'title': 'Артикулятор',
+        'subtitle': '5 вправ з артикуляційної гімнастики',
+        'tone': 'teal',
+        'icon': 'mouth',
+        'metric': 'games',
+        'game_type': GameResult.GameType.ARTICULATION,
+        'threshold': 5,
+    },
+    {
+        'code': 'stories_3',
+        'title': 'Казкар',
+        'subtitle': 'Прослухав 3 різні казки',
+        'tone': 'blue',
+        'icon': 'book',
+        'metric': 'stories',
+        'game_type': None,
+        'threshold': 3,
+    },
+    {
+        'code': 'sentences_5',
+        'title': 'Будівничий речень',
+        'subtitle': '5 ігор з реченнями',
+        'tone': 'purple',
+        'icon': 'book',
+        'metric': 'games',
+        'game_type': GameResult.GameType.SENTENCES,
+        'threshold': 5,
+    },
+    {
+        'code': 'math_20',
+        'title': 'Супер математик',
+        'subtitle': '20 ігор з математики',
+        'tone': 'orange',
+        'icon': 'calc',
+        'metric': 'games',
+        'game_type': GameResult.GameType.MATH,
+        'threshold': 20,
+    },
+    {
+        'code': 'memory_20',
+        'title': 'Мега памʼять',
+        'subtitle': '20 ігор на памʼять',
+        'tone': 'teal',
+        'icon': 'compass',
+        'metric': 'games',
+        'game_type': GameResult.GameType.MEMORY,
+        'threshold': 20,
+    },
+    {
+        'code': 'words_20',
+        'title': 'Майстер слів',
+        'subtitle': '20 ігор зі словами',
+        'tone': 'green',
+        'icon': 'book',
+        'metric': 'games',
+        'game_type': GameResult.GameType.WORDS,
+        'threshold': 20,
+    },
+    {
+        'code': 'sound_20',
+        'title': 'Майстер звуків',
+        'subtitle': '20 ігор зі звуками',
+        'tone': 'yellow',
+        'icon': 'target',
+        'metric': 'games',
+        'game_type': GameResult.GameType.SOUND,
+        'threshold': 20,
+    },
+    {
+        'code': 'articulation_20',
+        'title': 'Майстер артикуляції',
+        'subtitle': '20 вправ з артикуляційної гімнастики',
+        'tone': 'teal',
+        'icon': 'mouth',
+        'metric': 'games',
+        'game_type': GameResult.GameType.ARTICULATION,
+        'threshold': 20,
+    },
+    {
+        'code': 'stories_10',
+        'title': 'Книжковий герой',
+        'subtitle': 'Прослухав 10 різних казок',
+        'tone': 'blue',
+        'icon': 'book',
+        'metric': 'stories',
+        'game_type': None,
+        'threshold': 10,
+    },
+    {
+        'code': 'all_games_25',
+        'title': 'Чемпіон',
+        'subtitle': '25 зіграних ігор',
+        'tone': 'red',
+        'icon': 'target',
+        'metric': 'games',
+        'game_type': None,
+        'threshold': 25,
+    },
+]
+
+
+def _badge_metrics_for_user(user) -> dict:
+    """Read the counters the badge rules need from the user's activity counters row."""
+    counters = get_activity_counters(user)
+    return {
+        'games': {game_type: counters.played(game_type) for game_type in GameResult.GameType.values},
+        'games_total': counters.games_total,
+        'stories': counters.stories_listened,
+    }
+
+
+def _rule_value(definition: dict, values: dict) -> int:
+    metric = definition['metric']
+    if metric == 'games':
+        game_type = definition.get('game_type')
+        if game_type is None:
+            return values['games_total']
+        return values['games'].get(game_type, 0)
+    return values[metric]
+
+
+def badge_codes_for_user(user) -> set:
+    return set(UserBadge.objects.filter(user=user).values_list('code', flat=True))
+
+
+def sync_badges(user, metrics=None) -> set:
+    """
+    Award every badge whose threshold the user has crossed.
+
+    `metrics` limits evaluation to rules of those metrics (e.g. {'games'} after
+    a game result). Counts come from UserActivityCounters, so the cost does not
+    grow with the user's history. Returns every badge code the user holds afterwards.
+    """
+    if metrics is None:
+        metrics = {d['metric'] for d in BADGE_DEFINITIONS}
+    rules = [d for d in BADGE_DEFINITIONS if d['metric'] in metrics]
+    if not rules:
+        return badge_codes_for_user(user)
+
+    values = _badge_metrics_for_user(user)
+    unlocked = badge_codes_for_user(user)
+
+    new_codes = [
+        d['code']
+        for d in rules
+        if d['code'] not in unlocked and _rule_value(d, values) >= d['threshold']
+    ]
+    if new_codes:
+        UserBadge.objects.bulk_create(
+            [UserBadge(user=user, code=code) for code in new_codes],
+            ignore_conflicts=True,
+        )
+        unlocked.update(new_codes)
+
+    return unlocked
@@ -0,0 +1,124 @@
+from django.db.models import Count, F, Sum
+
+from .models import GameResult, StoryListen, UserActivityCounters
+
+
+def _counter_values_from_history(user_ids=None) -> dict:
+    """Aggregate GameResult / StoryListen history into counter field values per user."""
+    games = GameResult.objects.all()
+    listens = StoryListen.objects.all()
+    if user_ids is not None:
+        games = games.filter(user_id__in=user_ids)
+        listens = listens.filter(user_id__in=user_ids)
+
+    values: dict = {}
+
+    game_rows = (
+        games.values('user_id', 'game_type')
+        .annotate(played=Count('id'), score_sum=Sum('score'))
+        .order_by()
+    )
+    for r in game_rows:
+        row = values.setdefault(r['user_id'], {'games_total': 0})
+        if r['game_type'] not in GameResult.GameType.values:
+            continue
+        row[UserActivityCounters.played_field(r['game_type'])] = r['played']
+        row[UserActivityCounters.score_sum_field(r['game_type'])] = r['score_sum'] or 0
+        row['games_total'] += r['played']
+
+    listen_rows = (
+        listens.values('user_id')
+        .annotate(total=Count('id'), unique=Count('story_id', distinct=True))
+        .order_by()
+    )
+    for r in listen_rows:
+        row = values.setdefault(r['user_id'], {'games_total': 0})
+        row['story_listens'] = r['total']
+        row['stories_listened'] = r['unique']
+
+    return values
+
+
+def get_activity_counters(user) -> UserActivityCounters:
+    """
+    Return the user's counters row, seeding it from history on first use so
+    users with activity from before the table existed start with correct totals.
+    """
+    counters = UserActivityCounters.objects.filter(user=user).first()
+    if counters is not None:
+        return counters
+
+    defaults = _counter_values_from_history([user.pk]).get(user.pk, {})
+    counters, _created = UserActivityCounters.objects.get_or_create(user=user, defaults=defaults)
+    return counters
+
+
+def record_game_counters(user, game_type: str, score: int) -> None:
+    """
+    Count one stored game result. Call after the insert, inside its
+    transaction: a missing row is seeded from history, which already contains
+    the new result.
+    """
+    record_game_batch_counters(user, [(game_type, score)])
+
+
+def record_game_batch_counters(user, results) -> None:
+    """Count several stored (game_type, score) results with a single UPDATE."""
+    per_game: dict = {}
+    for game_type, score in results:
+        played, score_sum = per_game.get(game_type, (0, 0))
+        per_game[game_type] = (played + 1, score_sum + score)
+    if not per_game:
+        return
+
+    updates = {'games_total': F('games_total') + sum(played for played, _ in per_game.values())}
+    for game_type, (played, score_sum) in per_game.items():
+        played_field = UserActivityCounters.played_field(game_type)
+        score_sum_field = UserActivityCounters.score_sum_field(game_type)
+        updates[played_field] = F(played_field) + played
+        updates[score_sum_field] = F(score_sum_field) + score_sum
+
+    updated = UserActivityCounters.objects.filter(user=user).update(**updates)
+    if not updated:
+        get_activity_counters(user)
+
+
+def record_story_counters(user, first_time_for_story: bool) -> None:
+    """Count one stored story listen. Same calling contract as record_game_counters()."""
+    updates = {'story_listens': F('story_listens') + 1}
+    if first_time_for_story:
+        updates['stories_listened'] = F('stories_listened') + 1
+    updated = UserActivityCounters.objects.filter(user=user).update(**updates)
+    if not updated:
+        get_activity_counters(user)
+
+
+def rebuild_activity_counters(user_ids=None, batch_size: int = 500) -> int:
+    """Recompute counters from history (all users, or only `user_ids`). Returns rows written."""
+    values = _counter_values_from_history(user_ids)
+    if user_ids is not None:
+        for user_id in user_ids:
+            values.setdefault(user_id, {'games_total': 0})
+
+    field_names = [
+        f.name for f in UserActivityCounters._meta.concrete_fields
+        if f.name not in ('id', 'user', 'updated_at')
+    ]
+    rows = []
+    for user_id, fields in values.items():
+        row = UserActivityCounters(user_id=user_id)
+        for name in field_names:
+            setattr(row, name, fields.get(name, 0))
+        rows.append(row)
+
+    if user_ids is None:
+        UserActivityCounters.objects.exclude(user_id__in=list(values)).delete()
+
+    UserActivityCounters.objects.bulk_create(
+        rows,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=field_names + ['updated_at'],
+    )
+    return len(rows)
@@ -0,0 +1,338 @@
+"""
+Incremental ML feature store.
+
+extract_user_features() re-reads a user's whole history for a game type on every
+prediction. GameFeatureState keeps, per (user, game type), the last
+WINDOW_CAPACITY results already converted to feature values plus the attempt
+count and first attempt time. It is updated in the same transaction as every
+GameResult insert, so ProgressPredictor.predict() reads one row; a missing row
+is seeded from history on first use.
+
+The per-result parsing rules here are shared with ml_services.data_extractor so
+both paths see the same values.
+"""
+
+import json
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Dict, Optional, Tuple
+
+from django.db.models import Count, Max, Min
+from django.db.models.fields.json import KeyTextTransform
+
+from .models import GameFeatureState, GameResult
+
+
+GAME_DATA_COLUMNS = (
+    'user_id', 'game_type', 'score', 'duration_seconds', 'raw_score', 'max_score', 'max_streak', 'created_at',
+    'd_hints_used', 'd_attempts', 'd_successful_attempts', 'd_failed_attempts', 'd_max_streak',
+)
+
+# One-hot game type columns of the all-games model, in GameType declaration order.
+GAME_TYPE_FEATURES = [f'game_{value}' for value in GameResult.GameType.values]
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def to_int(value: Any, default: int) -> int:
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def to_non_negative_int(value: Any, default: int = 0) -> int:
+    try:
+        parsed = int(value)
+        return parsed if parsed >= 0 else default
+    except (TypeError, ValueError):
+        return default
+
+
+def encode_time_of_day(timestamp) -> int:
+    if timestamp is None:
+        return 1
+
+    hour = int(getattr(timestamp, 'hour', 12))
+    if 6 <= hour < 12:
+        return 0
+    if 12 <= hour < 18:
+        return 1
+    return 2
+
+
+def game_type_one_hot(game_type: Optional[str]) -> Dict[str, float]:
+    return {f'game_{value}': 1.0 if value == game_type else 0.0 for value in GameResult.GameType.values}
+
+
+def details_text(details: Optional[Dict[str, Any]], key: str) -> Optional[str]:
+    """What the database's details->>key returns, for rows that are not read back from it."""
+    value = (details or {}).get(key)
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def resolve_successful_and_streak(
+    score: Optional[int],
+    raw_score: Optional[int],
+    max_score: Optional[int],
+    max_streak: Optional[int],
+    d_successful: Optional[str],
+    d_streak: Optional[str],
+) -> Tuple[int, int]:
+    if d_successful is not None:
+        successful_attempts = to_non_negative_int(d_successful, 0)
+    elif raw_score is not None:
+        successful_attempts = to_non_negative_int(raw_score, 0)
+    elif max_score is not None and score is not None:
+        successful_attempts = to_non_negative_int(round(max_score * (score / 100.0)), 0)
+    else:
+        successful_attempts = 1 if int(score or 0) >= 70 else 0
+
+    streak = to_non_negative_int(max_streak, 0)
+    if streak == 0:
+        streak = to_non_negative_int(d_streak, 0)
+    return successful_attempts, streak
+
+
+def game_data_values(queryset):
+    """values_list() of GAME_DATA_COLUMNS; the details keys come back as text (->>)."""
+    return queryset.annotate(
+        d_hints_used=KeyTextTransform('hints_used', 'details'),
+        d_attempts=KeyTextTransform('attempts', 'details'),
+        d_successful_attempts=KeyTextTransform('successful_attempts', 'details'),
+        d_failed_attempts=KeyTextTransform('failed_attempts', 'details'),
+        d_max_streak=KeyTextTransform('max_streak', 'details'),
+    ).values_list(*GAME_DATA_COLUMNS)
+
+
+def _entry(score, duration, raw_score, max_score, max_streak, created_at, d_hints, d_successful, d_failed, d_streak) -> list:
+    """One GameFeatureState.recent item."""
+    successful_attempts, streak = resolve_successful_and_streak(
+        score, raw_score, max_score, max_streak, d_successful, d_streak,
+    )
+    return [
+        score,
+        duration or 0,
+        to_int(d_hints, 0),
+        successful_attempts,
+        to_non_negative_int(d_failed, 0),
+        streak,
+        encode_time_of_day(created_at),
+        (created_at - EPOCH) // MICROSECOND,
+    ]
+
+
+def _entry_from_values(row) -> list:
+    (_user_id, _game_type, score, duration, raw_score, max_score, max_streak, created_at,
+     d_hints, _d_attempts, d_successful, d_failed, d_streak) = row
+    return _entry(score, duration, raw_score, max_score, max_streak, created_at, d_hints, d_successful, d_failed, d_streak)
+
+
+def _entry_from_result(result: GameResult) -> list:
+    details = result.details
+    return _entry(
+        result.score,
+        result.duration_seconds,
+        result.raw_score,
+        result.max_score,
+        result.max_streak,
+        result.created_at,
+        details_text(details, 'hints_used'),
+        details_text(details, 'successful_attempts'),
+        details_text(details, 'failed_attempts'),
+        details_text(details, 'max_streak'),
+    )
+
+
+def _state_values_from_history(user_id: int, game_type: str) -> dict:
+    games = GameResult.objects.filter(user_id=user_id, game_type=game_type)
+    totals = games.aggregate(count=Count('id'), first=Min('created_at'), last_id=Max('id'))
+    rows = game_data_values(games.order_by('-created_at', '-id'))[:GameFeatureState.WINDOW_CAPACITY]
+    return {
+        'attempts_count': totals['count'],
+        'first_attempt_at': totals['first'],
+        'last_result_id': totals['last_id'] or 0,
+        'recent': [_entry_from_values(row) for row in reversed(list(rows))],
+    }
+
+
+def get_feature_state(user_id: int, game_type: str) -> GameFeatureState:
+    """The (user, game type) state row, seeded from history when it does not exist yet."""
+    state = GameFeatureState.objects.filter(user_id=user_id, game_type=game_type).first()
+    if state is not None:
+        return state
+    state, _created = GameFeatureState.objects.get_or_create(
+        user_id=user_id,
+        game_type=game_type,
+        defaults=_state_values_from_history(user_id, game_type),
+    )
+    return state
+
+
+def get_feature_states(pairs) -> Dict[Tuple[int, str], GameFeatureState]:
+    """States for many (user_id, game_type) pairs with one query; missing rows are seeded."""
+    pairs = set(pairs)
+    if not pairs:
+        return {}
+    states = {
+        (state.user_id, state.game_type): state
+        for state in GameFeatureState.objects.filter(
+            user_id__in={user_id for user_id, _ in pairs},
+            game_type__in={game_type for _, game_type in pairs},
+        )
+        if (state.user_id, state.game_type) in pairs
+    }
+    for user_id, game_type in pairs - states.keys():
+        states[(user_id, game_type)] = get_feature_state(user_id, game_type)
+    return states
+
+
+def record_game_features(user_id: int, results) -> None:
+    """
+    Push stored GameResults into their feature states. Call after the insert,
+    inside its transaction: a missing row is seeded from history, which already
+    contains the new results.
+    """
+    per_game: dict = {}
+    for result in results:
+        per_game.setdefault(result.game_type, []).append(result)
+
+    for game_type, game_results in per_game.items():
+        state = (
+            GameFeatureState.objects.select_for_update()
+            .filter(user_id=user_id, game_type=game_type)
+            .first()
+        )
+        if state is None:
+            get_feature_state(user_id, game_type)
+            continue
+        latest_micros = state.recent[-1][7] if state.recent else None
+        if any(result.pk is None for result in game_results) or (
+            latest_micros is not None
+            and any((result.created_at - EPOCH) // MICROSECOND < latest_micros for result in game_results)
+        ):
+            # Backend did not return ids from bulk_create, or a replayed result was
+            # played before the newest one kept: re-read the tail in created_at order.
+            for name, value in _state_values_from_history(user_id, game_type).items():
+                setattr(state, name, value)
+        else:
+            recent = list(state.recent)
+            for result in sorted(game_results, key=lambda r: r.pk):
+                if result.pk <= state.last_result_id:
+                    continue
+                recent.append(_entry_from_result(result))
+                state.attempts_count += 1
+                state.last_result_id = result.pk
+                if state.first_attempt_at is None:
+                    state.first_attempt_at = result.created_at
+            state.recent = recent[-GameFeatureState.WINDOW_CAPACITY:]
+        state.save(update_fields=['attempts_count', 'first_attempt_at', 'last_result_id', 'recent', 'updated_at'])
+
+
+def window_features(state: GameFeatureState, window_size: int) -> Optional[Dict[str, float]]:
+    """
+    The features extract_user_features() derives from the last `window_size`
+    results, computed from the state row. None when fewer results exist.
+    """
+    if window_size > GameFeatureState.WINDOW_CAPACITY:
+        raise ValueError(f'window_size {window_size} exceeds the feature store capacity')
+    window = state.recent[-window_size:]
+    n = len(window)
+    if n == 0 or n < window_size:
+        return None
+
+    scores = [float(item[0]) for item in window]
+    avg_score = sum(scores) / n
+    if n > 1:
+        std_score = math.sqrt(sum((s - avg_score) ** 2 for s in scores) / (n - 1))
+        x_mean = (n - 1) / 2
+        slope = (
+            sum((i - x_mean) * (s - avg_score) for i, s in enumerate(scores))
+            / sum((i - x_mean) ** 2 for i in range(n))
+        )
+        score_improvement = scores[-1] - scores[-2]
+    else:
+        std_score = slope = score_improvement = 0.0
+
+    def mean(column: int) -> float:
+        return sum(item[column] for item in window) / n
+
+    return {
+        'user_id': float(state.user_id),
+        'attempt_number': float(n + 1),
+        'avg_score': avg_score,
+        'std_score': std_score,
+        'avg_duration': mean(1),
+        'total_hints': float(sum(item[2] for item in window)),
+        'avg_successful_attempts': mean(3),
+        'avg_failed_attempts': mean(4),
+        'failed_attempts_trend': float(window[-1][4] - window[0][4]),
+        'avg_max_streak': mean(5),
+        'time_of_day': float(window[-1][6]),
+        'score_trend': slope,
+        'last_score': scores[-1],
+        'score_improvement': score_improvement,
+        'days_since_start': (window[-1][7] - window[0][7]) / 1e6 / 86400,
+        **game_type_one_hot(state.game_type),
+    }
+
+
+def user_window_features(user_id: int, game_type: str, window_size: int) -> Optional[Dict[str, float]]:
+    return window_features(get_feature_state(user_id, game_type), window_size)
+
+
+def rebuild_feature_store(user_ids=None, batch_size: int = 500) -> int:
+    """Recompute feature states from history (all users, or only `user_ids`). Returns rows written."""
+    games = GameResult.objects.all()
+    if user_ids is not None:
+        games = games.filter(user_id__in=user_ids)
+
+    totals = {
+        (r['user_id'], r['game_type']): r
+        for r in games.values('user_id', 'game_type')
+        .annotate(count=Count('id'), first=Min('created_at'), last_id=Max('id'))
+        .order_by()
+    }
+
+    recent: dict = {}
+    ordered = games.order_by('user_id', 'game_type', 'created_at', 'id')
+    for row in game_data_values(ordered).iterator(chunk_size=2000):
+        items = recent.setdefault((row[0], row[1]), [])
+        items.append(_entry_from_values(row))
+        if len(items) > GameFeatureState.WINDOW_CAPACITY:
+            del items[0]
+
+    rows = [
+        GameFeatureState(
+            user_id=user_id,
+            game_type=game_type,
+            attempts_count=t['count'],
+            first_attempt_at=t['first'],
+            last_result_id=t['last_id'] or 0,
+            recent=recent.get((user_id, game_type), []),
+        )
+        for (user_id, game_type), t in totals.items()
+    ]
+
+    stale = GameFeatureState.objects.all()
+    if user_ids is not None:
+        stale = stale.filter(user_id__in=user_ids)
+    stale_ids = [
+        pk for pk, user_id, game_type in stale.values_list('pk', 'user_id', 'game_type')
+        if (user_id, game_type) not in totals
+    ]
+    GameFeatureState.objects.filter(pk__in=stale_ids).delete()
+
+    GameFeatureState.objects.bulk_create(
+        rows,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['user', 'game_type'],
+        update_fields=['attempts_count', 'first_attempt_at', 'last_result_id', 'recent', 'updated_at'],
+    )
+    return len(rows)
@@ -0,0 +1,86 @@
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+# Fixed WebP renditions stored next to every uploaded image, smallest first.
+# Each fits inside a square box of the given size; smaller originals are not upscaled.
+DERIVATIVE_SIZES = {
+    'thumb': 160,
+    'card': 640,
+    'print': 1600,
+}
+WEBP_QUALITY = 80
+
+
+def derivative_name(original: str, kind: str) -> str:
+    """sounds/images/<uuid>.png -> sounds/images/<uuid>_card.webp"""
+    path = PurePosixPath(original)
+    return str(path.with_name(f'{path.stem}_{kind}.webp'))
+
+
+def render_derivatives(fileobj) -> dict:
+    """
+    {kind: (webp_bytes, width, height)} for an image file object, or {} if Pillow
+    cannot read it. The file position is restored to the start.
+    """
+    try:
+        fileobj.seek(0)
+        with Image.open(fileobj) as source:
+            source = ImageOps.exif_transpose(source)
+            has_alpha = source.mode in ('RGBA', 'LA', 'PA') or 'transparency' in source.info
+            source = source.convert('RGBA' if has_alpha else 'RGB')
+
+            out = {}
+            for kind, box in DERIVATIVE_SIZES.items():
+                image = source.copy()
+                image.thumbnail((box, box), Image.LANCZOS)
+                buffer = BytesIO()
+                image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+                out[kind] = (buffer.getvalue(), image.width, image.height)
+            return out
+    except (UnidentifiedImageError, OSError, ValueError):
+        return {}
+    finally:
+        fileobj.seek(0)
+
+
+def store_derivatives(storage, original: str, rendered: dict) -> dict:
+    """Save rendered derivatives next to `original`; returns what media_meta records."""
+    stored = {}
+    for kind, (data, width, height) in rendered.items():
+        name = storage.save(derivative_name(original, kind), ContentFile(data))
+        stored[kind] = {
+            'name': name,
+            'box': DERIVATIVE_SIZES[kind],
+            'width': width,
+            'height': height,
+            'size': len(data),
+        }
+    return stored
+
+
+def build_stored_derivatives(storage, original: str) -> dict:
+    """Render and store derivatives for an image that is already in storage."""
+    with storage.open(original, 'rb') as fh:
+        rendered = render_derivatives(BytesIO(fh.read()))
+    return store_derivatives(storage, original, rendered)
+
+
+def delete_derivatives(storage, derivatives: dict) -> None:
+    for entry in (derivatives or {}).values():
+        try:
+            storage.delete(entry['name'])
+        except Exception:
+            pass
+
+
+def pick_derivative(derivatives: dict, fit: int):
+    """Smallest recorded derivative whose box is at least `fit` px, or None."""
+    candidates = sorted((entry for entry in (derivatives or {}).values()), key=lambda e: e['box'])
+    for entry in candidates:
+        if entry['box'] >= fit:
+            return entry
+    return None
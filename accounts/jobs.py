@@ -0,0 +1,168 @@
+"""
+DB-backed background jobs.
+
+Request code calls `enqueue('name', {...})`; `manage.py run_worker` claims due jobs
+with SELECT ... FOR UPDATE SKIP LOCKED and runs the handler registered under that
+name. Failed jobs are retried with exponential backoff until max_attempts.
+Handlers live in accounts.tasks and take the payload as keyword arguments; their
+return value (JSON-serializable) is stored on the job.
+"""
+
+import hashlib
+import json
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import BackgroundJob
+
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE_SECONDS = 10
+BACKOFF_MAX_SECONDS = 60 * 60
+# A RUNNING job whose worker has not finished it by then is assumed dead and re-claimed.
+STALE_AFTER = timedelta(minutes=30)
+# Queued jobs due this long ago mean no `run_worker` is draining the queue.
+BACKLOG_AFTER = timedelta(minutes=10)
+
+_HANDLERS = {}
+
+
+def job_handler(name: str):
+    def register(func):
+        _HANDLERS[name] = func
+        return func
+
+    return register
+
+
+def enqueue(
+    name: str,
+    payload: dict = None,
+    *,
+    delay: float = 0,
+    max_attempts: int = 5,
+    unique: bool = False,
+    unique_key: str = None,
+) -> BackgroundJob:
+    """
+    Queue a job. With unique=True an identical job that is still queued or running
+    is returned instead of adding another one; unique_key widens "identical" to any
+    job with that key (e.g. one training run per model whatever its options).
+    A partial unique index enforces this across processes.
+    """
+    if name not in _HANDLERS:
+        raise ValueError(f'Unknown job: {name}')
+    if unique and unique_key is None:
+        encoded = json.dumps(payload or {}, sort_keys=True, default=str).encode('utf-8')
+        unique_key = f'{name}:{hashlib.sha256(encoded).hexdigest()[:32]}'
+    if unique_key is None:
+        return BackgroundJob.objects.create(
+            name=name,
+            payload=payload or {},
+            max_attempts=max_attempts,
+            run_after=timezone.now() + timedelta(seconds=delay),
+        )
+
+    pending = BackgroundJob.objects.filter(
+        unique_key=unique_key,
+        status__in=[BackgroundJob.Status.QUEUED, BackgroundJob.Status.RUNNING],
+    )
+    job = pending.first()
+    if job:
+        return job
+    try:
+        with transaction.atomic():
+            return BackgroundJob.objects.create(
+                name=name,
+                payload=payload or {},
+                max_attempts=max_attempts,
+                run_after=timezone.now() + timedelta(seconds=delay),
+                unique_key=unique_key,
+            )
+    except IntegrityError:
+        # Another process queued it between the check and the insert.
+        job = pending.first()
+        if job is None:
+            raise
+        return job
+
+
+def backoff_seconds(attempts: int) -> float:
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_jobs(worker_id: str, limit: int = 1) -> list:
+    now = timezone.now()
+    due = Q(status=BackgroundJob.Status.QUEUED, run_after__lte=now) | Q(
+        status=BackgroundJob.Status.RUNNING,
+        locked_at__lt=now - STALE_AFTER,
+    )
+    with transaction.atomic():
+        jobs = list(
+            BackgroundJob.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by('run_after', 'id')[:limit]
+        )
+        for job in jobs:
+            job.status = BackgroundJob.Status.RUNNING
+            job.attempts += 1
+            job.locked_at = now
+            job.locked_by = worker_id
+        BackgroundJob.objects.bulk_update(jobs, ['status', 'attempts', 'locked_at', 'locked_by'])
+    return jobs
+
+
+def run_job(job: BackgroundJob) -> bool:
+    """Run one claimed job and record the outcome. Returns True on success."""
+    handler = _HANDLERS.get(job.name)
+    try:
+        if handler is None:
+            raise LookupError(f'No handler registered for {job.name}')
+        result = handler(**job.payload)
+    except Exception as exc:
+        job.last_error = ''.join(traceback.format_exception(exc))[-4000:]
+        if handler is not None and job.attempts < job.max_attempts:
+            job.status = BackgroundJob.Status.QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=backoff_seconds(job.attempts))
+            logger.warning('Job %s (%s) failed, attempt %s/%s', job.pk, job.name, job.attempts, job.max_attempts)
+        else:
+            job.status = BackgroundJob.Status.FAILED
+            logger.error('Job %s (%s) failed permanently: %s', job.pk, job.name, exc)
+        job.locked_at = None
+        job.save(update_fields=['status', 'run_after', 'last_error', 'locked_at', 'updated_at'])
+        return False
+
+    job.status = BackgroundJob.Status.DONE
+    job.result = result
+    job.locked_at = None
+    job.save(update_fields=['status', 'result', 'locked_at', 'updated_at'])
+    return True
+
+
+def overdue_jobs(older_than: timedelta = BACKLOG_AFTER):
+    """Queued jobs that were due more than `older_than` ago."""
+    return BackgroundJob.objects.filter(
+        status=BackgroundJob.Status.QUEUED,
+        run_after__lt=timezone.now() - older_than,
+    )
+
+
+def run_pending_jobs(worker_id: str = 'inline', limit: int = None) -> int:
+    """Claim and run due jobs until none are left (or `limit` ran). Returns how many ran."""
+    ran = 0
+    while limit is None or ran < limit:
+        jobs = claim_jobs(worker_id)
+        if not jobs:
+            break
+        for job in jobs:
+            run_job(job)
+            ran += 1
+    return ran
@@ -0,0 +1,152 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
+
+from accounts.images import build_stored_derivatives, delete_derivatives
+from accounts.media import probe_stored_file
+from accounts.models import MediaMetadataModel
+
+
+class Command(BaseCommand):
+    help = (
+        'Record size / content type / checksum / availability for uploaded files that were '
+        'stored before media metadata existed. Storage is probed in bounded concurrent batches.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            action='append',
+            dest='models',
+            default=None,
+            help='Only backfill this accounts model, e.g. SoundCard (can be repeated). All media models by default.',
+        )
+        parser.add_argument('--batch-size', type=int, default=200, help='Rows loaded and saved per batch (default: 200)')
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent storage requests (default: 8)')
+        parser.add_argument('--all', action='store_true', help='Re-check files that already have metadata')
+        parser.add_argument(
+            '--no-checksum',
+            action='store_true',
+            help='Skip downloading files to compute checksums; only existence and size are recorded.',
+        )
+        parser.add_argument(
+            '--derivatives',
+            action='store_true',
+            help='Also render WebP derivatives for stored images that have none (scans every row).',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--batch-size and --workers must be positive.')
+
+        media_models = [
+            m for m in apps.get_app_config('accounts').get_models() if issubclass(m, MediaMetadataModel)
+        ]
+        if options['models']:
+            by_name = {m.__name__.lower(): m for m in media_models}
+            try:
+                media_models = [by_name[name.lower()] for name in options['models']]
+            except KeyError as exc:
+                raise CommandError(f'Unknown media model: {exc.args[0]}') from exc
+
+        self.recheck = options['all']
+        self.checksum = not options['no_checksum']
+        self.derivatives = options['derivatives']
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for model in media_models:
+                checked, failed = self._backfill_model(model, pool, options['batch_size'])
+                self.stdout.write(f'{model.__name__}: checked {checked} file(s), {failed} failed')
+
+        self.stdout.write(self.style.SUCCESS('Media metadata backfill finished.'))
+
+    def _backfill_model(self, model, pool, batch_size: int):
+        fields = model.media_field_names()
+        image_fields = {f.name for f in model._meta.concrete_fields if isinstance(f, models.ImageField)}
+        qs = model.objects.only('pk', 'media_meta', 'media_available', *fields).order_by('pk')
+        if not (self.recheck or (self.derivatives and image_fields)):
+            qs = qs.filter(media_available__isnull=True)
+
+        checked = failed = 0
+        last_pk = 0
+        while True:
+            batch = list(qs.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            jobs = []
+            for obj in batch:
+                for name in fields:
+                    f = getattr(obj, name)
+                    if f and (self.recheck or obj.media_state(name) is None):
+                        jobs.append((obj, name, pool.submit(probe_stored_file, f.storage, f.name, self.checksum)))
+
+            probed = {}
+            for obj, name, future in jobs:
+                try:
+                    info = future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'{model.__name__}({obj.pk}).{name}: {exc}')
+                    continue
+                checked += 1
+                probed[obj.pk, name] = info
+                obj.media_meta = {**(obj.media_meta or {}), name: info}
+
+            rendered = {}
+            if self.derivatives:
+                renders = []
+                for obj in batch:
+                    for name in image_fields:
+                        entry = (obj.media_meta or {}).get(name)
+                        if obj.media_state(name) and not entry.get('derivatives'):
+                            f = getattr(obj, name)
+                            renders.append((obj, name, f, pool.submit(build_stored_derivatives, f.storage, f.name)))
+                for obj, name, f, future in renders:
+                    try:
+                        rendered[obj.pk, name] = (f, future.result())
+                    except Exception as exc:
+                        failed += 1
+                        self.stderr.write(f'{model.__name__}({obj.pk}).{name} derivatives: {exc}')
+
+            self._write_back(model, fields, [obj.pk for obj in batch], probed, rendered)
+
+        return checked, failed
+
+    def _write_back(self, model, fields, pks, probed: dict, rendered: dict) -> None:
+        """
+        Merge the results into the rows as they are now: uploads and 'media.derivatives'
+        jobs may have changed media_meta while the storage was probed.
+        """
+        orphans = []
+        with transaction.atomic():
+            rows = list(
+                model.objects.select_for_update()
+                .filter(pk__in=pks)
+                .only('pk', 'media_meta', 'media_available', *fields)
+            )
+            for row in rows:
+                meta = dict(row.media_meta or {})
+                for name in fields:
+                    current = getattr(row, name).name
+                    entry = meta.get(name) or {}
+                    info = probed.get((row.pk, name))
+                    if info is not None and info['name'] == current:
+                        if entry.get('name') == current and entry.get('derivatives'):
+                            info = {**info, 'derivatives': entry['derivatives']}
+                        entry = meta[name] = info
+                    if (row.pk, name) in rendered:
+                        f, derivatives = rendered[row.pk, name]
+                        if f.name != current or entry.get('name') != current:
+                            orphans.append((f.storage, derivatives))
+                        elif not entry.get('derivatives'):
+                            meta[name] = {**entry, 'derivatives': derivatives}
+                        # Otherwise a job rendered the same names meanwhile; keep its entry.
+                row.media_meta = meta
+                row.refresh_media_available()
+            model.objects.bulk_update(rows, ['media_meta', 'media_available'])
+
+        for storage, derivatives in orphans:
+            delete_derivatives(storage, derivatives)
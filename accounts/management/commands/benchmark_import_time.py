@@ -0,0 +1,105 @@
+import json
+import statistics
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ml_services.benchmarks import SCENARIOS, build_report, compare_reports, measure_imports, scenario_code, write_report
+
+
+class Command(BaseCommand):
+    help = (
+        'Run django.setup(), a first request through the WSGI handler, `import ml_services` and a '
+        'prediction request for a game without a saved model, each in a fresh interpreter under '
+        '`python -X importtime`. Fails when a scenario imports pandas/scikit-learn/XGBoost or takes '
+        'longer than its budget. The requests use the configured database; the prediction probe '
+        'rolls back its rows.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/', help='URL the first request fetches (default: /)')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per scenario; the median is reported (default: 3)')
+        parser.add_argument(
+            '--setup-budget', type=float, default=2.0, help='Max seconds for django.setup() (default: 2.0)',
+        )
+        parser.add_argument(
+            '--request-budget',
+            type=float,
+            default=3.0,
+            help='Max seconds for django.setup() plus the first request (default: 3.0)',
+        )
+        parser.add_argument('--top', type=int, default=10, help='Slowest top-level imports to list (default: 10)')
+        parser.add_argument('--json', dest='json_path', default=None, help='Write the report to this JSON file')
+        parser.add_argument('--compare', dest='compare_path', default=None, help='Compare against an earlier JSON report')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be positive.')
+
+        baseline = None
+        if options['compare_path']:
+            with open(options['compare_path']) as f:
+                baseline = json.load(f)
+
+        stages = {}
+        for name in SCENARIOS:
+            runs = []
+            for _ in range(options['repeat']):
+                try:
+                    runs.append(measure_imports(
+                        scenario_code(name, options['path']), cwd=str(settings.BASE_DIR), top=options['top'],
+                    ))
+                except RuntimeError as e:
+                    raise CommandError(f'{name}: {e}')
+            stage = runs[-1]
+            stage['seconds'] = round(statistics.median(run['seconds'] for run in runs), 4)
+            stage['import_seconds'] = round(statistics.median(run['import_seconds'] for run in runs), 4)
+            stages[name] = stage
+
+        params = {key: options[key] for key in ('path', 'repeat', 'setup_budget', 'request_budget')}
+        report = build_report(stages, params)
+        self._print_stages(report)
+        if baseline is not None:
+            self._print_comparison(compare_reports(baseline, report), baseline)
+        if options['json_path']:
+            write_report(report, options['json_path'])
+            self.stdout.write(f'Report written to {options["json_path"]}')
+
+        problems = [
+            f'{name} imported {", ".join(stage["heavy_modules"])}'
+            for name, stage in stages.items()
+            if stage['heavy_modules']
+        ]
+        for name, budget in (('django_setup', options['setup_budget']), ('first_request', options['request_budget'])):
+            if stages[name]['seconds'] > budget:
+                problems.append(f'{name} took {stages[name]["seconds"]:.3f}s (budget {budget:.3f}s)')
+        if stages['first_request'].get('status', 200) >= 500:
+            problems.append(f'first request to {options["path"]} answered {stages["first_request"]["status"]}')
+        if stages['heuristic_prediction'].get('status') != 200:
+            problems.append(f'heuristic prediction answered {stages["heuristic_prediction"].get("status")}')
+        if problems:
+            raise CommandError('; '.join(problems))
+        self.stdout.write(self.style.SUCCESS('Import time within budget'))
+
+    def _print_stages(self, report: dict) -> None:
+        self.stdout.write('\n' + '=' * 60)
+        for name, stage in report['stages'].items():
+            heavy = ', '.join(stage['heavy_modules']) or '-'
+            self.stdout.write(
+                f'  {name:<20} {stage["seconds"]:8.3f}s  imports {stage["import_seconds"]:7.3f}s  '
+                f'modules={stage["modules"]}  heavy={heavy}'
+            )
+            for entry in stage['slowest']:
+                self.stdout.write(f'      {entry["ms"]:9.1f} ms  {entry["module"]}')
+
+    def _print_comparison(self, rows, baseline: dict) -> None:
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS(f'Compared with {baseline.get("git_commit") or "baseline"}'))
+        for row in rows:
+            if row['ratio'] is None:
+                self.stdout.write(f'  {row["stage"]:<20} new stage')
+                continue
+            style = self.style.ERROR if row['ratio'] > 1.1 else self.style.SUCCESS
+            self.stdout.write(
+                style(f'  {row["stage"]:<20} {row["baseline_seconds"]:8.3f}s -> {row["seconds"]:8.3f}s  x{row["ratio"]}')
+            )
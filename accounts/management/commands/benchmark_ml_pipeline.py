@@ -0,0 +1,123 @@
+import json
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from accounts.models import GameResult
+from ml_services.benchmarks import (
+    StageTimer,
+    build_report,
+    compare_reports,
+    load_synthetic_results,
+    run_pipeline,
+    write_report,
+)
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Load deterministic synthetic children x 7 game types, then time extract_game_data, '
+        'preprocess_features, ProgressPredictor.train, the feature store rebuild, predict() and predict_many() with '
+        'tracemalloc peaks. Everything is rolled back at the end. For a throwaway database run with '
+        'DATABASE_URL=sqlite://:memory: (migrated automatically) or point it at a local Postgres.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--children', type=int, default=500, help='Synthetic children (default: 500)')
+        parser.add_argument('--attempts', type=int, default=20, help='Mean results per child and game (default: 20)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+        parser.add_argument(
+            '--game-type',
+            type=str,
+            default=None,
+            choices=GameResult.GameType.values,
+            help='Benchmark one game type (default: the all-games model)',
+        )
+        parser.add_argument('--model-type', type=str, default='xgboost', choices=['linear', 'xgboost'])
+        parser.add_argument('--window-size', type=int, default=3, help='Window size (default: 3)')
+        parser.add_argument('--min-entries', type=int, default=5, help='Minimum results per user-game (default: 5)')
+        parser.add_argument('--predictions', type=int, default=200, help='Timed predict() calls (default: 200)')
+        parser.add_argument('--no-memory', action='store_true', help='Do not trace memory (tracemalloc slows stages)')
+        parser.add_argument('--json', dest='json_path', default=None, help='Write the report to this JSON file')
+        parser.add_argument('--compare', dest='compare_path', default=None, help='Compare against an earlier JSON report')
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Allow running with DEBUG=0. The data is rolled back, but loading it is heavy.',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError('Refusing to load benchmark data with DEBUG=0; pass --force to run anyway.')
+        if options['children'] < 1 or options['attempts'] < 1 or options['predictions'] < 0:
+            raise CommandError('--children and --attempts must be positive, --predictions non-negative.')
+
+        baseline = None
+        if options['compare_path']:
+            with open(options['compare_path']) as f:
+                baseline = json.load(f)
+
+        name = str(connection.settings_dict.get('NAME') or '')
+        if connection.vendor == 'sqlite' and (name in ('', ':memory:') or 'mode=memory' in name):
+            call_command('migrate', verbosity=0, interactive=False)
+
+        params = {
+            key: options[key]
+            for key in ('children', 'attempts', 'seed', 'game_type', 'model_type', 'window_size', 'min_entries', 'predictions')
+        }
+        params['trace_memory'] = not options['no_memory']
+        timer = StageTimer(trace_memory=not options['no_memory'])
+        try:
+            with transaction.atomic():
+                with timer.stage('load') as info:
+                    loaded = load_synthetic_results(options['children'], options['attempts'], options['seed'])
+                    info['rows'] = loaded['results']
+                self.stdout.write(f'Loaded {loaded["results"]} results for {loaded["children"]} children')
+
+                run_pipeline(
+                    timer,
+                    game_type=options['game_type'],
+                    model_type=options['model_type'],
+                    window_size=options['window_size'],
+                    min_entries=options['min_entries'],
+                    predictions=options['predictions'],
+                    seed=options['seed'],
+                )
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        report = build_report(timer.stages, params)
+        self._print_stages(report)
+        if baseline is not None:
+            self._print_comparison(compare_reports(baseline, report), baseline)
+        if options['json_path']:
+            write_report(report, options['json_path'])
+            self.stdout.write(f'Report written to {options["json_path"]}')
+
+    def _print_stages(self, report: dict) -> None:
+        self.stdout.write('\n' + '=' * 60)
+        for name, stage in report['stages'].items():
+            extra = ', '.join(
+                f'{key}={value}' for key, value in stage.items() if key not in ('seconds', 'peak_mb')
+            )
+            peak = f'{stage["peak_mb"]:9.2f} MB' if 'peak_mb' in stage else ''
+            self.stdout.write(f'  {name:<22} {stage["seconds"]:9.3f}s {peak}  {extra}')
+
+    def _print_comparison(self, rows, baseline: dict) -> None:
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS(f'Compared with {baseline.get("git_commit") or "baseline"}'))
+        for row in rows:
+            if row['ratio'] is None:
+                self.stdout.write(f'  {row["stage"]:<22} new stage')
+                continue
+            style = self.style.ERROR if row['ratio'] > 1.1 else self.style.SUCCESS
+            self.stdout.write(
+                style(f'  {row["stage"]:<22} {row["baseline_seconds"]:9.3f}s -> {row["seconds"]:9.3f}s  x{row["ratio"]}')
+            )
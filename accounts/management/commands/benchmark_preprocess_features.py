@@ -0,0 +1,90 @@
+import json
+import time
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+from ml_services.data_extractor import _preprocess_features_loop, preprocess_features
+
+
+def synthetic_game_frame(rows: int, users: int, seed: int) -> pd.DataFrame:
+    """Random extract_game_data()-shaped frame; no database involved."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'user_id': rng.integers(1, users + 1, rows),
+        'game_type': rng.choice(['math', 'memory', 'attention', 'sound', 'words', 'sentences'], rows),
+        'score': rng.integers(0, 101, rows),
+        'duration_seconds': rng.integers(0, 600, rows),
+        'hints_used': rng.integers(0, 4, rows),
+        'attempts': np.ones(rows, dtype=np.int64),
+        'successful_attempts': rng.integers(0, 10, rows),
+        'failed_attempts': rng.integers(0, 5, rows),
+        'max_streak': rng.integers(0, 8, rows),
+        'time_of_day': rng.integers(0, 3, rows),
+        'created_at': pd.Timestamp('2024-01-01', tz='UTC') + pd.to_timedelta(rng.integers(0, 180 * 86400, rows), unit='s'),
+    })
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the vectorized preprocess_features against the per-row reference on synthetic data '
+        'and check that both produce identical output.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Rows for the vectorized run (default: 1000000)')
+        parser.add_argument('--users', type=int, default=5000, help='Synthetic users (default: 5000)')
+        parser.add_argument('--window-size', type=int, default=3, help='Window size (default: 3)')
+        parser.add_argument(
+            '--loop-rows',
+            type=int,
+            default=20_000,
+            help='Rows for the per-row reference, which is far too slow for --rows (default: 20000)',
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+        parser.add_argument('--json', dest='json_path', default=None, help='Also write the report to this JSON file')
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['loop_rows'] < 1 or options['users'] < 1:
+            raise CommandError('--rows, --loop-rows and --users must be positive.')
+        w = options['window_size']
+
+        # Same data for both implementations: correctness check + per-row cost of each.
+        small_users = max(1, options['users'] * options['loop_rows'] // options['rows'])
+        small = synthetic_game_frame(options['loop_rows'], small_users, options['seed'])
+        started = time.perf_counter()
+        X_ref, y_ref = _preprocess_features_loop(small, window_size=w)
+        loop_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        X_vec, y_vec = preprocess_features(small, window_size=w)
+        vec_small_seconds = time.perf_counter() - started
+        pd.testing.assert_frame_equal(X_ref, X_vec, check_exact=True)
+        pd.testing.assert_series_equal(y_ref, y_vec, check_exact=True)
+        self.stdout.write(self.style.SUCCESS(f'Outputs identical on {len(small)} rows ({len(X_ref)} samples).'))
+
+        big = synthetic_game_frame(options['rows'], options['users'], options['seed'])
+        started = time.perf_counter()
+        X_big, _ = preprocess_features(big, window_size=w)
+        vec_seconds = time.perf_counter() - started
+
+        loop_per_row = loop_seconds / len(small)
+        report = {
+            'window_size': w,
+            'loop': {'rows': len(small), 'seconds': round(loop_seconds, 3)},
+            'vectorized_same_rows': {'rows': len(small), 'seconds': round(vec_small_seconds, 4)},
+            'vectorized': {'rows': len(big), 'samples': len(X_big), 'seconds': round(vec_seconds, 3)},
+            'loop_estimated_seconds_for_rows': round(loop_per_row * len(big), 1),
+            'speedup': round(loop_per_row * len(big) / vec_seconds, 1),
+        }
+
+        self.stdout.write(f"per-row reference: {loop_seconds:.2f}s for {len(small)} rows")
+        self.stdout.write(f"vectorized:        {vec_seconds:.2f}s for {len(big)} rows ({len(X_big)} samples)")
+        self.stdout.write(
+            f"estimated reference time for {len(big)} rows: {report['loop_estimated_seconds_for_rows']:.0f}s "
+            f"-> speed-up x{report['speedup']}"
+        )
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f'Report written to {options["json_path"]}')
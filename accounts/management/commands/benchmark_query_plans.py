@@ -0,0 +1,197 @@
+import json
+import random
+import statistics
+import time
+from datetime import datetime, time as dt_time, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Avg
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from accounts.models import GameResult, Story, StoryListen
+
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Load synthetic GameResult/StoryListen rows, then show query plans and latency of the hot '
+        'queries with and without the composite indexes. Everything is rolled back at the end.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Synthetic GameResult rows (default: 1000000)')
+        parser.add_argument('--users', type=int, default=2000, help='Synthetic children (default: 2000)')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query (default: 20)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+        parser.add_argument('--json', dest='json_path', default=None, help='Also write the report to this JSON file')
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Allow running with DEBUG=0. The data is rolled back, but loading it is heavy.',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError('Refusing to load benchmark data with DEBUG=0; pass --force to run anyway.')
+        if options['rows'] < 1 or options['users'] < 1:
+            raise CommandError('--rows and --users must be positive.')
+
+        self.repeat = options['repeat']
+        report = {}
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                context = self._load(options['rows'], options['users'], options['seed'])
+                self.stdout.write(f'Loaded {options["rows"]} results in {time.perf_counter() - started:.1f}s')
+
+                indexes = [(GameResult, idx) for idx in GameResult._meta.indexes]
+                indexes += [(StoryListen, idx) for idx in StoryListen._meta.indexes]
+
+                self._set_indexes(indexes, present=False)
+                report['before'] = self._run_queries(context)
+
+                self._set_indexes(indexes, present=True)
+                report['after'] = self._run_queries(context)
+
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        self._print_summary(report)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            self.stdout.write(f'Report written to {options["json_path"]}')
+
+    def _load(self, rows: int, users: int, seed: int) -> dict:
+        rng = random.Random(seed)
+        children = User.objects.bulk_create(
+            [User(username=f'bench_child_{i}') for i in range(users)],
+            batch_size=1000,
+        )
+        author = User.objects.create(username='bench_author')
+        stories = Story.objects.bulk_create(
+            [Story(created_by=author, title=f'Bench story {i}', text='...') for i in range(50)]
+        )
+        user_ids = [u.pk for u in children]
+        game_types = GameResult.GameType.values
+        now = timezone.now()
+        adapt = connection.ops.adapt_datetimefield_value
+
+        # Raw INSERTs with created_at spread over time: cheaper than model instances at this row
+        # count, and StoryListen.created_at is auto_now_add, which would replace the given values.
+        game_sql = (
+            f'INSERT INTO {GameResult._meta.db_table} '
+            '(user_id, game_type, score, duration_seconds, details, created_at) VALUES (%s, %s, %s, %s, %s, %s)'
+        )
+        listen_sql = (
+            f'INSERT INTO {StoryListen._meta.db_table} (user_id, story_id, created_at) VALUES (%s, %s, %s)'
+        )
+        batch_size = 10_000
+        with connection.cursor() as cursor:
+            for offset in range(0, rows, batch_size):
+                batch = []
+                for _ in range(min(batch_size, rows - offset)):
+                    batch.append(
+                        (
+                            rng.choice(user_ids),
+                            rng.choice(game_types),
+                            rng.randint(0, 100),
+                            rng.randint(10, 600),
+                            '{}',
+                            adapt(now - timedelta(minutes=rng.randint(0, 180 * 24 * 60))),
+                        )
+                    )
+                cursor.executemany(game_sql, batch)
+
+            listens = [
+                (rng.choice(user_ids), rng.choice(stories).pk, adapt(now - timedelta(minutes=rng.randint(0, 180 * 24 * 60))))
+                for _ in range(max(1, rows // 10))
+            ]
+            for offset in range(0, len(listens), batch_size):
+                cursor.executemany(listen_sql, listens[offset:offset + batch_size])
+
+        return {
+            'user_id': user_ids[0],
+            'caseload': user_ids[:40],
+            'game_type': GameResult.GameType.MATH,
+            'story_id': stories[0].pk,
+        }
+
+    def _set_indexes(self, indexes, present: bool) -> None:
+        editor = connection.schema_editor()
+        with connection.cursor() as cursor:
+            for model, index in indexes:
+                existing = connection.introspection.get_constraints(cursor, model._meta.db_table)
+                if (index.name in existing) == present:
+                    continue
+                statement = index.create_sql(model, editor) if present else index.remove_sql(model, editor)
+                cursor.execute(str(statement))
+            if connection.vendor in ('postgresql', 'sqlite'):
+                cursor.execute('ANALYZE')
+
+    def _queries(self, ctx: dict) -> dict:
+        today = timezone.localdate()
+        start_dt = timezone.make_aware(datetime.combine(today - timedelta(days=13), dt_time.min))
+        end_dt = timezone.make_aware(datetime.combine(today + timedelta(days=1), dt_time.min))
+        return {
+            'child_stats': GameResult.objects.filter(user_id=ctx['user_id'])
+            .only('game_type', 'score', 'created_at')
+            .order_by('created_at'),
+            'prediction_history': GameResult.objects.filter(user_id=ctx['user_id'], game_type=ctx['game_type'])
+            .order_by('-created_at')
+            .values('score', 'raw_score', 'max_score', 'duration_seconds', 'details', 'created_at')[:100],
+            'ml_user_extract': GameResult.objects.filter(user_id=ctx['user_id'], game_type=ctx['game_type'])
+            .order_by('user_id', 'game_type', 'created_at'),
+            'dashboard_series': GameResult.objects.filter(
+                user_id__in=ctx['caseload'],
+                created_at__gte=start_dt,
+                created_at__lt=end_dt,
+                game_type=ctx['game_type'],
+            )
+            .annotate(day=TruncDate('created_at'))
+            .values('day')
+            .annotate(avg=Avg('score'))
+            .order_by('day'),
+            'first_listen': StoryListen.objects.filter(user_id=ctx['user_id'], story_id=ctx['story_id']),
+        }
+
+    def _run_queries(self, ctx: dict) -> dict:
+        out = {}
+        for name, qs in self._queries(ctx).items():
+            plan = qs.explain()
+            # .all() clones the queryset so every run hits the database, not the result cache.
+            run = (lambda q=qs: q.exists()) if name == 'first_listen' else (lambda q=qs: list(q.all()))
+            run()  # warm-up
+            timings = []
+            for _ in range(self.repeat):
+                started = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - started) * 1000)
+            out[name] = {
+                'plan': plan,
+                'median_ms': round(statistics.median(timings), 3),
+                'max_ms': round(max(timings), 3),
+            }
+        return out
+
+    def _print_summary(self, report: dict) -> None:
+        before = report.get('before', {})
+        after = report.get('after', {})
+        for name in before:
+            self.stdout.write('\n' + '=' * 60)
+            self.stdout.write(self.style.SUCCESS(name))
+            self.stdout.write(f'  before: {before[name]["median_ms"]:.3f} ms (median)')
+            self.stdout.write('    ' + before[name]['plan'].replace('\n', '\n    '))
+            self.stdout.write(f'  after:  {after[name]["median_ms"]:.3f} ms (median)')
+            self.stdout.write('    ' + after[name]['plan'].replace('\n', '\n    '))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.counters import rebuild_activity_counters
+
+
+class Command(BaseCommand):
+    help = 'Rebuild UserActivityCounters from GameResult and StoryListen history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            action='append',
+            dest='user_ids',
+            default=None,
+            help='Only rebuild counters for this user (can be repeated). Rebuilds all users by default.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows written per INSERT statement (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            written = rebuild_activity_counters(
+                user_ids=options['user_ids'],
+                batch_size=options['batch_size'],
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt activity counters for {written} user(s).'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.feature_store import rebuild_feature_store
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the ML feature store (GameFeatureState) from GameResult history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            action='append',
+            dest='user_ids',
+            default=None,
+            help='Only rebuild feature states for this user (can be repeated). Rebuilds all users by default.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows written per INSERT statement (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            written = rebuild_feature_store(
+                user_ids=options['user_ids'],
+                batch_size=options['batch_size'],
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} feature state(s).'))
@@ -0,0 +1,77 @@
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from accounts.jobs import BACKLOG_AFTER, claim_jobs, overdue_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = (
+        'Run queued background jobs (image derivatives, ML training, invite emails) from the database. '
+        'The web processes only queue these jobs: at least one worker must run beside them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=1, help='Jobs claimed per query (default: 1)')
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to sleep when the queue is empty (default: 2)',
+        )
+        parser.add_argument('--once', action='store_true', help='Exit when no due jobs are left')
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Run nothing; fail when queued jobs have waited longer than the backlog limit (no worker running)',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch'] < 1:
+            raise CommandError('--batch must be positive.')
+        if options['check']:
+            self._check_backlog()
+            return
+
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        self.stdout.write(f'Worker {worker_id} started.')
+        done = failed = 0
+        while not self.stopping:
+            close_old_connections()
+            jobs = claim_jobs(worker_id, limit=options['batch'])
+            if not jobs:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            for job in jobs:
+                # Claimed jobs are finished even when a stop signal arrives meanwhile.
+                if run_job(job):
+                    done += 1
+                else:
+                    failed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Worker {worker_id} stopped: {done} done, {failed} failed.'))
+
+    def _check_backlog(self):
+        overdue = overdue_jobs()
+        count = overdue.count()
+        if count:
+            oldest = overdue.order_by('run_after').values_list('name', 'run_after').first()
+            raise CommandError(
+                f'{count} queued job(s) are overdue by more than {int(BACKLOG_AFTER.total_seconds() // 60)} min '
+                f'(oldest: {oldest[0]}, due {oldest[1].isoformat()}). Is `manage.py run_worker` running?'
+            )
+        self.stdout.write(self.style.SUCCESS('No overdue jobs.'))
+
+    def _stop(self, signum, frame):
+        self.stopping = True
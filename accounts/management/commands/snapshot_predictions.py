@@ -0,0 +1,73 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.models import ChildProfile, GameResult
+from accounts.predictions import (
+    PREDICTION_GAME_TYPES,
+    latest_result_ids,
+    recent_histories,
+    score_pairs,
+    store_snapshots,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Score every active child x game type with the current models and store the results '
+        'as PredictionSnapshot rows (run nightly from cron). Pairs without a model to score '
+        'them are not stored; the API answers those live.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--game-type',
+            action='append',
+            dest='game_types',
+            default=None,
+            choices=list(PREDICTION_GAME_TYPES),
+            help='Only snapshot this game type (can be repeated). All prediction game types by default.',
+        )
+        parser.add_argument(
+            '--active-days',
+            type=int,
+            default=None,
+            help='Only children with a result in the last N days (default: every child with results)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Children scored per round (default: 200)',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+        game_types = options['game_types'] or list(PREDICTION_GAME_TYPES)
+
+        results_qs = GameResult.objects.filter(
+            game_type__in=game_types,
+            user_id__in=ChildProfile.objects.values('user_id'),
+        )
+        if options['active_days'] is not None:
+            results_qs = results_qs.filter(created_at__gte=timezone.now() - timedelta(days=options['active_days']))
+        user_ids = sorted(set(results_qs.values_list('user_id', flat=True).distinct()))
+
+        started = time.perf_counter()
+        written = failed = 0
+        for i in range(0, len(user_ids), options['batch_size']):
+            batch = user_ids[i:i + options['batch_size']]
+            # Read before scoring: a result recorded meanwhile makes the snapshot stale, not falsely fresh.
+            last_ids = latest_result_ids(batch, game_types)
+            histories = recent_histories(batch, game_types)
+            results, errors = score_pairs(list(histories), histories)
+            written += store_snapshots(results, last_ids)
+            failed += len(errors)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {written} prediction snapshot(s) for {len(user_ids)} child(ren); '
+            f'{failed} pair(s) without a prediction; {time.perf_counter() - started:.1f}s.'
+        ))
@@ -1,6 +1,10 @@
 from typing import Optional
+import time
+
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
-from ml_services import ProgressPredictor
+from ml_services.data_extractor import extract_game_data
+from ml_services.training import TrainingOutcome, read_watermark, train_game_types, train_partition, update_partition
 from accounts.models import GameResult
 
 
@@ -12,7 +16,7 @@ class Command(BaseCommand):
             '--game-type',
             type=str,
             default=None,
-            help='Specific game type to train on (e.g., math, memory). If not specified, trains on all game types.',
+            help='Specific game type to train on (e.g., math, memory). If not specified, trains one all-games model with the game type as a feature.',
         )
         parser.add_argument(
             '--model-type',
@@ -44,6 +48,26 @@ class Command(BaseCommand):
             action='store_true',
             help='Train separate models for each game type',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Processes used to train several game types at once (default: one per core, at most one per game type)',
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Continue the saved XGBoost model(s) on results newer than their manifest watermark '
+                 'instead of rebuilding; falls back to a full rebuild when there is no saved model. '
+                 'Backdated results (recorded late with an older played_at) are fitted without the '
+                 'already trained results that follow them; a full rebuild re-fits them exactly.',
+        )
+        parser.add_argument(
+            '--incremental-rounds',
+            type=int,
+            default=50,
+            help='Trees added per incremental run (default: 50). Run a full rebuild now and then to reset the tree count.',
+        )
 
     def handle(self, *args, **options):
         game_type: Optional[str] = options['game_type']
@@ -75,65 +99,115 @@ class Command(BaseCommand):
         else:
             game_types_to_train = [None]
 
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError('--workers must be positive.')
+        if options['incremental_rounds'] < 1:
+            raise CommandError('--incremental-rounds must be positive.')
+
         # Train models
-        results = {}
-        for gt in game_types_to_train:
-            try:
-                self.stdout.write(f'\nTraining model for game_type={gt or "all"}...')
-                
-                # Initialize predictor
-                predictor = ProgressPredictor(
+        started = time.perf_counter()
+        by_game_type = {}
+        if options['incremental']:
+            for gt in game_types_to_train:
+                outcome = update_partition(
+                    gt,
                     model_type=model_type,
-                    model_dir='ml_models',
                     window_size=window_size,
-                )
-                
-                # Train
-                metrics = predictor.train(
-                    game_type=gt,
                     test_size=test_size,
+                    model_dir=settings.ML_MODEL_DIR,
+                    rounds=options['incremental_rounds'],
                     min_entries=min_entries,
                 )
-                
-                # Save model
-                model_path = predictor.save(game_type=gt)
-                
-                # Display results
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'\nTraining complete for game_type={gt or "all"}'
+                if outcome is None:
+                    self.stdout.write(
+                        self.style.WARNING(
+                            f'No saved {model_type} model to continue for game_type={gt or "all"}; running a full rebuild.'
+                        )
                     )
-                )
-                self.stdout.write(f'  Model type: {model_type}')
-                self.stdout.write(f'  Model saved to: {model_path}')
-                self.stdout.write(f'  Training samples: {int(metrics["n_samples"])}')
-                self.stdout.write(f'  Features: {int(metrics["n_features"])}')
-                self.stdout.write('')
-                self.stdout.write('  Performance Metrics:')
-                self.stdout.write(f'    Train MAE:  {metrics["train_mae"]:.2f}')
-                self.stdout.write(f'    Train RMSE: {metrics["train_rmse"]:.2f}')
-                self.stdout.write(f'    Train R²:   {metrics["train_r2"]:.3f}')
-                self.stdout.write(f'    Test MAE:   {metrics["test_mae"]:.2f}')
-                self.stdout.write(f'    Test RMSE:  {metrics["test_rmse"]:.2f}')
-                self.stdout.write(f'    Test R²:    {metrics["test_r2"]:.3f}')
-                
-                results[gt or 'all'] = metrics
-                
+                else:
+                    by_game_type[gt] = outcome
+
+        remaining = [gt for gt in game_types_to_train if gt not in by_game_type]
+        if remaining == [None]:
+            self.stdout.write('\nTraining model for game_type=all...')
+            watermark = read_watermark()
+            extract_started = time.perf_counter()
+            try:
+                df = extract_game_data(game_type=None, min_entries=min_entries)
             except ValueError as e:
+                by_game_type[None] = TrainingOutcome(None, 0.0, error=str(e))
+            else:
+                by_game_type[None] = train_partition(
+                    df, None, model_type, window_size, test_size, settings.ML_MODEL_DIR,
+                    watermark=watermark, extract_seconds=time.perf_counter() - extract_started,
+                )
+        elif remaining:
+            for outcome in train_game_types(
+                remaining,
+                model_type=model_type,
+                window_size=window_size,
+                min_entries=min_entries,
+                test_size=test_size,
+                model_dir=settings.ML_MODEL_DIR,
+                max_workers=options['workers'],
+            ):
+                by_game_type[outcome.game_type] = outcome
+        outcomes = [by_game_type[gt] for gt in game_types_to_train]
+        total_seconds = time.perf_counter() - started
+
+        results = {}
+        for outcome in outcomes:
+            gt = outcome.game_type
+            if outcome.error:
                 self.stdout.write(
                     self.style.ERROR(
-                        f'\nFailed to train model for game_type={gt or "all"}: {str(e)}'
+                        f'\nFailed to train model for game_type={gt or "all"}: {outcome.error}'
                     )
                 )
-            except Exception as e:
+                continue
+
+            if outcome.mode == 'unchanged':
                 self.stdout.write(
-                    self.style.ERROR(
-                        f'\nUnexpected error for game_type={gt or "all"}: {str(e)}'
+                    self.style.SUCCESS(
+                        f'\nModel for game_type={gt or "all"} is up to date '
+                        f'({outcome.rows} result(s) read, not enough new training samples)'
                     )
                 )
-                if options['verbosity'] >= 2:
-                    import traceback
-                    self.stdout.write(traceback.format_exc())
+                results[gt or 'all'] = None
+                continue
+
+            metrics = outcome.metrics
+            # Display results
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'\n{"Incremental update" if outcome.mode == "incremental" else "Training"} '
+                    f'complete for game_type={gt or "all"}'
+                )
+            )
+            self.stdout.write(f'  Model type: {model_type}')
+            self.stdout.write(f'  Model saved to: {outcome.model_path}')
+            self.stdout.write(f'  Training samples: {int(metrics["n_samples"])}')
+            self.stdout.write(f'  Features: {int(metrics["n_features"])}')
+            if 'n_trees' in metrics:
+                self.stdout.write(f'  Trees: {int(metrics["n_trees"])}')
+            self.stdout.write(f'  Extraction: {outcome.extract_seconds:.2f}s ({outcome.rows} rows)')
+            self.stdout.write(f'  Wall time: {outcome.seconds:.2f}s')
+            if outcome.rebuild_estimate_seconds is not None:
+                spent = outcome.extract_seconds + outcome.seconds
+                self.stdout.write(
+                    f'  Full rebuild estimate: {outcome.rebuild_estimate_seconds:.2f}s '
+                    f'(saved ~{outcome.rebuild_estimate_seconds - spent:.2f}s)'
+                )
+            self.stdout.write('')
+            self.stdout.write('  Performance Metrics:')
+            self.stdout.write(f'    Train MAE:  {metrics["train_mae"]:.2f}')
+            self.stdout.write(f'    Train RMSE: {metrics["train_rmse"]:.2f}')
+            self.stdout.write(f'    Train R²:   {metrics["train_r2"]:.3f}')
+            self.stdout.write(f'    Test MAE:   {metrics["test_mae"]:.2f}')
+            self.stdout.write(f'    Test RMSE:  {metrics["test_rmse"]:.2f}')
+            self.stdout.write(f'    Test R²:    {metrics["test_r2"]:.3f}')
+            
+            results[gt or 'all'] = metrics
 
         # Summary
         if results:
@@ -145,13 +219,19 @@ class Command(BaseCommand):
             )
             
             # Display average metrics
-            if len(results) > 1:
-                avg_test_mae = sum(m['test_mae'] for m in results.values()) / len(results)
-                avg_test_r2 = sum(m['test_r2'] for m in results.values()) / len(results)
+            trained = [m for m in results.values() if m is not None]
+            if len(trained) > 1:
+                avg_test_mae = sum(m['test_mae'] for m in trained) / len(trained)
+                avg_test_r2 = sum(m['test_r2'] for m in trained) / len(trained)
                 self.stdout.write('\nAverage Performance:')
                 self.stdout.write(f'  Test MAE: {avg_test_mae:.2f}')
                 self.stdout.write(f'  Test R²:  {avg_test_r2:.3f}')
             
+            self.stdout.write('\nWall time per model:')
+            for outcome in outcomes:
+                status = 'failed' if outcome.error else outcome.mode
+                self.stdout.write(f'  {outcome.game_type or "all":<14} {outcome.seconds:7.2f}s  {status}')
+            self.stdout.write(f'  {"total":<14} {total_seconds:7.2f}s')
             self.stdout.write('')
         else:
             raise CommandError('No models were trained successfully')
@@ -0,0 +1,263 @@
+import hashlib
+import mimetypes
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import FileField, ImageField
+
+from .images import delete_derivatives, pick_derivative
+
+
+MEDIA_EXISTS_CACHE_PREFIX = 'media-exists:'
+CHECKSUM_CHUNK_SIZE = 64 * 1024
+
+
+def _cache_key(name: str) -> str:
+    return MEDIA_EXISTS_CACHE_PREFIX + hashlib.md5(name.encode('utf-8')).hexdigest()
+
+
+_probe_pool = None
+_probe_pool_lock = threading.Lock()
+
+
+def _get_probe_pool() -> ThreadPoolExecutor:
+    global _probe_pool
+    if _probe_pool is None:
+        with _probe_pool_lock:
+            if _probe_pool is None:
+                _probe_pool = ThreadPoolExecutor(
+                    max_workers=settings.MEDIA_PROBE_WORKERS,
+                    thread_name_prefix='media-probe',
+                )
+    return _probe_pool
+
+
+def _shared_client(storage):
+    """
+    The storage's boto3 client, or None for non-S3 storages.
+
+    S3Boto3Storage keeps one boto3 resource per thread; pool threads would each build
+    their own session and connection pool. boto3 clients are thread-safe, so probes
+    reuse the calling thread's client (and its urllib3 pool) instead.
+    """
+    if not hasattr(storage, 'bucket_name'):
+        return None
+    return storage.connection.meta.client
+
+
+def _probe_exists(storage, name: str, client) -> bool:
+    if client is None:
+        return bool(storage.exists(name))
+
+    from storages.utils import clean_name
+
+    try:
+        client.head_object(Bucket=storage.bucket_name, Key=storage._normalize_name(clean_name(name)))
+        return True
+    except Exception as exc:
+        if getattr(exc, 'response', {}).get('ResponseMetadata', {}).get('HTTPStatusCode') == 404:
+            return False
+        raise
+
+
+def probe_exists_many(files, deadline: float = None) -> dict:
+    """
+    {name: bool} for the given FieldFiles, probed concurrently on a bounded pool.
+
+    A page with N missing entries costs about one round-trip instead of N. Probes
+    still running after `deadline` seconds (MEDIA_PROBE_DEADLINE by default) and
+    probes that raised are left out of the result; probes not started by then are
+    cancelled.
+    """
+    if deadline is None:
+        deadline = settings.MEDIA_PROBE_DEADLINE
+
+    unique = {}
+    for f in files:
+        unique.setdefault(f.name, f)
+    if not unique:
+        return {}
+
+    clients = {}
+    futures = {}
+    pool = _get_probe_pool()
+    for name, f in unique.items():
+        storage = f.storage
+        if id(storage) not in clients:
+            try:
+                clients[id(storage)] = _shared_client(storage)
+            except Exception:
+                clients[id(storage)] = None
+        futures[pool.submit(_probe_exists, storage, name, clients[id(storage)])] = name
+
+    done, pending = wait(futures, timeout=deadline)
+    # Probes still queued would only hold pool threads for answers nobody reads.
+    for future in pending:
+        future.cancel()
+    out = {}
+    for future in done:
+        try:
+            out[futures[future]] = future.result()
+        except Exception:
+            pass
+    return out
+
+
+def media_urls(files) -> list:
+    """
+    Public URLs for stored files, '' for empty fields or files missing in storage.
+
+    Existence is remembered in the Django cache for MEDIA_EXISTS_CACHE_TTL seconds,
+    so pages only ask the storage (a HEAD request to R2) on a cache miss. All keys
+    are fetched with one get_many per call and misses are probed concurrently.
+    """
+    files = list(files)
+    names = [getattr(f, 'name', '') if f else '' for f in files]
+    keys = {name: _cache_key(name) for name in names if name}
+    known = cache.get_many(list(keys.values())) if keys else {}
+
+    missing = [f for f, name in zip(files, names) if name and keys[name] not in known]
+    if missing:
+        # Storage errors and timeouts hide the file but are not remembered.
+        fresh = {keys[name]: exists for name, exists in probe_exists_many(missing).items()}
+        if fresh:
+            cache.set_many(fresh, settings.MEDIA_EXISTS_CACHE_TTL)
+            known.update(fresh)
+
+    urls = []
+    for f, name in zip(files, names):
+        urls.append(_safe_url(f) if name and known.get(keys[name]) else '')
+    return urls
+
+
+def media_url(f) -> str:
+    return media_urls([f])[0]
+
+
+def _safe_url(f) -> str:
+    try:
+        return f.url
+    except Exception:
+        return ''
+
+
+def _safe_storage_url(storage, name: str) -> str:
+    try:
+        return storage.url(name)
+    except Exception:
+        return ''
+
+
+def stored_media_urls(objects, field: str, fit: int = None) -> list:
+    """
+    URLs of one file field across MediaMetadataModel objects, '' where the file is missing.
+
+    Uses the availability recorded at upload time; only files that were never checked
+    (rows older than the metadata columns) fall back to the cached storage probe.
+    With `fit` (px), the smallest WebP derivative covering that size is used when
+    the file has one.
+    """
+    objects = list(objects)
+    urls = []
+    unknown = []
+    for i, obj in enumerate(objects):
+        f = getattr(obj, field)
+        state = obj.media_state(field) if f else False
+        if state is None:
+            unknown.append(i)
+            urls.append('')
+        elif not state:
+            urls.append('')
+        else:
+            derivative = pick_derivative(obj.media_meta[field].get('derivatives'), fit) if fit else None
+            urls.append(_safe_storage_url(f.storage, derivative['name']) if derivative else _safe_url(f))
+
+    if unknown:
+        for i, url in zip(unknown, media_urls(getattr(objects[i], field) for i in unknown)):
+            urls[i] = url
+    return urls
+
+
+def _content_type(f, name: str) -> str:
+    return getattr(f, 'content_type', None) or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+
+def upload_metadata(f) -> dict:
+    """size / content_type / sha256 of a FieldFile whose upload has not been stored yet."""
+    upload = f.file
+    digest = hashlib.sha256()
+    for chunk in upload.chunks(CHECKSUM_CHUNK_SIZE):
+        digest.update(chunk)
+    upload.seek(0)
+    return {
+        'size': upload.size,
+        'content_type': _content_type(upload, f.name),
+        'checksum': digest.hexdigest(),
+    }
+
+
+def probe_stored_file(storage, name: str, checksum: bool = True) -> dict:
+    """Metadata of a file already in storage. Storage errors propagate to the caller."""
+    if not storage.exists(name):
+        return {'name': name, 'available': False}
+
+    info = {
+        'name': name,
+        'size': storage.size(name),
+        'content_type': mimetypes.guess_type(name)[0] or 'application/octet-stream',
+        'checksum': None,
+        'available': True,
+    }
+    if checksum:
+        digest = hashlib.sha256()
+        with storage.open(name, 'rb') as fh:
+            for chunk in fh.chunks(CHECKSUM_CHUNK_SIZE):
+                digest.update(chunk)
+        info['checksum'] = digest.hexdigest()
+    return info
+
+
+def invalidate_media(*names) -> None:
+    keys = [_cache_key(name) for name in names if name]
+    if keys:
+        cache.delete_many(keys)
+
+
+def _file_names(instance) -> list:
+    names = []
+    for field in instance._meta.concrete_fields:
+        if isinstance(field, FileField):
+            value = getattr(instance, field.attname, None)
+            name = getattr(value, 'name', value)
+            if name:
+                names.append(name)
+    return names
+
+
+def invalidate_instance_media(sender, instance, **kwargs) -> None:
+    """post_save / post_delete receiver: forget cached existence of the instance's files."""
+    invalidate_media(*_file_names(instance))
+
+
+def delete_instance_derivatives(sender, instance, **kwargs) -> None:
+    """post_delete receiver: remove WebP derivatives recorded for the instance's images."""
+    for field, entry in (getattr(instance, 'media_meta', None) or {}).items():
+        if entry.get('derivatives'):
+            delete_derivatives(instance._meta.get_field(field).storage, entry['derivatives'])
+
+
+def connect_media_signals(app_config) -> None:
+    from django.db.models.signals import post_delete, post_save
+
+    for model in app_config.get_models():
+        if any(isinstance(f, FileField) for f in model._meta.concrete_fields):
+            post_save.connect(invalidate_instance_media, sender=model, dispatch_uid=f'media-cache-save-{model._meta.label}')
+            post_delete.connect(invalidate_instance_media, sender=model, dispatch_uid=f'media-cache-delete-{model._meta.label}')
+        if any(isinstance(f, ImageField) for f in model._meta.concrete_fields):
+            post_delete.connect(
+                delete_instance_derivatives,
+                sender=model,
+                dispatch_uid=f'media-derivatives-delete-{model._meta.label}',
+            )
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-17 22:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounts', '0025_gameresult_max_streak'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserActivityCounters',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('games_total', models.PositiveIntegerField(default=0)),
+                ('math_played', models.PositiveIntegerField(default=0)),
+                ('math_score_sum', models.PositiveIntegerField(default=0)),
+                ('memory_played', models.PositiveIntegerField(default=0)),
+                ('memory_score_sum', models.PositiveIntegerField(default=0)),
+                ('attention_played', models.PositiveIntegerField(default=0)),
+                ('attention_score_sum', models.PositiveIntegerField(default=0)),
+                ('sound_played', models.PositiveIntegerField(default=0)),
+                ('sound_score_sum', models.PositiveIntegerField(default=0)),
+                ('words_played', models.PositiveIntegerField(default=0)),
+                ('words_score_sum', models.PositiveIntegerField(default=0)),
+                ('sentences_played', models.PositiveIntegerField(default=0)),
+                ('sentences_score_sum', models.PositiveIntegerField(default=0)),
+                ('articulation_played', models.PositiveIntegerField(default=0)),
+                ('articulation_score_sum', models.PositiveIntegerField(default=0)),
+                ('story_listens', models.PositiveIntegerField(default=0)),
+                ('stories_listened', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='activity_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Лічильники активності',
+                'verbose_name_plural': 'Лічильники активності',
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-17 22:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounts', '0026_useractivitycounters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameresult',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='gameresult',
+            unique_together={('user', 'idempotency_key')},
+        ),
+    ]
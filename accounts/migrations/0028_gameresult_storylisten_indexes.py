@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-17 22:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0027_gameresult_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gameresult',
+            index=models.Index(fields=['user', 'game_type', 'created_at'], name='gameresult_user_game_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gameresult',
+            index=models.Index(fields=['user', 'created_at'], name='gameresult_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storylisten',
+            index=models.Index(fields=['user', 'story'], name='storylisten_user_story_idx'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 4.2.7 on 2026-10-17 22:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0028_gameresult_storylisten_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='articulationcard',
+            name='media_available',
+            field=models.BooleanField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='articulationcard',
+            name='media_meta',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='articulationcardimage',
+            name='media_available',
+            field=models.BooleanField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='articulationcardimage',
+            name='media_meta',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='coloringpage',
+            name='media_available',
+            field=models.BooleanField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='coloringpage',
+            name='media_meta',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='mystoryimage',
+            name='media_available',
+            field=models.BooleanField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='mystoryimage',
+            name='media_meta',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='soundcard',
+            name='media_available',
+            field=models.BooleanField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='soundcard',
+            name='media_meta',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='specialistactivitystep',
+            name='media_available',
+            field=models.BooleanField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='specialistactivitystep',
+            name='media_meta',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='story',
+            name='media_available',
+            field=models.BooleanField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='story',
+            name='media_meta',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
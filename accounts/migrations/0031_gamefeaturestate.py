@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-17 23:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounts', '0030_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameFeatureState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('game_type', models.CharField(choices=[('math', 'Math'), ('memory', 'Memory'), ('attention', 'Attention'), ('sound', 'Sound'), ('words', 'Words'), ('sentences', 'Sentences'), ('articulation', 'Articulation')], max_length=16)),
+                ('attempts_count', models.PositiveIntegerField(default=0)),
+                ('first_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('last_result_id', models.PositiveBigIntegerField(default=0)),
+                ('recent', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_feature_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Стан ознак ML',
+                'verbose_name_plural': 'Стани ознак ML',
+                'unique_together': {('user', 'game_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-17 23:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounts', '0031_gamefeaturestate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PredictionSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('game_type', models.CharField(choices=[('math', 'Math'), ('memory', 'Memory'), ('attention', 'Attention'), ('sound', 'Sound'), ('words', 'Words'), ('sentences', 'Sentences'), ('articulation', 'Articulation')], max_length=16)),
+                ('predicted_score', models.FloatField()),
+                ('current_score', models.FloatField()),
+                ('confidence', models.FloatField()),
+                ('insight', models.TextField(blank=True)),
+                ('days_to_mastery', models.IntegerField(blank=True, null=True)),
+                ('attempts_to_mastery', models.IntegerField(blank=True, null=True)),
+                ('score_trend', models.FloatField(default=0)),
+                ('analysis_mode', models.CharField(choices=[('model', 'Модель'), ('heuristic', 'Евристика')], default='model', max_length=10)),
+                ('model_version', models.CharField(blank=True, max_length=64)),
+                ('based_on_result_id', models.PositiveBigIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prediction_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Знімок прогнозу',
+                'verbose_name_plural': 'Знімки прогнозів',
+                'ordering': ['-computed_at'],
+                'unique_together': {('user', 'game_type')},
+            },
+        ),
+    ]
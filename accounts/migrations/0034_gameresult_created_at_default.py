@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-17 23:49
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0033_backgroundjob_unique_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gameresult',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
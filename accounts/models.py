@@ -1,11 +1,15 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.utils.deconstruct import deconstructible
 
 import uuid
+from functools import partial
 from pathlib import Path
 
+from .images import delete_derivatives
+from .media import upload_metadata
+
 
 @deconstructible
 class UniqueUploadTo:
@@ -17,6 +21,89 @@ class UniqueUploadTo:
         return f"{self.prefix}/{uuid.uuid4().hex}{suffix}"
 
 
+class MediaMetadataModel(models.Model):
+    """
+    Base for models with uploaded files.
+
+    size / content_type / checksum / available of every file field are recorded in
+    media_meta when the upload is stored, so read views can trust the database instead
+    of asking R2 whether a file exists. New images also queue a 'media.derivatives'
+    job that adds WebP renditions under media_meta[field]['derivatives']; renditions of
+    a replaced file are deleted once the save commits. Rows saved with a file name that
+    was never uploaded through the model stay unknown until
+    `manage.py backfill_media_metadata`.
+    """
+
+    media_meta = models.JSONField(default=dict, blank=True, editable=False)
+    # True: every attached file is stored; False: one is missing; None: not checked yet.
+    media_available = models.BooleanField(null=True, blank=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def media_field_names(cls) -> list:
+        return [f.name for f in cls._meta.concrete_fields if isinstance(f, models.FileField)]
+
+    def media_state(self, field: str):
+        f = getattr(self, field)
+        entry = (self.media_meta or {}).get(field)
+        if not f or not entry or entry.get('name') != f.name:
+            return None
+        return bool(entry.get('available'))
+
+    def _drop_media_entry(self, meta: dict, field: str, stale: list) -> None:
+        entry = meta.pop(field, None)
+        if entry and entry.get('derivatives'):
+            stale.append((getattr(self, field).storage, entry['derivatives']))
+
+    def refresh_media_available(self) -> None:
+        states = [self.media_state(name) for name in self.media_field_names() if getattr(self, name)]
+        if any(state is None for state in states):
+            self.media_available = None
+        else:
+            self.media_available = all(states)
+
+    def save(self, *args, **kwargs):
+        meta = dict(self.media_meta or {})
+        new_images = []
+        stale = []
+        for name in self.media_field_names():
+            f = getattr(self, name)
+            if not f:
+                meta.pop(name, None)
+            elif not f._committed:
+                info = upload_metadata(f)
+                # Store now (FileField.pre_save would do it anyway) so the final name is known.
+                f.save(f.name, f.file, save=False)
+                self._drop_media_entry(meta, name, stale)
+                meta[name] = {'name': f.name, **info, 'available': True}
+                if isinstance(f.field, models.ImageField):
+                    new_images.append(name)
+            elif meta.get(name, {}).get('name') != f.name:
+                self._drop_media_entry(meta, name, stale)
+        self.media_meta = meta
+        self.refresh_media_available()
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'media_meta', 'media_available'}
+        super().save(*args, **kwargs)
+
+        for storage, derivatives in stale:
+            # Only once the row no longer points at them; a rolled-back save keeps them.
+            transaction.on_commit(partial(delete_derivatives, storage, derivatives))
+
+        if new_images:
+            from .jobs import enqueue
+
+            for name in new_images:
+                enqueue(
+                    'media.derivatives',
+                    {'model': self._meta.label, 'pk': self.pk, 'field': name, 'name': meta[name]['name']},
+                )
+
+
 class ChildProfile(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='child_profile')
     stars = models.PositiveIntegerField(default=0)
@@ -118,10 +205,21 @@ class GameResult(models.Model):
     duration_seconds = models.PositiveIntegerField(null=True, blank=True)
     details = models.JSONField(default=dict, blank=True)
 
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Client-generated key, sent with the first POST and reused by offline replays.
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
+
+    # When the game was played: the client's played_at (clamped) or the insert time.
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         ordering = ['created_at']
+        unique_together = (('user', 'idempotency_key'),)
+        indexes = [
+            # Per-child history of one game (stats, predictions, ML extraction).
+            models.Index(fields=['user', 'game_type', 'created_at'], name='gameresult_user_game_time_idx'),
+            # Per-child timeline and the specialist dashboard date range.
+            models.Index(fields=['user', 'created_at'], name='gameresult_user_time_idx'),
+        ]
         verbose_name = 'Результат гри'
         verbose_name_plural = 'Результати ігор'
 
@@ -129,7 +227,7 @@ class GameResult(models.Model):
         return f"GameResult({self.user.username}, {self.game_type}, {self.score})"
 
 
-class SoundCard(models.Model):
+class SoundCard(MediaMetadataModel):
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -154,7 +252,7 @@ class SoundCard(models.Model):
         return f"SoundCard({self.title})"
 
 
-class ArticulationCard(models.Model):
+class ArticulationCard(MediaMetadataModel):
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -180,7 +278,7 @@ class ArticulationCard(models.Model):
         return f"ArticulationCard({self.title})"
 
 
-class ArticulationCardImage(models.Model):
+class ArticulationCardImage(MediaMetadataModel):
     card = models.ForeignKey(
         ArticulationCard,
         on_delete=models.CASCADE,
@@ -198,7 +296,7 @@ class ArticulationCardImage(models.Model):
         return f"ArticulationCardImage({self.card_id})"
 
 
-class Story(models.Model):
+class Story(MediaMetadataModel):
     class ContentType(models.TextChoices):
         TEXT = 'text', 'Text'
         PDF = 'pdf', 'PDF'
@@ -248,6 +346,10 @@ class StoryListen(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # First-listen detection in record_story_listen.
+            models.Index(fields=['user', 'story'], name='storylisten_user_story_idx'),
+        ]
         verbose_name = 'Прослуховування казки'
         verbose_name_plural = 'Прослуховування казок'
 
@@ -255,7 +357,7 @@ class StoryListen(models.Model):
         return f"StoryListen({self.user.username}, {self.story_id})"
 
 
-class MyStoryImage(models.Model):
+class MyStoryImage(MediaMetadataModel):
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -329,7 +431,7 @@ class SpecialistActivity(models.Model):
         return f"SpecialistActivity({self.title})"
 
 
-class SpecialistActivityStep(models.Model):
+class SpecialistActivityStep(MediaMetadataModel):
     activity = models.ForeignKey(
         SpecialistActivity,
         on_delete=models.CASCADE,
@@ -451,7 +553,7 @@ class SpecialistStudentNote(models.Model):
         return f"SpecialistStudentNote({self.specialist.user.username} → {self.student.user.username})"
 
 
-class ColoringPage(models.Model):
+class ColoringPage(MediaMetadataModel):
     class FileType(models.TextChoices):
         IMAGE = 'image', 'Image'
         PDF = 'pdf', 'PDF'
@@ -477,3 +579,194 @@ class ColoringPage(models.Model):
 
     def __str__(self) -> str:
         return f"ColoringPage({self.title})"
+
+
+class UserActivityCounters(models.Model):
+    """
+    Running per-user totals, updated together with every GameResult / StoryListen
+    insert so badge checks and stats read one row instead of the full history.
+    Rebuild with `manage.py rebuild_activity_counters` if it ever drifts.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='activity_counters',
+    )
+
+    games_total = models.PositiveIntegerField(default=0)
+
+    math_played = models.PositiveIntegerField(default=0)
+    math_score_sum = models.PositiveIntegerField(default=0)
+    memory_played = models.PositiveIntegerField(default=0)
+    memory_score_sum = models.PositiveIntegerField(default=0)
+    attention_played = models.PositiveIntegerField(default=0)
+    attention_score_sum = models.PositiveIntegerField(default=0)
+    sound_played = models.PositiveIntegerField(default=0)
+    sound_score_sum = models.PositiveIntegerField(default=0)
+    words_played = models.PositiveIntegerField(default=0)
+    words_score_sum = models.PositiveIntegerField(default=0)
+    sentences_played = models.PositiveIntegerField(default=0)
+    sentences_score_sum = models.PositiveIntegerField(default=0)
+    articulation_played = models.PositiveIntegerField(default=0)
+    articulation_score_sum = models.PositiveIntegerField(default=0)
+
+    story_listens = models.PositiveIntegerField(default=0)
+    stories_listened = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Лічильники активності'
+        verbose_name_plural = 'Лічильники активності'
+
+    def __str__(self) -> str:
+        return f"UserActivityCounters({self.user_id}, {self.games_total})"
+
+    @staticmethod
+    def played_field(game_type: str) -> str:
+        return f"{game_type}_played"
+
+    @staticmethod
+    def score_sum_field(game_type: str) -> str:
+        return f"{game_type}_score_sum"
+
+    def played(self, game_type: str) -> int:
+        return getattr(self, self.played_field(game_type))
+
+    def average_score(self, game_type: str) -> int:
+        played = self.played(game_type)
+        if not played:
+            return 0
+        return int(round(getattr(self, self.score_sum_field(game_type)) / played))
+
+
+class GameFeatureState(models.Model):
+    """
+    Rolling ML feature state per (user, game type), updated together with every
+    GameResult insert so predictions read one row instead of the full history
+    (see accounts.feature_store). Rebuild with `manage.py rebuild_feature_store`.
+    """
+
+    # Results kept in `recent`; predictions with a larger window fall back to the history.
+    WINDOW_CAPACITY = 10
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='game_feature_states',
+    )
+    game_type = models.CharField(max_length=16, choices=GameResult.GameType.choices)
+
+    attempts_count = models.PositiveIntegerField(default=0)
+    first_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_result_id = models.PositiveBigIntegerField(default=0)
+    # Oldest first: [score, duration_seconds, hints_used, successful_attempts,
+    # failed_attempts, max_streak, time_of_day, created_at (epoch microseconds)].
+    recent = models.JSONField(default=list, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (('user', 'game_type'),)
+        verbose_name = 'Стан ознак ML'
+        verbose_name_plural = 'Стани ознак ML'
+
+    def __str__(self) -> str:
+        return f"GameFeatureState({self.user_id}, {self.game_type}, {self.attempts_count})"
+
+
+class PredictionSnapshot(models.Model):
+    """
+    Precomputed model prediction per (child, game type), written by
+    `manage.py snapshot_predictions`. predict_performance serves it while no newer
+    GameResult exists (based_on_result_id), the model that scored it is still the
+    loaded one (model_version) and it is not older than PREDICTION_SNAPSHOT_MAX_AGE
+    hours. Heuristic predictions are not stored.
+    """
+
+    class Mode(models.TextChoices):
+        MODEL = 'model', 'Модель'
+        HEURISTIC = 'heuristic', 'Евристика'
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='prediction_snapshots',
+    )
+    game_type = models.CharField(max_length=16, choices=GameResult.GameType.choices)
+
+    predicted_score = models.FloatField()
+    current_score = models.FloatField()
+    confidence = models.FloatField()
+    insight = models.TextField(blank=True)
+    days_to_mastery = models.IntegerField(null=True, blank=True)
+    attempts_to_mastery = models.IntegerField(null=True, blank=True)
+    score_trend = models.FloatField(default=0)
+
+    analysis_mode = models.CharField(max_length=10, choices=Mode.choices, default=Mode.MODEL)
+    model_version = models.CharField(max_length=64, blank=True)
+    based_on_result_id = models.PositiveBigIntegerField(default=0)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = (('user', 'game_type'),)
+        ordering = ['-computed_at']
+        verbose_name = 'Знімок прогнозу'
+        verbose_name_plural = 'Знімки прогнозів'
+
+    def __str__(self) -> str:
+        return f"PredictionSnapshot({self.user_id}, {self.game_type}, {self.predicted_score})"
+
+
+class BackgroundJob(models.Model):
+    """
+    A unit of deferred work for `manage.py run_worker` (see accounts.jobs).
+
+    Workers claim due rows with SELECT ... FOR UPDATE SKIP LOCKED, so several can
+    run against the same Postgres without a broker.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'В черзі'
+        RUNNING = 'running', 'Виконується'
+        DONE = 'done', 'Виконано'
+        FAILED = 'failed', 'Помилка'
+
+    name = models.CharField(max_length=80)
+    payload = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=120, blank=True)
+    last_error = models.TextField(blank=True)
+    result = models.JSONField(null=True, blank=True)
+
+    # At most one queued or running job per key (enqueue(unique=True / unique_key=...)).
+    unique_key = models.CharField(max_length=120, null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Worker claim query: due queued jobs, oldest first.
+            models.Index(fields=['status', 'run_after'], name='backgroundjob_status_due_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['unique_key'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='backgroundjob_pending_unique_key',
+            ),
+        ]
+        verbose_name = 'Фонове завдання'
+        verbose_name_plural = 'Фонові завдання'
+
+    def __str__(self) -> str:
+        return f"BackgroundJob({self.name}, {self.status})"
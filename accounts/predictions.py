@@ -0,0 +1,362 @@
+"""
+Prediction helpers shared by the prediction API views and `snapshot_predictions`.
+
+score_pairs() predicts many (user, game type) pairs at once: histories come from
+one windowed query, and each model scores all its pairs with one predict_many()
+call (one feature-store query, one model call). It never trains; games without
+a saved model get the heuristic prediction.
+"""
+
+from datetime import timedelta
+from typing import TYPE_CHECKING, Type
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import F, Max, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .jobs import BACKLOG_AFTER, enqueue
+from .models import BackgroundJob, GameResult, PredictionSnapshot
+
+if TYPE_CHECKING:
+    from ml_services import ProgressPredictor
+
+logger = logging.getLogger(__name__)
+
+PREDICTION_GAME_TYPES = (
+    GameResult.GameType.MATH,
+    GameResult.GameType.ATTENTION,
+    GameResult.GameType.SOUND,
+    GameResult.GameType.WORDS,
+    GameResult.GameType.SENTENCES,
+    GameResult.GameType.ARTICULATION,
+)
+PREDICTION_HISTORY_FIELDS = ('score', 'raw_score', 'max_score', 'duration_seconds', 'details', 'created_at')
+PREDICTION_HISTORY_LIMIT = 100
+# Below this many results the API answers with the heuristic instead of the model.
+PREDICTION_MIN_HISTORY_FOR_ML = 10
+# A model whose training finished or failed this recently is not queued again.
+MODEL_TRAINING_COOLDOWN = timedelta(minutes=15)
+
+
+def prediction_history(recent_results):
+    """Recent activity history for UI display, from newest-first PREDICTION_HISTORY_FIELDS rows."""
+    def to_non_negative_int(value, default=0):
+        try:
+            parsed = int(value)
+            return parsed if parsed >= 0 else default
+        except (TypeError, ValueError):
+            return default
+
+    def resolve_attempts(item):
+        details = item.get('details') or {}
+        if not isinstance(details, dict):
+            details = {}
+
+        failed_attempts = to_non_negative_int(details.get('failed_attempts'), 0)
+
+        if details.get('successful_attempts') is not None:
+            successful_attempts = to_non_negative_int(details.get('successful_attempts'), 0)
+        elif details.get('rating_stars') is not None:
+            rating_stars = to_non_negative_int(details.get('rating_stars'), 0)
+            successful_attempts = 1 if rating_stars >= 3 else 0
+            if failed_attempts == 0 and rating_stars <= 2:
+                failed_attempts = 1
+        elif item.get('raw_score') is not None:
+            successful_attempts = to_non_negative_int(item.get('raw_score'), 0)
+        elif item.get('max_score') is not None and item.get('score') is not None:
+            max_score = to_non_negative_int(item.get('max_score'), 0)
+            successful_attempts = to_non_negative_int(round(max_score * (float(item.get('score')) / 100.0)), 0)
+        else:
+            successful_attempts = 1 if to_non_negative_int(item.get('score'), 0) >= 70 else 0
+
+        return successful_attempts, failed_attempts
+
+    history = [
+        {
+            'score': float(item['score']) if item['score'] is not None else None,
+            'duration_seconds': int(item['duration_seconds'] or 0),
+            'successful_attempts': resolve_attempts(item)[0],
+            'failed_attempts': resolve_attempts(item)[1],
+            'created_at': item['created_at'].isoformat() if item['created_at'] else None,
+        }
+        for item in recent_results
+    ]
+    history.reverse()
+    return history
+
+
+def build_heuristic_prediction(history, helpers: Type['ProgressPredictor'], activity_type: str, window_size: int = 3):
+    """
+    Build a heuristic prediction when training data is insufficient. `helpers` is
+    the ProgressPredictor class: its insight and mastery helpers need no model, so
+    no predictor (nor its ML libraries) is built for this.
+    """
+    scores = [item['score'] for item in history if item.get('score') is not None]
+    if not scores:
+        return None
+
+    current_score = scores[-1]
+    window_size = min(len(scores), window_size)
+    window_scores = scores[-window_size:]
+    avg_score = sum(window_scores) / window_size
+    score_trend = scores[-1] - scores[-2] if len(scores) > 1 else 0.0
+
+    predicted_score = avg_score + score_trend
+    if current_score >= 90 and score_trend >= 0:
+        predicted_score = max(predicted_score, current_score - 15)
+
+    predicted_score = max(0.0, min(100.0, predicted_score))
+
+    if len(window_scores) > 1:
+        mean = sum(window_scores) / len(window_scores)
+        variance = sum((value - mean) ** 2 for value in window_scores) / len(window_scores)
+        std_dev = variance ** 0.5
+        confidence = max(0.0, min(100.0, 100 - (std_dev * 2)))
+    else:
+        confidence = 50.0
+
+    created_dates = [parse_datetime(item['created_at']) for item in history]
+    created_dates = [value for value in created_dates if value is not None]
+    if len(created_dates) >= 2:
+        days_since_start = (created_dates[-1] - created_dates[0]).total_seconds() / 86400
+    else:
+        days_since_start = 0.0
+
+    days_to_mastery, attempts_to_mastery = helpers._estimate_mastery(
+        current_score=current_score,
+        predicted_score=predicted_score,
+        score_trend=score_trend,
+        days_since_start=days_since_start,
+        attempt_number=len(scores) + 1,
+        mastery_threshold=90,
+    )
+
+    insight = helpers._generate_insight(
+        predicted_score=predicted_score,
+        current_score=current_score,
+        score_trend=score_trend,
+        game_type=activity_type,
+    )
+
+    return {
+        'predicted_score': round(predicted_score, 1),
+        'current_score': round(current_score, 1),
+        'confidence': round(confidence, 1),
+        'insight': insight,
+        'days_to_mastery': days_to_mastery,
+        'attempts_to_mastery': attempts_to_mastery,
+        'score_trend': round(score_trend, 2),
+    }
+
+
+def prediction_entry(prediction: dict, user_id: int, username: str, game_type: str, history=None) -> dict:
+    """A prediction (or error) as the prediction APIs return it: who and which game it is for, plus the history."""
+    entry = {'user_id': user_id, 'username': username, 'game_type': game_type, **prediction}
+    if history is not None:
+        entry['history'] = history
+    return entry
+
+
+def display_name(user_id: int) -> str:
+    """The child's first name (or username) shown next to a prediction."""
+    user = get_user_model().objects.filter(id=user_id).only('username', 'first_name').first()
+    return (user.first_name or user.username) if user else f"Користувач №{user_id}"
+
+
+def enqueue_model_training(game_type: str):
+    """
+    Queue training of the model that scores `game_type`: the all-games model when
+    ML_UNIFIED_MODEL is on. Joins the pending job for that model if there is one,
+    so each model has at most one training run queued or running, and returns the
+    last finished (or failed) job instead while it is within MODEL_TRAINING_COOLDOWN.
+    """
+    target = None if getattr(settings, 'ML_UNIFIED_MODEL', True) else game_type
+    unique_key = f'ml.train:xgboost:{target or "all"}'
+    recent = (
+        BackgroundJob.objects
+        .filter(
+            unique_key=unique_key,
+            status__in=[BackgroundJob.Status.DONE, BackgroundJob.Status.FAILED],
+            updated_at__gte=timezone.now() - MODEL_TRAINING_COOLDOWN,
+        )
+        .order_by('-updated_at')
+        .first()
+    )
+    if recent is not None:
+        return recent
+    job = enqueue(
+        'ml.train',
+        {'game_type': target, 'model_type': 'xgboost', 'window_size': 3, 'min_entries': 3},
+        unique_key=unique_key,
+    )
+    if job.status == BackgroundJob.Status.QUEUED and job.run_after < timezone.now() - BACKLOG_AFTER:
+        # Only `manage.py run_worker` runs it; until then every game is scored by the heuristic.
+        logger.warning(
+            f"Training job {job.id} for {unique_key} has been queued since {job.run_after}; is run_worker running?"
+        )
+    return job
+
+
+def recent_histories(user_ids, game_types) -> dict:
+    """{(user_id, game_type): history} for the last PREDICTION_HISTORY_LIMIT results of every pair, in one query."""
+    recent_rows = (
+        GameResult.objects
+        .filter(user_id__in=user_ids, game_type__in=game_types)
+        .annotate(recent_rank=Window(
+            RowNumber(),
+            partition_by=[F('user_id'), F('game_type')],
+            order_by=F('created_at').desc(),
+        ))
+        .filter(recent_rank__lte=PREDICTION_HISTORY_LIMIT)
+        .order_by('user_id', 'game_type', '-created_at')
+        .values('user_id', 'game_type', *PREDICTION_HISTORY_FIELDS)
+    )
+    recent_by_pair = {}
+    for row in recent_rows:
+        recent_by_pair.setdefault((row['user_id'], row['game_type']), []).append(row)
+    return {pair: prediction_history(rows) for pair, rows in recent_by_pair.items()}
+
+
+def score_pairs(pairs, histories: dict = None):
+    """
+    Predict every (user_id, game_type) pair. Returns (results, errors): results maps
+    a pair to the prediction fields plus `model_info`, errors maps a pair to a
+    user-facing message.
+    """
+    from ml_services import ProgressPredictor, model_registry
+
+    pairs = list(dict.fromkeys(pairs))
+    game_types = list(dict.fromkeys(game_type for _, game_type in pairs))
+    if histories is None:
+        histories = recent_histories({user_id for user_id, _ in pairs}, game_types)
+
+    predictors = {game_type: model_registry.get_for_game('xgboost', game_type, 3) for game_type in game_types}
+
+    ml_pairs = [
+        pair for pair in pairs
+        if predictors[pair[1]] is not None and len(histories.get(pair, [])) >= PREDICTION_MIN_HISTORY_FOR_ML
+    ]
+    # One predict_many() per model: the all-games model scores every game type at once.
+    pairs_by_model = {}
+    for pair in ml_pairs:
+        pairs_by_model.setdefault(id(predictors[pair[1]]), (predictors[pair[1]], []))[1].append(pair)
+    results = {}
+    for predictor, model_pairs in pairs_by_model.values():
+        for pair, prediction in predictor.predict_many(model_pairs).items():
+            if prediction is None:
+                continue
+            prediction['model_info'] = {
+                'model_trained': False,
+                'model_loaded': True,
+                'model_version': predictor.model_version,
+            }
+            results[pair] = prediction
+
+    errors = {}
+    for pair in pairs:
+        if pair in results:
+            continue
+        game_type = pair[1]
+        history = histories.get(pair, [])
+        if predictors[game_type] is not None and len(history) >= PREDICTION_MIN_HISTORY_FOR_ML:
+            errors[pair] = 'Неможливо зробити прогноз'
+            continue
+        heuristic = build_heuristic_prediction(history, ProgressPredictor, game_type)
+        if heuristic is None:
+            errors[pair] = 'Недостатньо даних для аналізу'
+            continue
+        heuristic['model_info'] = {
+            'model_trained': False,
+            'model_loaded': predictors[game_type] is not None,
+            'analysis_mode': 'heuristic',
+        }
+        results[pair] = heuristic
+    return results, errors
+
+
+SNAPSHOT_FIELDS = (
+    'predicted_score', 'current_score', 'confidence', 'insight',
+    'days_to_mastery', 'attempts_to_mastery', 'score_trend',
+)
+
+
+def latest_result_ids(user_ids, game_types) -> dict:
+    return {
+        (row['user_id'], row['game_type']): row['last_id']
+        for row in GameResult.objects.filter(user_id__in=user_ids, game_type__in=game_types)
+        .values('user_id', 'game_type')
+        .annotate(last_id=Max('id'))
+        .order_by()
+    }
+
+
+def store_snapshots(results: dict, last_ids: dict, batch_size: int = 500) -> int:
+    """
+    Upsert PredictionSnapshot rows from the model predictions in score_pairs()
+    results. Returns rows written. Heuristic results are not stored: served from a
+    snapshot they would keep the API from queueing training, and would outlive the
+    next published model.
+    """
+    now = timezone.now()
+    rows = []
+    for (user_id, game_type), prediction in results.items():
+        model_info = prediction['model_info']
+        if model_info.get('analysis_mode') == 'heuristic':
+            continue
+        rows.append(PredictionSnapshot(
+            user_id=user_id,
+            game_type=game_type,
+            analysis_mode=PredictionSnapshot.Mode.MODEL,
+            model_version=model_info['model_version'],
+            based_on_result_id=last_ids.get((user_id, game_type), 0),
+            computed_at=now,
+            **{name: prediction[name] for name in SNAPSHOT_FIELDS},
+        ))
+    PredictionSnapshot.objects.bulk_create(
+        rows,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['user', 'game_type'],
+        update_fields=[
+            *SNAPSHOT_FIELDS, 'analysis_mode', 'model_version', 'based_on_result_id', 'computed_at',
+        ],
+    )
+    return len(rows)
+
+
+def fresh_snapshot(user_id: int, game_type: str, model_version: str):
+    """
+    The stored snapshot when it was scored by the model `model_version` (the one
+    loaded now), already covers the pair's latest GameResult and is younger than
+    PREDICTION_SNAPSHOT_MAX_AGE hours; otherwise None.
+    """
+    snapshot = PredictionSnapshot.objects.filter(
+        user_id=user_id,
+        game_type=game_type,
+        analysis_mode=PredictionSnapshot.Mode.MODEL,
+        model_version=model_version,
+        computed_at__gte=timezone.now() - timedelta(hours=settings.PREDICTION_SNAPSHOT_MAX_AGE),
+    ).first()
+    if snapshot is None:
+        return None
+    last_id = (
+        GameResult.objects.filter(user_id=user_id, game_type=game_type)
+        .aggregate(last_id=Max('id'))['last_id'] or 0
+    )
+    return snapshot if snapshot.based_on_result_id == last_id else None
+
+
+def snapshot_prediction(snapshot) -> dict:
+    """The predict_performance fields for a stored snapshot."""
+    prediction = {name: getattr(snapshot, name) for name in SNAPSHOT_FIELDS}
+    prediction['model_info'] = {
+        'model_trained': False,
+        'model_loaded': True,
+        'model_version': snapshot.model_version,
+        'snapshot_at': snapshot.computed_at.isoformat(),
+    }
+    return prediction
@@ -0,0 +1,84 @@
+"""Background job handlers (see accounts.jobs). Imported by AccountsConfig.ready()."""
+
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+
+from .images import build_stored_derivatives, delete_derivatives
+from .jobs import job_handler
+from .models import SpecialistInvite
+
+
+@job_handler('media.derivatives')
+def build_media_derivatives(model: str, pk: int, field: str, name: str):
+    """Render WebP derivatives for an uploaded image and record them in media_meta."""
+    model_cls = apps.get_model(model)
+    obj = model_cls.objects.filter(pk=pk).only('pk', field, 'media_meta').first()
+    if obj is None or getattr(obj, field).name != name:
+        return {'skipped': 'replaced'}
+
+    storage = getattr(obj, field).storage
+    derivatives = build_stored_derivatives(storage, name)
+
+    with transaction.atomic():
+        obj = model_cls.objects.select_for_update().filter(pk=pk).only('pk', field, 'media_meta').first()
+        entry = (obj.media_meta or {}).get(field) if obj else None
+        if not entry or entry.get('name') != name:
+            # Replaced or deleted while rendering.
+            delete_derivatives(storage, derivatives)
+            return {'skipped': 'replaced'}
+        obj.media_meta[field] = {**entry, 'derivatives': derivatives}
+        model_cls.objects.filter(pk=pk).update(media_meta=obj.media_meta)
+
+    return {kind: d['name'] for kind, d in derivatives.items()}
+
+
+@job_handler('ml.train')
+def train_progress_model(game_type: str = None, model_type: str = 'xgboost', window_size: int = 3, min_entries: int = 3):
+    """
+    Train and save one model; game_type=None is the all-games model. Too little
+    data is not retried: the job finishes as skipped until more games are played.
+    """
+    from ml_services import ProgressPredictor
+    from ml_services.data_extractor import InsufficientDataError
+    from ml_services.locks import model_training_lock
+    from ml_services.training import plan_workers
+
+    with model_training_lock(settings.ML_MODEL_DIR, model_type, game_type) as acquired:
+        if not acquired:
+            # Another process on this host is training the same model right now.
+            return {'skipped': 'training_in_progress'}
+        predictor = ProgressPredictor(model_type=model_type, model_dir=settings.ML_MODEL_DIR, window_size=window_size)
+        if model_type == 'xgboost':
+            # Not every core (XGBoost's n_jobs=-1): the web processes share this host.
+            cpus = settings.ML_TRAINING_CPUS or max(1, (os.cpu_count() or 1) // 2)
+            _processes, n_jobs = plan_workers(1, cpu_count=cpus)
+            predictor.model.set_params(n_jobs=n_jobs)
+        try:
+            metrics = predictor.train(game_type=game_type, min_entries=min_entries)
+        except InsufficientDataError as e:
+            return {'skipped': 'insufficient_data', 'detail': str(e)}
+        predictor.save(game_type=game_type)
+    return {key: float(value) for key, value in metrics.items()}
+
+
+@job_handler('invites.send_email')
+def send_specialist_invite_email(invite_id: int, invite_url: str):
+    invite = SpecialistInvite.objects.filter(id=invite_id).first()
+    if not invite or not invite.email:
+        return {'skipped': 'no_email'}
+
+    subject = 'Запрошення для реєстрації спеціаліста — IncludoLand'
+    body = (
+        'Вітаємо!\n\n'
+        'Вас запросили зареєструватися як спеціаліст у IncludoLand.\n'
+        'Перейдіть за посиланням (одноразове):\n'
+        f"{invite_url}\n\n"
+        'Якщо ви не очікували цього листа — просто проігноруйте його.\n'
+    )
+    # Raises on SMTP errors so the job is retried.
+    send_mail(subject, body, None, [invite.email], fail_silently=False)
+    return {'sent_to': invite.email}
@@ -0,0 +1,1183 @@
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from PIL import Image
+
+from .badges import sync_badges
+from .counters import get_activity_counters, rebuild_activity_counters
+from .feature_store import rebuild_feature_store, user_window_features
+from .jobs import enqueue, job_handler, run_pending_jobs
+from .media import media_urls, probe_exists_many, stored_media_urls
+from .models import BackgroundJob, ColoringPage, GameFeatureState, GameResult, PredictionSnapshot, SoundCard, Story, StoryListen, UserActivityCounters, UserBadge
+
+
+class BadgeEngineTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='kid', password='pass12345')
+
+    def _play(self, game_type: str, times: int):
+        GameResult.objects.bulk_create(
+            [GameResult(user=self.user, game_type=game_type, score=80) for _ in range(times)]
+        )
+
+    def test_awards_every_crossed_threshold(self):
+        self._play(GameResult.GameType.MATH, 20)
+        self._play(GameResult.GameType.MEMORY, 5)
+
+        unlocked = sync_badges(self.user)
+
+        self.assertEqual(unlocked, {'first_game', 'math_5', 'math_20', 'memory_5', 'all_games_25'})
+        self.assertEqual(set(UserBadge.objects.filter(user=self.user).values_list('code', flat=True)), unlocked)
+
+    def test_stories_count_distinct_listens(self):
+        author = User.objects.create_user(username='author', password='pass12345')
+        stories = [Story.objects.create(created_by=author, title=f's{i}', text='t') for i in range(3)]
+        for story in stories + stories:
+            StoryListen.objects.create(user=self.user, story=story)
+
+        self.assertEqual(sync_badges(self.user, metrics={'stories'}), {'stories_3'})
+
+    def test_game_sync_query_count(self):
+        for game_type in GameResult.GameType.values:
+            self._play(game_type, 5)
+
+        rebuild_activity_counters([self.user.pk])
+
+        # Counters row + held codes + one bulk insert.
+        with self.assertNumQueries(3):
+            sync_badges(self.user, metrics={'games'})
+
+        # Nothing new to award: no insert.
+        with self.assertNumQueries(2):
+            sync_badges(self.user, metrics={'games'})
+
+    def test_record_game_result_awards_badges(self):
+        self._play(GameResult.GameType.WORDS, 4)
+        self.client.force_login(self.user)
+
+        response = self.client.post(
+            '/api/game-results/',
+            data={'game_type': 'words', 'score': 100},
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(UserBadge.objects.filter(user=self.user, code='words_5').exists())
+
+
+class ActivityCountersTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='kid', password='pass12345')
+        self.client.force_login(self.user)
+
+    def test_seeded_from_history_on_first_use(self):
+        GameResult.objects.create(user=self.user, game_type=GameResult.GameType.MATH, score=40)
+        GameResult.objects.create(user=self.user, game_type=GameResult.GameType.MATH, score=61)
+
+        counters = get_activity_counters(self.user)
+
+        self.assertEqual(counters.games_total, 2)
+        self.assertEqual(counters.math_played, 2)
+        self.assertEqual(counters.average_score(GameResult.GameType.MATH), 50)
+
+    def test_updated_on_write_and_matches_rebuild(self):
+        author = User.objects.create_user(username='author', password='pass12345')
+        story = Story.objects.create(created_by=author, title='s', text='t')
+
+        for score in (30, 90):
+            self.client.post('/api/game-results/', data={'game_type': 'sound', 'score': score}, content_type='application/json')
+        for _ in range(2):
+            self.client.post('/api/story-listens/', data={'story_id': story.id}, content_type='application/json')
+
+        counters = UserActivityCounters.objects.get(user=self.user)
+        self.assertEqual((counters.sound_played, counters.sound_score_sum), (2, 120))
+        self.assertEqual((counters.story_listens, counters.stories_listened), (2, 1))
+
+        UserActivityCounters.objects.filter(user=self.user).update(sound_played=0, story_listens=0)
+        rebuild_activity_counters()
+        rebuilt = UserActivityCounters.objects.get(user=self.user)
+        self.assertEqual((rebuilt.sound_played, rebuilt.sound_score_sum, rebuilt.games_total), (2, 120, 2))
+        self.assertEqual((rebuilt.story_listens, rebuilt.stories_listened), (2, 1))
+
+
+class GameResultsBatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='kid', password='pass12345')
+        self.client.force_login(self.user)
+
+    def _post(self, results):
+        return self.client.post(
+            '/api/game-results/batch/',
+            data={'results': results},
+            content_type='application/json',
+        )
+
+    def test_replay_does_not_double_count(self):
+        batch = [
+            {'idempotency_key': 'a', 'game_type': 'math', 'score': 100},
+            {'idempotency_key': 'b', 'game_type': 'memory', 'score': 40},
+            {'idempotency_key': 'c', 'game_type': 'math', 'score': 500},
+        ]
+
+        first = self._post(batch).json()
+        self.assertEqual(first['accepted'], ['a', 'b'])
+        self.assertEqual(first['rejected'], [{'index': 2, 'idempotency_key': 'c', 'error': 'invalid_score'}])
+        self.assertEqual(first['stars_earned'], 7)
+
+        second = self._post(batch).json()
+        self.assertEqual(second['accepted'], [])
+        self.assertEqual(second['duplicates'], ['a', 'b'])
+        self.assertEqual(second['stars_earned'], 0)
+        self.assertEqual(second['stars_total'], 7)
+
+        self.assertEqual(GameResult.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(UserActivityCounters.objects.get(user=self.user).games_total, 2)
+        self.assertTrue(UserBadge.objects.filter(user=self.user, code='first_game').exists())
+
+    def test_online_send_and_replay_share_the_key(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        played_at = timezone.now() - timedelta(hours=3)
+        result = {'idempotency_key': 'k1', 'game_type': 'math', 'score': 100, 'played_at': played_at.isoformat()}
+        first = self.client.post('/api/game-results/', data=result, content_type='application/json').json()
+        self.assertEqual(first['stars_earned'], 5)
+
+        # The response was lost: the same result is sent again, then replayed from the queue.
+        again = self.client.post('/api/game-results/', data=result, content_type='application/json').json()
+        self.assertEqual((again['id'], again['duplicate'], again['stars_earned']), (first['id'], True, 0))
+        replay = self._post([result]).json()
+        self.assertEqual((replay['accepted'], replay['duplicates'], replay['stars_total']), ([], ['k1'], 5))
+
+        stored = GameResult.objects.get(user=self.user)
+        self.assertEqual(stored.created_at, played_at)
+        self.assertEqual(UserActivityCounters.objects.get(user=self.user).games_total, 1)
+
+        # played_at is clamped to [now - 30 days, now]; garbage is rejected.
+        future = {'game_type': 'math', 'score': 50, 'played_at': (timezone.now() + timedelta(days=2)).isoformat()}
+        response = self.client.post('/api/game-results/', data=future, content_type='application/json')
+        self.assertLessEqual(GameResult.objects.get(id=response.json()['id']).created_at, timezone.now())
+        bad = {'game_type': 'math', 'score': 50, 'played_at': 'yesterday'}
+        response = self.client.post('/api/game-results/', data=bad, content_type='application/json')
+        self.assertEqual(response.json()['error'], 'invalid_played_at')
+
+    def test_backdated_replay_keeps_feature_order(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        now = timezone.now()
+        for hours, score in ((1, 60), (3, 20)):
+            self.client.post(
+                '/api/game-results/',
+                data={'game_type': 'math', 'score': score, 'played_at': (now - timedelta(hours=hours)).isoformat()},
+                content_type='application/json',
+            )
+        state = GameFeatureState.objects.get(user=self.user, game_type='math')
+        self.assertEqual([entry[0] for entry in state.recent], [20, 60])
+
+    def test_missing_key_is_rejected(self):
+        response = self._post([{'game_type': 'math', 'score': 80}])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['rejected'][0]['error'], 'invalid_idempotency_key')
+        self.assertFalse(GameResult.objects.filter(user=self.user).exists())
+
+
+class MediaExistsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(username='author', password='pass12345')
+        self.page = ColoringPage.objects.create(created_by=author, title='p', file='coloring/pages/p.png')
+        self.storage = ColoringPage._meta.get_field('file').storage
+        # Probe through storage.exists() instead of the shared boto3 client.
+        patcher = mock.patch('accounts.media._shared_client', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_existence_is_probed_once(self):
+        with mock.patch.object(self.storage, 'exists', return_value=True) as exists:
+            first = media_urls([self.page.file, self.page.file])
+            second = media_urls([self.page.file])
+
+        self.assertEqual(exists.call_count, 1)
+        self.assertTrue(first[0])
+        self.assertEqual(second, first[:1])
+
+    def test_missing_and_failing_files(self):
+        with mock.patch.object(self.storage, 'exists', return_value=False):
+            self.assertEqual(media_urls([self.page.file, None]), ['', ''])
+
+        # A cached "missing" answer is dropped when the row is saved again.
+        self.page.save()
+        with mock.patch.object(self.storage, 'exists', side_effect=OSError) as exists:
+            self.assertEqual(media_urls([self.page.file]), [''])
+            self.assertEqual(media_urls([self.page.file]), [''])
+        self.assertEqual(exists.call_count, 2)
+
+    def test_misses_share_one_client_and_respect_deadline(self):
+        other = ColoringPage.objects.create(created_by=self.page.created_by, title='q', file='coloring/pages/q.png')
+        slow = threading.Event()
+        client = mock.Mock()
+
+        def head_object(Bucket, Key):
+            if Key.endswith('q.png'):
+                slow.wait(5)
+            return {}
+
+        client.head_object.side_effect = head_object
+        with mock.patch('accounts.media._shared_client', return_value=client):
+            urls = probe_exists_many([self.page.file, other.file], deadline=0.2)
+        slow.set()
+
+        self.assertEqual(urls, {'coloring/pages/p.png': True})
+        self.assertEqual(client.head_object.call_count, 2)
+
+    def test_probes_not_started_by_the_deadline_are_cancelled(self):
+        other = ColoringPage.objects.create(created_by=self.page.created_by, title='q', file='coloring/pages/q.png')
+        slow = threading.Event()
+        client = mock.Mock()
+        client.head_object.side_effect = lambda Bucket, Key: slow.wait(5) or {}
+        pool = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(pool.shutdown)
+
+        with mock.patch('accounts.media._shared_client', return_value=client), \
+                mock.patch('accounts.media._get_probe_pool', return_value=pool):
+            urls = probe_exists_many([self.page.file, other.file], deadline=0.2)
+        slow.set()
+        pool.shutdown(wait=True)
+
+        self.assertEqual(urls, {})
+        self.assertEqual(client.head_object.call_count, 1)
+
+
+class MediaMetadataTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.storage = SoundCard._meta.get_field('image').storage
+
+    def test_upload_records_metadata(self):
+        image = SimpleUploadedFile('cat.PNG', b'png-bytes', content_type='image/png')
+        audio = SimpleUploadedFile('cat.mp3', b'mp3-bytes', content_type='audio/mpeg')
+        with mock.patch.object(self.storage, 'save', side_effect=lambda name, *a, **kw: name):
+            card = SoundCard.objects.create(created_by=self.author, title='cat', image=image, audio=audio)
+
+        meta = card.media_meta['image']
+        self.assertTrue(meta['name'].startswith('sounds/images/') and meta['name'].endswith('.png'))
+        self.assertEqual(meta['size'], 9)
+        self.assertEqual(meta['content_type'], 'image/png')
+        self.assertEqual(meta['checksum'], hashlib.sha256(b'png-bytes').hexdigest())
+        self.assertTrue(card.media_available)
+
+        with mock.patch('accounts.media.probe_exists_many') as probe:
+            self.assertTrue(stored_media_urls([card], 'audio')[0])
+        probe.assert_not_called()
+
+    def test_backfill_marks_missing_files(self):
+        card = SoundCard.objects.create(created_by=self.author, title='old', image='a.png', audio='a.mp3')
+        self.assertIsNone(card.media_available)
+
+        with mock.patch.object(self.storage, 'exists', side_effect=lambda name: name == 'a.png'), \
+                mock.patch.object(self.storage, 'size', return_value=3), \
+                mock.patch.object(self.storage, 'open', return_value=SimpleUploadedFile('a.png', b'abc')):
+            call_command('backfill_media_metadata', stdout=mock.MagicMock(), stderr=mock.MagicMock())
+
+        card.refresh_from_db()
+        self.assertFalse(card.media_available)
+        self.assertEqual(card.media_meta['image']['checksum'], hashlib.sha256(b'abc').hexdigest())
+        self.assertFalse(card.media_meta['audio']['available'])
+
+        storages = {**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}}
+        with override_settings(STORAGES=storages), mock.patch('accounts.media.probe_exists_many') as probe:
+            response = self.client.get('/sounds/')
+        probe.assert_not_called()
+        self.assertNotContains(response, 'a.png')
+
+    def test_backfill_keeps_derivatives_recorded_while_probing(self):
+        card = SoundCard.objects.create(created_by=self.author, title='old', image='a.png', audio='a.mp3')
+        derivatives = {'thumb': {'name': 'a_thumb.webp', 'width': 160, 'height': 107, 'box': 160}}
+
+        def exists(name):
+            if name == 'a.png':
+                # A 'media.derivatives' job finishes between loading the row and writing it back.
+                SoundCard.objects.filter(pk=card.pk).update(
+                    media_meta={'image': {'name': 'a.png', 'available': True, 'derivatives': derivatives}},
+                )
+            return True
+
+        class InlinePool(ThreadPoolExecutor):
+            # Probes run on the test's database connection.
+            def submit(self, fn, *args):
+                future = Future()
+                future.set_result(fn(*args))
+                return future
+
+        with mock.patch.object(self.storage, 'exists', side_effect=exists), \
+                mock.patch.object(self.storage, 'size', return_value=3), \
+                mock.patch('accounts.management.commands.backfill_media_metadata.ThreadPoolExecutor', InlinePool):
+            call_command('backfill_media_metadata', '--no-checksum', stdout=StringIO(), stderr=StringIO())
+
+        card.refresh_from_db()
+        self.assertTrue(card.media_available)
+        self.assertEqual(card.media_meta['image']['size'], 3)
+        self.assertEqual(card.media_meta['image']['derivatives'], derivatives)
+
+    def test_image_upload_stores_webp_derivatives(self):
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), 'red').save(buffer, 'PNG')
+        image = SimpleUploadedFile('big.png', buffer.getvalue(), content_type='image/png')
+        audio = SimpleUploadedFile('big.mp3', b'mp3', content_type='audio/mpeg')
+
+        saved = {}
+
+        def save(name, content, **kwargs):
+            saved[name] = content.read()
+            return name
+
+        with mock.patch.object(self.storage, 'save', side_effect=save), \
+                mock.patch.object(self.storage, 'open', side_effect=lambda name, mode='rb': File(BytesIO(saved[name]))):
+            card = SoundCard.objects.create(created_by=self.author, title='big', image=image, audio=audio)
+            self.assertNotIn('derivatives', card.media_meta['image'])
+            self.assertEqual(run_pending_jobs(), 1)
+
+        card.refresh_from_db()
+        derivatives = card.media_meta['image']['derivatives']
+        self.assertEqual(set(derivatives), {'thumb', 'card', 'print'})
+        self.assertEqual((derivatives['thumb']['width'], derivatives['thumb']['height']), (160, 107))
+        # Originals smaller than the box are not upscaled.
+        self.assertEqual(derivatives['print']['width'], 1200)
+        self.assertEqual(derivatives['card']['name'], card.image.name.replace('.png', '_card.webp'))
+        self.assertEqual(Image.open(BytesIO(saved[derivatives['card']['name']])).format, 'WEBP')
+        self.assertNotIn('derivatives', card.media_meta['audio'])
+
+        url = stored_media_urls([card], 'image', fit=300)[0]
+        self.assertTrue(url.endswith('_card.webp'))
+        self.assertTrue(stored_media_urls([card], 'image', fit=5000)[0].endswith('.png'))
+
+        with mock.patch.object(self.storage, 'delete') as delete:
+            card.delete()
+        deleted = {c.args[0] for c in delete.call_args_list}
+        self.assertEqual(deleted, {entry['name'] for entry in derivatives.values()})
+
+    def test_replaced_image_derivatives_are_deleted_after_commit(self):
+        derivatives = {'thumb': {'name': 'old_thumb.webp', 'width': 160, 'height': 107}}
+        card = SoundCard.objects.create(created_by=self.author, title='old', image='old.png', audio='old.mp3')
+        card.media_meta = {'image': {'name': 'old.png', 'available': True, 'derivatives': derivatives}}
+        SoundCard.objects.filter(pk=card.pk).update(media_meta=card.media_meta)
+
+        card.image = 'new.png'
+        with mock.patch.object(self.storage, 'delete') as delete:
+            with self.captureOnCommitCallbacks() as callbacks:
+                card.save()
+            delete.assert_not_called()
+            for callback in callbacks:
+                callback()
+        delete.assert_called_once_with('old_thumb.webp')
+        self.assertNotIn('image', SoundCard.objects.get(pk=card.pk).media_meta)
+
+
+@job_handler('tests.flaky')
+def _flaky_job(fail_times: int):
+    _flaky_job.calls += 1
+    if _flaky_job.calls <= fail_times:
+        raise RuntimeError('boom')
+    return {'calls': _flaky_job.calls}
+
+
+class BackgroundJobTests(TestCase):
+    def setUp(self):
+        _flaky_job.calls = 0
+
+    def test_retries_with_backoff_then_succeeds(self):
+        job = enqueue('tests.flaky', {'fail_times': 1})
+
+        self.assertEqual(run_pending_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (BackgroundJob.Status.QUEUED, 1))
+        self.assertIn('boom', job.last_error)
+        # Not due yet: backoff pushed run_after into the future.
+        self.assertEqual(run_pending_jobs(), 0)
+
+        BackgroundJob.objects.filter(pk=job.pk).update(run_after=job.created_at)
+        self.assertEqual(run_pending_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), (BackgroundJob.Status.DONE, {'calls': 2}))
+
+    def test_gives_up_after_max_attempts(self):
+        job = enqueue('tests.flaky', {'fail_times': 5}, max_attempts=1)
+
+        run_pending_jobs()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, BackgroundJob.Status.FAILED)
+
+    def test_unique_enqueue_reuses_pending_job(self):
+        first = enqueue('tests.flaky', {'fail_times': 0}, unique=True)
+        self.assertEqual(enqueue('tests.flaky', {'fail_times': 0}, unique=True).pk, first.pk)
+        self.assertNotEqual(enqueue('tests.flaky', {'fail_times': 1}, unique=True).pk, first.pk)
+
+    def test_worker_check_reports_overdue_jobs(self):
+        from datetime import timedelta
+
+        from django.core.management.base import CommandError
+        from django.utils import timezone
+
+        call_command('run_worker', '--check', stdout=StringIO())
+        job = enqueue('tests.flaky', {'fail_times': 0})
+        BackgroundJob.objects.filter(pk=job.pk).update(run_after=timezone.now() - timedelta(hours=1))
+        with self.assertRaisesMessage(CommandError, 'tests.flaky'):
+            call_command('run_worker', '--check', stdout=StringIO())
+
+    def test_invite_email_is_queued(self):
+        from django.core import mail
+
+        from .models import SpecialistInvite
+
+        admin_user = User.objects.create_superuser(username='admin', password='pass12345', email='a@example.com')
+        invite = SpecialistInvite.objects.create(email='spec@example.com')
+        self.client.force_login(admin_user)
+
+        self.client.post(
+            '/admin/accounts/specialistinvite/',
+            {'action': 'send_invite_email', '_selected_action': [invite.pk]},
+        )
+        self.assertEqual(len(mail.outbox), 0)
+
+        run_pending_jobs()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(str(invite.token), mail.outbox[0].body)
+
+
+class ModelRegistryTests(SimpleTestCase):
+    def _save_model(self, model_dir, offset):
+        import numpy as np
+
+        from ml_services import ProgressPredictor
+
+        predictor = ProgressPredictor(model_type='linear', model_dir=model_dir, window_size=3)
+        X = np.random.RandomState(0).rand(20, len(predictor.FEATURE_COLUMNS))
+        predictor.model.fit(predictor.scaler.fit_transform(X), X[:, 0] * 100 + offset)
+        predictor.is_trained = True
+        predictor.save(game_type='math')
+
+    def test_loads_once_and_reloads_on_change(self):
+        import os
+        import tempfile
+
+        from ml_services import ModelRegistry
+
+        with tempfile.TemporaryDirectory() as model_dir:
+            registry = ModelRegistry(model_dir)
+            self.assertIsNone(registry.get('linear', 'math', 3))
+
+            self._save_model(model_dir, offset=0)
+            first = registry.get('linear', 'math', 3)
+            self.assertIsNotNone(first)
+            self.assertIs(registry.get('linear', 'math', 3), first)
+
+            # Same bytes, new mtime: hash matches, no reload.
+            model_file = first.artifact_paths('math')[0]
+            os.utime(model_file, ns=(1, 1))
+            self.assertIs(registry.get('linear', 'math', 3), first)
+
+            self._save_model(model_dir, offset=5)
+            second = registry.get('linear', 'math', 3)
+            self.assertIsNot(second, first)
+            self.assertTrue(second.is_trained)
+
+
+class PreprocessFeaturesTests(SimpleTestCase):
+    def test_vectorized_matches_reference_exactly(self):
+        import pandas as pd
+
+        from accounts.management.commands.benchmark_preprocess_features import synthetic_game_frame
+        from ml_services.data_extractor import _preprocess_features_loop, preprocess_features
+
+        df = synthetic_game_frame(rows=600, users=20, seed=7)
+        for window_size in (1, 3, 5):
+            X_ref, y_ref = _preprocess_features_loop(df, window_size=window_size)
+            X_vec, y_vec = preprocess_features(df, window_size=window_size)
+            pd.testing.assert_frame_equal(X_ref, X_vec, check_exact=True)
+            pd.testing.assert_series_equal(y_ref, y_vec, check_exact=True)
+
+
+class ExtractGameDataTests(TestCase):
+    def test_streaming_matches_row_by_row(self):
+        import pandas as pd
+
+        from ml_services.data_extractor import extract_game_data
+
+        users = [User.objects.create_user(username=f'extract{i}', password='pass12345') for i in range(2)]
+        details_variants = [
+            {},
+            {'hints_used': 2, 'attempts': 3, 'failed_attempts': 1},
+            {'successful_attempts': '4', 'max_streak': 5},
+            {'failed_attempts': -2, 'max_streak': 'x'},
+        ]
+        for i in range(24):
+            GameResult.objects.create(
+                user=users[i % 2],
+                game_type=[GameResult.GameType.MATH, GameResult.GameType.MEMORY][i % 3 % 2],
+                score=(i * 13) % 101,
+                duration_seconds=None if i % 5 == 0 else 30 + i,
+                raw_score=i if i % 4 == 1 else None,
+                max_score=10 if i % 4 == 2 else None,
+                max_streak=i % 3 or None,
+                details=details_variants[i % len(details_variants)],
+            )
+
+        legacy = extract_game_data(min_entries=2, streaming=False)
+        streamed = extract_game_data(min_entries=2, chunk_size=5)
+        pd.testing.assert_frame_equal(legacy, streamed)
+
+        with self.assertRaises(ValueError):
+            extract_game_data(game_type=GameResult.GameType.SOUND)
+
+
+class FeatureStoreTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='kid', password='pass12345')
+        self.client.force_login(self.user)
+
+    def assertFeaturesEqual(self, expected, actual):
+        self.assertEqual(set(expected), set(actual))
+        for key, value in expected.items():
+            self.assertAlmostEqual(value, actual[key], places=9, msg=key)
+
+    def test_updated_on_write_and_matches_history(self):
+        from ml_services.data_extractor import extract_user_features
+
+        # History from before the table existed seeds the row on the first write.
+        GameResult.objects.create(user=self.user, game_type=GameResult.GameType.MATH, score=35, details={'hints_used': 1})
+        for score in (40, 55, 50):
+            self.client.post(
+                '/api/game-results/',
+                data={'game_type': 'math', 'score': score, 'duration_seconds': score // 2, 'failed_attempts': score % 3},
+                content_type='application/json',
+            )
+        self.client.post(
+            '/api/game-results/batch/',
+            data={'results': [
+                {'idempotency_key': f'k{i}', 'game_type': 'math', 'score': 60 + i, 'details': {'successful_attempts': i}}
+                for i in range(12)
+            ]},
+            content_type='application/json',
+        )
+
+        state = GameFeatureState.objects.get(user=self.user, game_type=GameResult.GameType.MATH)
+        self.assertEqual(state.attempts_count, 16)
+        self.assertEqual(len(state.recent), GameFeatureState.WINDOW_CAPACITY)
+        self.assertEqual(state.last_result_id, GameResult.objects.latest('id').id)
+        for window_size in (1, 3, GameFeatureState.WINDOW_CAPACITY):
+            self.assertFeaturesEqual(
+                extract_user_features(self.user.id, 'math', window_size=window_size),
+                user_window_features(self.user.id, 'math', window_size),
+            )
+
+        GameFeatureState.objects.all().delete()
+        self.assertEqual(rebuild_feature_store(), 1)
+        rebuilt = GameFeatureState.objects.get(user=self.user, game_type=GameResult.GameType.MATH)
+        self.assertEqual((rebuilt.attempts_count, rebuilt.last_result_id, rebuilt.recent),
+                         (state.attempts_count, state.last_result_id, state.recent))
+
+    def test_not_enough_results(self):
+        GameResult.objects.create(user=self.user, game_type=GameResult.GameType.SOUND, score=80)
+        self.assertIsNone(user_window_features(self.user.id, 'sound', 3))
+        self.assertIsNotNone(user_window_features(self.user.id, 'sound', 1))
+
+
+class PredictPerformanceBulkTests(TestCase):
+    def setUp(self):
+        from .models import ChildProfile, SpecialistProfile
+
+        specialist_user = User.objects.create_user(username='spec', password='pass12345')
+        specialist = SpecialistProfile.objects.create(user=specialist_user)
+        self.kids = []
+        for name in ('anna', 'bohdan'):
+            kid = User.objects.create_user(username=name, password='pass12345')
+            specialist.students.add(ChildProfile.objects.create(user=kid))
+            self.kids.append(kid)
+        User.objects.create_user(username='stranger', password='pass12345')
+        self.client.force_login(specialist_user)
+
+    def _trained_predictor(self, model_dir):
+        import numpy as np
+
+        from ml_services import ProgressPredictor
+
+        predictor = ProgressPredictor(model_type='linear', model_dir=model_dir, window_size=3)
+        X = np.random.RandomState(0).rand(20, len(predictor.FEATURE_COLUMNS))
+        predictor.model.fit(predictor.scaler.fit_transform(X), X[:, 0] * 100)
+        predictor.is_trained = True
+        return predictor
+
+    def test_model_heuristic_and_missing_data(self):
+        import tempfile
+
+        anna, bohdan = self.kids
+        for score in range(40, 100, 5):
+            GameResult.objects.create(user=anna, game_type=GameResult.GameType.MATH, score=score)
+        for score in (30, 50):
+            GameResult.objects.create(user=bohdan, game_type=GameResult.GameType.SOUND, score=score)
+
+        with tempfile.TemporaryDirectory() as model_dir:
+            predictor = self._trained_predictor(model_dir)
+            with mock.patch('ml_services.model_registry.get', side_effect=lambda m, g, w: predictor if g == 'math' else None):
+                response = self.client.post(
+                    '/api/predict-performance/bulk/',
+                    data={'usernames': ['anna', 'bohdan', 'stranger'], 'game_types': ['math', 'sound']},
+                    content_type='application/json',
+                )
+            expected = predictor.predict(anna.id, 'math')
+
+        body = response.json()
+        self.assertEqual(response.status_code, 200)
+        predictions = {(p['user_id'], p['game_type']): p for p in body['predictions']}
+        self.assertEqual(set(predictions), {(anna.id, 'math'), (bohdan.id, 'sound')})
+
+        ml = predictions[(anna.id, 'math')]
+        self.assertEqual(ml['predicted_score'], expected['predicted_score'])
+        self.assertNotIn('analysis_mode', ml['model_info'])
+        self.assertEqual(len(ml['history']), 12)
+
+        heuristic = predictions[(bohdan.id, 'sound')]
+        self.assertEqual(heuristic['model_info']['analysis_mode'], 'heuristic')
+        self.assertEqual([h['score'] for h in heuristic['history']], [30.0, 50.0])
+
+        errors = {(e.get('user_id'), e.get('username'), e.get('game_type')) for e in body['errors']}
+        self.assertIn((None, 'stranger', None), errors)
+        self.assertIn((anna.id, 'anna', 'sound'), errors)
+        self.assertIn((bohdan.id, 'bohdan', 'math'), errors)
+
+    def test_predict_many_matches_predict(self):
+        import tempfile
+
+        anna, bohdan = self.kids
+        for offset, kid in enumerate(self.kids):
+            for score in range(40 + offset, 100, 7):
+                GameResult.objects.create(user=kid, game_type=GameResult.GameType.MATH, score=score)
+        GameResult.objects.create(user=bohdan, game_type=GameResult.GameType.SOUND, score=50)
+        rebuild_feature_store()
+
+        with tempfile.TemporaryDirectory() as model_dir:
+            predictor = self._trained_predictor(model_dir)
+            pairs = [(anna.id, 'math'), (bohdan.id, 'math'), (bohdan.id, 'sound')]
+            with self.assertNumQueries(1):
+                batch = predictor.predict_many(pairs + [(anna.id, 'math')])
+            self.assertEqual(list(batch), pairs)
+            self.assertEqual(batch[(anna.id, 'math')], predictor.predict(anna.id, 'math'))
+            self.assertEqual(batch[(bohdan.id, 'math')], predictor.predict(bohdan.id, 'math'))
+            self.assertIsNone(batch[(bohdan.id, 'sound')])
+
+    def test_rejects_children_and_bad_input(self):
+        response = self.client.post(
+            '/api/predict-performance/bulk/', data={'game_types': ['memory']}, content_type='application/json',
+        )
+        self.assertEqual(response.json()['error'], 'invalid_game_types')
+
+        self.client.force_login(self.kids[0])
+        response = self.client.post('/api/predict-performance/bulk/', data={}, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+
+
+class ParallelTrainingTests(TransactionTestCase):
+    def test_plan_workers_does_not_oversubscribe(self):
+        from ml_services.training import plan_workers
+
+        self.assertEqual(plan_workers(7, cpu_count=8), (7, 1))
+        self.assertEqual(plan_workers(2, cpu_count=8), (2, 4))
+        self.assertEqual(plan_workers(7, max_workers=3, cpu_count=8), (3, 2))
+        self.assertEqual(plan_workers(7, cpu_count=1), (1, 1))
+        self.assertEqual(plan_workers(7, max_workers=2, cpu_count=1), (2, 1))
+
+    def test_trains_each_partition_in_the_pool(self):
+        import os
+        import tempfile
+
+        from accounts.management.commands.benchmark_preprocess_features import synthetic_game_frame
+        from ml_services.training import train_game_types
+
+        corpus = synthetic_game_frame(rows=3000, users=30, seed=3)
+        corpus = corpus.sort_values(['user_id', 'game_type', 'created_at'], kind='stable').reset_index(drop=True)
+        with tempfile.TemporaryDirectory() as model_dir, \
+                mock.patch('ml_services.training.extract_game_data', return_value=corpus):
+            outcomes = train_game_types(
+                ['math', 'sound', 'articulation'], model_type='linear', model_dir=model_dir, max_workers=2,
+            )
+            self.assertEqual([o.game_type for o in outcomes], ['math', 'sound', 'articulation'])
+            for outcome in outcomes[:2]:
+                self.assertIsNone(outcome.error)
+                self.assertTrue(os.path.exists(outcome.model_path))
+                self.assertGreater(outcome.seconds, 0)
+            # No 'articulation' rows in the synthetic corpus.
+            self.assertIn('Insufficient data', outcomes[2].error)
+
+
+class IncrementalTrainingTests(TestCase):
+    def _play(self, user, count):
+        GameResult.objects.bulk_create(
+            [GameResult(user=user, game_type=GameResult.GameType.MATH, score=50 + 3 * i) for i in range(count)]
+        )
+
+    def test_warm_start_only_reads_new_results(self):
+        import tempfile
+
+        from ml_services import ProgressPredictor
+        from ml_services.data_extractor import extract_game_data, extract_game_data_since
+        from ml_services.training import read_watermark, train_partition, update_partition
+
+        kids = [User.objects.create_user(username=f'kid{i}', password='pass12345') for i in range(5)]
+        for kid in kids[:4]:
+            self._play(kid, 10)
+
+        with tempfile.TemporaryDirectory() as model_dir:
+            watermark = read_watermark()
+            full = train_partition(
+                extract_game_data(game_type='math'), 'math', 'xgboost', 3, 0.2, model_dir, watermark=watermark,
+            )
+            self.assertIsNone(full.error)
+            self.assertIsNone(extract_game_data_since(watermark['max_result_id'], 3, game_type='math'))
+
+            self._play(kids[0], 3)
+            self._play(kids[4], 1)
+            since = extract_game_data_since(watermark['max_result_id'], 3, game_type='math')
+            # Three new results plus a three-result tail for kid0; kid4 has fewer than min_entries results.
+            self.assertEqual(len(since[since['user_id'] == kids[0].id]), 6)
+            self.assertFalse((since['user_id'] == kids[4].id).any())
+            self.assertEqual(len(extract_game_data_since(watermark['max_result_id'], 3, 'math', min_entries=1)), 7)
+
+            outcome = update_partition('math', model_dir=model_dir, rounds=5)
+            self.assertEqual(outcome.mode, 'incremental')
+            self.assertEqual(outcome.metrics['n_trees'], ProgressPredictor.XGBOOST_PARAMS['n_estimators'] + 5)
+            self.assertIsNotNone(outcome.rebuild_estimate_seconds)
+
+            loaded = ProgressPredictor(model_dir=model_dir)
+            self.assertTrue(loaded.load(game_type='math'))
+            self.assertEqual(loaded.training_watermark['max_result_id'], GameResult.objects.latest('id').id)
+            self.assertEqual(loaded.training_watermark['incremental_updates'], 1)
+            self.assertEqual(loaded.training_watermark['rows'], full.rows + 4)
+
+            self.assertEqual(update_partition('math', model_dir=model_dir).mode, 'unchanged')
+            self.assertIsNone(update_partition('memory', model_dir=model_dir))
+
+    def test_backdated_result_does_not_retrain_later_rows(self):
+        from datetime import timedelta
+
+        from ml_services.data_extractor import extract_game_data_since, preprocess_features
+
+        kid = User.objects.create_user(username='kid', password='pass12345')
+        self._play(kid, 10)
+        after_id = GameResult.objects.latest('id').id
+        trained = list(GameResult.objects.filter(user=kid).order_by('created_at'))
+        GameResult.objects.create(
+            user=kid, game_type=GameResult.GameType.MATH, score=99,
+            created_at=trained[5].created_at + timedelta(microseconds=1),
+        )
+
+        since = extract_game_data_since(after_id, 3, game_type='math')
+        self.assertEqual(len(since), 4)
+        self.assertEqual(list(since['score'])[-1], 99)
+        # One sample: the backdated result; the trained rows after it are not read.
+        _X, y = preprocess_features(since, window_size=3)
+        self.assertEqual(list(y), [99])
+
+
+class MLBenchmarkTests(TestCase):
+    def test_synthetic_results_are_deterministic(self):
+        from ml_services.benchmarks import generate_results
+
+        first = list(generate_results(children=3, attempts=10, seed=7))
+        self.assertEqual(first, list(generate_results(children=3, attempts=10, seed=7)))
+        self.assertNotEqual(first, list(generate_results(children=3, attempts=10, seed=8)))
+        self.assertEqual({r.game_type for r in first}, set(GameResult.GameType.values))
+        self.assertTrue(all(0 <= r.score <= 100 for r in first))
+
+    def test_pipeline_report(self):
+        import json
+        import tempfile
+
+        with tempfile.NamedTemporaryFile(suffix='.json') as report_file:
+            call_command(
+                'benchmark_ml_pipeline', children=4, attempts=8, predictions=5, model_type='linear',
+                json_path=report_file.name, force=True, stdout=StringIO(),
+            )
+            report = json.load(report_file)
+
+        self.assertEqual(
+            list(report['stages']),
+            ['load', 'extract_game_data', 'preprocess_features', 'train', 'rebuild_feature_store', 'predict', 'predict_many'],
+        )
+        self.assertEqual(report['stages']['predict']['calls'], 5)
+        self.assertEqual(report['stages']['predict_many']['calls'], 5)
+        self.assertIn('peak_mb', report['stages']['train'])
+        # The synthetic rows are rolled back.
+        self.assertFalse(GameResult.objects.exists())
+
+
+class ImportTimeTests(SimpleTestCase):
+    def test_web_paths_do_not_import_the_ml_stack(self):
+        from ml_services.benchmarks import measure_imports, scenario_code
+
+        facade = scenario_code('ml_facade') + 'import tempfile\nmodel_dir = tempfile.mkdtemp()\n'
+        no_model = facade + 'assert ml_services.ModelRegistry(model_dir).get_for_game("xgboost", "math") is None\n'
+        for name, code in (('django_setup', scenario_code('django_setup')), ('ml_facade', no_model)):
+            with self.subTest(name):
+                stage = measure_imports(code, cwd=str(settings.BASE_DIR))
+                self.assertEqual(stage['heavy_modules'], [])
+                self.assertGreater(stage['modules'], 0)
+
+        stage = measure_imports(
+            scenario_code('heuristic_prediction'), env={'DATABASE_URL': 'sqlite://:memory:'}, cwd=str(settings.BASE_DIR),
+        )
+        self.assertEqual(stage['status'], 200)
+        self.assertEqual(stage['heavy_modules'], [])
+
+        # Building a predictor does import them.
+        code = facade + 'ml_services.ProgressPredictor(model_type="linear", model_dir=model_dir)\n'
+        self.assertIn('sklearn', measure_imports(code, cwd=str(settings.BASE_DIR))['heavy_modules'])
+
+
+class PredictionSnapshotTests(TestCase):
+    def setUp(self):
+        from .models import ChildProfile
+
+        self.kid = User.objects.create_user(username='kid', password='pass12345')
+        ChildProfile.objects.create(user=self.kid)
+        for score in range(40, 90, 5):
+            GameResult.objects.create(user=self.kid, game_type=GameResult.GameType.MATH, score=score)
+        self.client.force_login(self.kid)
+
+    def _predictor(self, version):
+        prediction = {
+            'predicted_score': 70.0, 'current_score': 85.0, 'confidence': 80.0, 'insight': 'live',
+            'days_to_mastery': 3, 'attempts_to_mastery': 2, 'score_trend': 5.0,
+        }
+        predictor = mock.Mock(model_version=version, window_size=3)
+        predictor.predict.side_effect = lambda **kwargs: dict(prediction)
+        predictor.predict_many.side_effect = lambda pairs: {pair: dict(prediction) for pair in pairs}
+        return predictor
+
+    def _predict(self, predictor):
+        with mock.patch('ml_services.model_registry.get_for_game', return_value=predictor):
+            return self.client.get('/api/predict-performance/', {'game_type': 'math'}).json()
+
+    def test_served_until_a_newer_result_or_model(self):
+        current = self._predictor('v1')
+        with mock.patch('ml_services.model_registry.get_for_game', return_value=current):
+            call_command('snapshot_predictions', game_types=['math', 'sound'], stdout=StringIO())
+
+        snapshot = PredictionSnapshot.objects.get()
+        self.assertEqual((snapshot.user_id, snapshot.game_type), (self.kid.id, 'math'))
+        self.assertEqual((snapshot.analysis_mode, snapshot.model_version), (PredictionSnapshot.Mode.MODEL, 'v1'))
+        self.assertEqual(snapshot.based_on_result_id, GameResult.objects.latest('id').id)
+
+        PredictionSnapshot.objects.update(insight='from snapshot')
+        served = self._predict(current)
+        self.assertEqual(served['insight'], 'from snapshot')
+        self.assertIn('snapshot_at', served['model_info'])
+        self.assertEqual(len(served['history']), 10)
+
+        # A newly published model makes the snapshot stale.
+        self.assertEqual(self._predict(self._predictor('v2'))['insight'], 'live')
+
+        GameResult.objects.create(user=self.kid, game_type=GameResult.GameType.MATH, score=90)
+        live = self._predict(current)
+        self.assertEqual(live['insight'], 'live')
+        self.assertNotIn('snapshot_at', live['model_info'])
+        self.assertEqual(len(live['history']), 11)
+
+    def test_heuristic_predictions_are_not_stored(self):
+        with mock.patch('ml_services.model_registry.get_for_game', return_value=None):
+            call_command('snapshot_predictions', game_types=['math'], stdout=StringIO())
+        self.assertFalse(PredictionSnapshot.objects.exists())
+
+        # Without a model the API keeps queueing training instead of serving a stored heuristic.
+        with mock.patch('accounts.views.enqueue_model_training') as enqueue_training:
+            enqueue_training.return_value.id = 7
+            answer = self._predict(None)
+        self.assertEqual(answer['model_info']['analysis_mode'], 'heuristic')
+        self.assertEqual(answer['model_info']['training_job_id'], 7)
+
+
+class PredictPerformanceTrainingTests(TestCase):
+    def setUp(self):
+        import tempfile
+
+        # Training jobs run here for real; keep their bundles and locks out of the checkout.
+        model_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(model_dir.cleanup)
+        settings_override = override_settings(ML_MODEL_DIR=model_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.kid = User.objects.create_user(username='kid', password='pass12345')
+        for score in (40, 60, 80):
+            GameResult.objects.create(user=self.kid, game_type=GameResult.GameType.MATH, score=score)
+        self.client.force_login(self.kid)
+
+    def _predict(self, **params):
+        with mock.patch('ml_services.model_registry.get', return_value=None), \
+                mock.patch('ml_services.ProgressPredictor.train', side_effect=AssertionError('trained in the request')):
+            return self.client.get('/api/predict-performance/', {'game_type': 'math', **params}).json()
+
+    def test_missing_model_queues_one_training_job(self):
+        first = self._predict()
+        self.assertEqual(first['model_info']['analysis_mode'], 'heuristic')
+        self.assertFalse(first['model_info']['model_loaded'])
+        job = BackgroundJob.objects.get(pk=first['model_info']['training_job_id'])
+        self.assertEqual((job.name, job.payload['game_type']), ('ml.train', None))
+
+        self.assertEqual(self._predict(train='true')['model_info']['training_job_id'], job.pk)
+        self.assertEqual(BackgroundJob.objects.count(), 1)
+
+    def test_insufficient_data_is_not_retried_or_requeued(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        job_id = self._predict()['model_info']['training_job_id']
+        run_pending_jobs()
+        job = BackgroundJob.objects.get(pk=job_id)
+        self.assertEqual((job.status, job.attempts), (BackgroundJob.Status.DONE, 1))
+        self.assertEqual(job.result['skipped'], 'insufficient_data')
+
+        # Within the cooldown the finished job is returned instead of a new one.
+        self.assertEqual(self._predict()['model_info']['training_job_id'], job_id)
+        BackgroundJob.objects.filter(pk=job_id).update(updated_at=timezone.now() - timedelta(hours=1))
+        self.assertNotEqual(self._predict()['model_info']['training_job_id'], job_id)
+        self.assertEqual(BackgroundJob.objects.count(), 2)
+
+    @override_settings(ML_TRAINING_CPUS=2)
+    def test_training_job_bounds_xgboost_threads(self):
+        from ml_services import ProgressPredictor
+        from ml_services.data_extractor import InsufficientDataError
+
+        from .tasks import train_progress_model
+
+        n_jobs = []
+
+        def train(predictor, **kwargs):
+            n_jobs.append(predictor.model.get_params()['n_jobs'])
+            raise InsufficientDataError('Insufficient data')
+
+        with mock.patch.object(ProgressPredictor, 'train', autospec=True, side_effect=train):
+            self.assertEqual(train_progress_model()['skipped'], 'insufficient_data')
+        self.assertEqual(n_jobs, [2])
+
+    @override_settings(ML_UNIFIED_MODEL=False)
+    def test_per_game_training_when_unified_model_is_off(self):
+        job_id = self._predict()['model_info']['training_job_id']
+        self.assertEqual(BackgroundJob.objects.get(pk=job_id).payload['game_type'], 'math')
+
+    def test_unique_key_is_enforced_by_the_database(self):
+        from django.db import IntegrityError, transaction
+
+        job = enqueue('tests.flaky', {'fail_times': 0}, unique_key='tests:one')
+        self.assertEqual(enqueue('tests.flaky', {'fail_times': 1}, unique_key='tests:one').pk, job.pk)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BackgroundJob.objects.create(name='tests.flaky', unique_key='tests:one')
+
+        BackgroundJob.objects.filter(pk=job.pk).update(status=BackgroundJob.Status.DONE)
+        self.assertNotEqual(enqueue('tests.flaky', unique_key='tests:one').pk, job.pk)
+
+
+class ModelBundleTests(SimpleTestCase):
+    def _fitted(self, model_type, model_dir):
+        import numpy as np
+
+        from ml_services import ProgressPredictor
+
+        predictor = ProgressPredictor(model_type=model_type, model_dir=model_dir, window_size=3)
+        if model_type == 'xgboost':
+            predictor.model.set_params(n_estimators=5)
+        X = np.random.RandomState(1).rand(40, len(predictor.feature_columns))
+        predictor.model.fit(predictor.scaler.fit_transform(X), X[:, 0] * 100)
+        predictor.metrics = {'test_rmse': 3.5}
+        predictor.training_watermark = {'rows': 40, 'max_result_id': 17}
+        predictor.is_trained = True
+        return predictor, X
+
+    def test_round_trip_and_manifest(self):
+        import json
+        import tempfile
+
+        import numpy as np
+
+        from ml_services import ProgressPredictor
+
+        for model_type in ('xgboost', 'linear'):
+            with self.subTest(model_type=model_type), tempfile.TemporaryDirectory() as model_dir:
+                saved, X = self._fitted(model_type, model_dir)
+                model_file = saved.save(game_type='math')
+                self.assertEqual(model_file.suffix, '.ubj' if model_type == 'xgboost' else '.npy')
+
+                loaded = ProgressPredictor(model_type=model_type, model_dir=model_dir, window_size=3)
+                self.assertTrue(loaded.load(game_type='math'))
+                self.assertIsInstance(loaded.scaler.mean_, np.memmap)
+                np.testing.assert_allclose(
+                    loaded.model.predict(loaded.scaler.transform(X)),
+                    saved.model.predict(saved.scaler.transform(X)),
+                    rtol=1e-6,
+                )
+                self.assertEqual(loaded.metrics, {'test_rmse': 3.5})
+                self.assertEqual(loaded.training_watermark['max_result_id'], 17)
+
+                manifest_file = saved.artifact_paths('math')[2]
+                manifest = json.loads(manifest_file.read_text())
+                self.assertEqual(manifest['feature_schema_hash'], ProgressPredictor.feature_schema_hash(ProgressPredictor.FEATURE_COLUMNS, 3))
+
+                other_window = ProgressPredictor(model_type=model_type, model_dir=model_dir, window_size=5)
+                self.assertFalse(other_window.load(game_type='math'))
+
+                manifest['files']['scaler.npy']['sha256'] = '0' * 64
+                manifest_file.write_text(json.dumps(manifest))
+                self.assertTrue(ProgressPredictor(model_type=model_type, model_dir=model_dir).load(game_type='math'))
+                self.assertFalse(
+                    ProgressPredictor(model_type=model_type, model_dir=model_dir).load(game_type='math', verify_checksums=True)
+                )
+
+    def test_lean_inference_matches_sklearn_path(self):
+        import tempfile
+
+        import numpy as np
+
+        from ml_services import ProgressPredictor
+
+        for model_type in ('xgboost', 'linear'):
+            with self.subTest(model_type=model_type), tempfile.TemporaryDirectory() as model_dir:
+                saved, X = self._fitted(model_type, model_dir)
+                saved.save(game_type='math')
+                loaded = ProgressPredictor(model_type=model_type, model_dir=model_dir, window_size=3)
+                self.assertTrue(loaded.load(game_type='math'))
+
+                expected = loaded.model.predict(loaded.scaler.transform(X))
+                np.testing.assert_array_equal(loaded._score_matrix(X.copy()), expected)
+                # Scaling reuses the memory-mapped scaler arrays.
+                self.assertTrue(np.shares_memory(loaded.inference_params().mean, loaded.scaler.mean_))
+
+    def test_saves_publish_a_new_version(self):
+        import shutil
+        import tempfile
+
+        from ml_services import ProgressPredictor
+
+        with tempfile.TemporaryDirectory() as model_dir:
+            saved, _X = self._fitted('linear', model_dir)
+            versions = [saved.save(game_type='math').parent for _ in range(3)]
+            bundle = versions[0].parent
+            self.assertEqual((bundle / 'CURRENT').read_text(), versions[-1].name)
+            self.assertEqual(saved.artifact_paths('math')[0].parent, versions[-1])
+            # The current version and the previous one (readers may still be loading it).
+            self.assertEqual(sorted(p.name for p in bundle.iterdir() if p.is_dir()), [v.name for v in versions[1:]])
+
+            # A bundle written before versioning (files in the bundle directory) still loads.
+            for path in versions[-1].iterdir():
+                shutil.copy(path, bundle / path.name)
+            (bundle / 'CURRENT').unlink()
+            shutil.rmtree(versions[1])
+            shutil.rmtree(versions[2])
+            self.assertTrue(ProgressPredictor(model_type='linear', model_dir=model_dir).load(game_type='math'))
+
+    def test_training_is_single_flight(self):
+        import tempfile
+
+        from accounts.management.commands.benchmark_preprocess_features import synthetic_game_frame
+        from ml_services.locks import model_training_lock
+        from ml_services.training import TRAINING_IN_PROGRESS, train_partition
+
+        corpus = synthetic_game_frame(rows=400, users=10, seed=3)
+        with tempfile.TemporaryDirectory() as model_dir:
+            with model_training_lock(model_dir, 'linear', 'math') as acquired:
+                self.assertTrue(acquired)
+                with model_training_lock(model_dir, 'linear', 'math') as second:
+                    self.assertFalse(second)
+                busy = train_partition(corpus, 'math', 'linear', 3, 0.2, model_dir)
+                self.assertEqual(busy.error, TRAINING_IN_PROGRESS)
+            self.assertIsNone(train_partition(corpus, 'math', 'linear', 3, 0.2, model_dir).error)
+
+    def test_legacy_joblib_files_still_load(self):
+        import tempfile
+
+        import joblib
+
+        from ml_services import ProgressPredictor
+
+        with tempfile.TemporaryDirectory() as model_dir:
+            saved, _X = self._fitted('linear', model_dir)
+            model_file, scaler_file, _metrics_file = ProgressPredictor.legacy_artifact_paths_for(model_dir, 'linear', 'math')
+            joblib.dump(saved.model, model_file)
+            joblib.dump(saved.scaler, scaler_file)
+
+            loaded = ProgressPredictor(model_type='linear', model_dir=model_dir)
+            self.assertTrue(loaded.load(game_type='math'))
+
+
+class UnifiedModelTests(SimpleTestCase):
+    def _games(self):
+        import numpy as np
+        import pandas as pd
+
+        rng = np.random.RandomState(3)
+        rows = []
+        for user_id in range(1, 7):
+            for game_type, base in (('math', 80), ('memory', 40)):
+                for attempt in range(8):
+                    rows.append({
+                        'user_id': user_id,
+                        'game_type': game_type,
+                        'score': int(base + rng.randint(-5, 6)),
+                        'duration_seconds': 60,
+                        'hints_used': 0,
+                        'attempts': 1,
+                        'successful_attempts': 1,
+                        'failed_attempts': 0,
+                        'max_streak': 1,
+                        'time_of_day': 1,
+                        'created_at': pd.Timestamp('2024-01-01', tz='UTC') + pd.Timedelta(days=attempt),
+                    })
+        return pd.DataFrame(rows)
+
+    def test_game_type_is_one_hot(self):
+        from accounts.feature_store import GAME_TYPE_FEATURES, game_type_one_hot
+
+        encoded = game_type_one_hot('memory')
+        self.assertEqual(list(encoded), GAME_TYPE_FEATURES)
+        self.assertEqual(encoded['game_memory'], 1.0)
+        self.assertEqual(sum(encoded.values()), 1.0)
+        self.assertEqual(sum(game_type_one_hot('unknown').values()), 0.0)
+
+    def test_all_games_model_round_trip(self):
+        import tempfile
+
+        from accounts.feature_store import game_type_one_hot
+        from ml_services import ProgressPredictor
+
+        with tempfile.TemporaryDirectory() as model_dir:
+            predictor = ProgressPredictor(model_type='linear', model_dir=model_dir, window_size=3)
+            metrics = predictor.train_on_data(self._games(), game_type=None)
+            self.assertEqual(metrics['n_features'], len(ProgressPredictor.feature_columns_for(None)))
+            predictor.save(game_type=None)
+
+            loaded = ProgressPredictor(model_type='linear', model_dir=model_dir, window_size=3)
+            self.assertTrue(loaded.load(game_type=None))
+            self.assertEqual(loaded.feature_columns, ProgressPredictor.FEATURE_COLUMNS + ProgressPredictor.GAME_TYPE_COLUMNS)
+            # A per-game lookup does not pick up the all-games bundle.
+            self.assertFalse(ProgressPredictor(model_type='linear', model_dir=model_dir).load(game_type='math'))
+
+            base = {column: 0.0 for column in ProgressPredictor.FEATURE_COLUMNS}
+            base.update(attempt_number=4.0, avg_score=60.0, last_score=60.0)
+            [math] = loaded.predict_from_features([{**base, **game_type_one_hot('math')}], 'math')
+            [memory] = loaded.predict_from_features([{**base, **game_type_one_hot('memory')}], 'memory')
+            self.assertGreater(math['predicted_score'], memory['predicted_score'])
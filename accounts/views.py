@@ -1,5 +1,5 @@
 import json
-from datetime import timedelta
+from datetime import datetime, time, timedelta, timezone as dt_timezone
 
 from django.contrib.auth import login
 from django.contrib.auth.models import User
@@ -13,180 +13,37 @@ from django.db.models.functions import TruncDate
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
+from django.db import transaction
 from django.db.models import F
 
 import random
 
+from .badges import BADGE_DEFINITIONS, badge_codes_for_user, sync_badges
+from .counters import get_activity_counters, record_game_batch_counters, record_game_counters, record_story_counters
+from .feature_store import record_game_features
+from .media import stored_media_urls
+from .predictions import (
+    PREDICTION_GAME_TYPES,
+    PREDICTION_HISTORY_FIELDS,
+    PREDICTION_HISTORY_LIMIT,
+    PREDICTION_MIN_HISTORY_FOR_ML,
+    build_heuristic_prediction,
+    display_name,
+    enqueue_model_training,
+    fresh_snapshot,
+    prediction_entry,
+    prediction_history,
+    recent_histories,
+    score_pairs,
+    snapshot_prediction,
+)
 from .forms import ArticulationCardForm, MyStoryImageForm, RegisterForm, ColoringPageForm, SentenceExerciseForm, SoundCardForm, SpecialistActivityForm, SpecialistActivityStepForm, SpecialistStudentNoteForm, StoryForm, WordPuzzleWordForm
-from .models import ArticulationCard, ArticulationCardImage, ChildProfile, ColoringPage, GameResult, MyStoryEntry, MyStoryImage, SpecialistActivity, SpecialistActivityStep, SentenceExercise, SoundCard, SpecialistStudentNote, Story, StoryListen, UserBadge, WordPuzzleWord
-
-
-BADGE_DEFINITIONS = [
-    {
-        'code': 'first_game',
-        'title': 'Старт',
-        'subtitle': 'Перша зіграна гра',
-        'tone': 'red',
-        'icon': 'target',
-    },
-    {
-        'code': 'math_5',
-        'title': 'Математик',
-        'subtitle': '5 ігор з математики',
-        'tone': 'orange',
-        'icon': 'calc',
-    },
-    {
-        'code': 'memory_5',
-        'title': "Памʼять",
-        'subtitle': '5 ігор на памʼять',
-        'tone': 'teal',
-        'icon': 'compass',
-    },
-    {
-        'code': 'words_5',
-        'title': 'Слова',
-        'subtitle': '5 ігор зі словами',
-        'tone': 'green',
-        'icon': 'book',
-    },
-    {
-        'code': 'sound_5',
-        'title': 'Слухач',
-        'subtitle': '5 ігор зі звуками',
-        'tone': 'yellow',
-        'icon': 'target',
-    },
-    {
-        'code': 'articulation_5',
-        'title': 'Артикулятор',
-        'subtitle': '5 вправ з артикуляційної гімнастики',
-        'tone': 'teal',
-        'icon': 'mouth',
-    },
-    {
-        'code': 'stories_3',
-        'title': 'Казкар',
-        'subtitle': 'Прослухав 3 різні казки',
-        'tone': 'blue',
-        'icon': 'book',
-    },
-    {
-        'code': 'sentences_5',
-        'title': 'Будівничий речень',
-        'subtitle': '5 ігор з реченнями',
-        'tone': 'purple',
-        'icon': 'book',
-    },
-    {
-        'code': 'math_20',
-        'title': 'Супер математик',
-        'subtitle': '20 ігор з математики',
-        'tone': 'orange',
-        'icon': 'calc',
-    },
-    {
-        'code': 'memory_20',
-        'title': 'Мега памʼять',
-        'subtitle': '20 ігор на памʼять',
-        'tone': 'teal',
-        'icon': 'compass',
-    },
-    {
-        'code': 'words_20',
-        'title': 'Майстер слів',
-        'subtitle': '20 ігор зі словами',
-        'tone': 'green',
-        'icon': 'book',
-    },
-    {
-        'code': 'sound_20',
-        'title': 'Майстер звуків',
-        'subtitle': '20 ігор зі звуками',
-        'tone': 'yellow',
-        'icon': 'target',
-    },
-    {
-        'code': 'articulation_20',
-        'title': 'Майстер артикуляції',
-        'subtitle': '20 вправ з артикуляційної гімнастики',
-        'tone': 'teal',
-        'icon': 'mouth',
-    },
-    {
-        'code': 'stories_10',
-        'title': 'Книжковий герой',
-        'subtitle': 'Прослухав 10 різних казок',
-        'tone': 'blue',
-        'icon': 'book',
-    },
-    {
-        'code': 'all_games_25',
-        'title': 'Чемпіон',
-        'subtitle': '25 зіграних ігор',
-        'tone': 'red',
-        'icon': 'target',
-    },
-]
-
-
-def _badge_codes_for_user(user):
-    return set(UserBadge.objects.filter(user=user).values_list('code', flat=True))
-
-
-def _award_badge(user, code: str) -> bool:
-    if not code:
-        return False
-    _obj, created = UserBadge.objects.get_or_create(user=user, code=code)
-    return created
-
-
-def _sync_badges_for_user(user) -> None:
-    total_results = GameResult.objects.filter(user=user).count()
-    if total_results >= 1:
-        _award_badge(user, 'first_game')
-    if total_results >= 25:
-        _award_badge(user, 'all_games_25')
-
-    if GameResult.objects.filter(user=user, game_type=GameResult.GameType.MATH).count() >= 5:
-        _award_badge(user, 'math_5')
-    if GameResult.objects.filter(user=user, game_type=GameResult.GameType.MATH).count() >= 20:
-        _award_badge(user, 'math_20')
-    if GameResult.objects.filter(user=user, game_type=GameResult.GameType.MEMORY).count() >= 5:
-        _award_badge(user, 'memory_5')
-    if GameResult.objects.filter(user=user, game_type=GameResult.GameType.MEMORY).count() >= 20:
-        _award_badge(user, 'memory_20')
-    if GameResult.objects.filter(user=user, game_type=GameResult.GameType.WORDS).count() >= 5:
-        _award_badge(user, 'words_5')
-    if GameResult.objects.filter(user=user, game_type=GameResult.GameType.WORDS).count() >= 20:
-        _award_badge(user, 'words_20')
-    if GameResult.objects.filter(user=user, game_type=GameResult.GameType.SOUND).count() >= 5:
-        _award_badge(user, 'sound_5')
-    if GameResult.objects.filter(user=user, game_type=GameResult.GameType.SOUND).count() >= 20:
-        _award_badge(user, 'sound_20')
-
-    if GameResult.objects.filter(user=user, game_type=GameResult.GameType.ARTICULATION).count() >= 5:
-        _award_badge(user, 'articulation_5')
-    if GameResult.objects.filter(user=user, game_type=GameResult.GameType.ARTICULATION).count() >= 20:
-        _award_badge(user, 'articulation_20')
-
-    if GameResult.objects.filter(user=user, game_type=GameResult.GameType.SENTENCES).count() >= 5:
-        _award_badge(user, 'sentences_5')
-
-    listened_unique = (
-        StoryListen.objects.filter(user=user)
-        .values('story_id')
-        .distinct()
-        .count()
-    )
-    if listened_unique >= 3:
-        _award_badge(user, 'stories_3')
-    if listened_unique >= 10:
-        _award_badge(user, 'stories_10')
+from .models import ArticulationCard, ArticulationCardImage, ChildProfile, ColoringPage, GameResult, MyStoryEntry, MyStoryImage, SpecialistActivity, SpecialistActivityStep, SentenceExercise, SoundCard, SpecialistStudentNote, Story, StoryListen, WordPuzzleWord
 
 
-def _build_rewards_for_user(user):
-    unlocked = _badge_codes_for_user(user)
+def _build_rewards_for_user(user, unlocked=None):
+    if unlocked is None:
+        unlocked = badge_codes_for_user(user)
     rewards = []
     for d in BADGE_DEFINITIONS:
         rewards.append(
@@ -217,26 +74,17 @@ def _build_child_stats_for_user(user):
     articulation_values = [r.score if r.game_type == GameResult.GameType.ARTICULATION else None for r in results]
     attention_values = [r.score if r.game_type == GameResult.GameType.ATTENTION else None for r in results]
 
-    def avg_score(game_type: str) -> int:
-        values = [r.score for r in results if r.game_type == game_type]
-        if not values:
-            return 0
-        return int(round(sum(values) / len(values)))
+    counters = get_activity_counters(user)
 
-    math_avg = avg_score(GameResult.GameType.MATH)
-    attention_avg = avg_score(GameResult.GameType.ATTENTION)
-    sound_avg = avg_score(GameResult.GameType.SOUND)
-    words_avg = avg_score(GameResult.GameType.WORDS)
-    sentences_avg = avg_score(GameResult.GameType.SENTENCES)
-    articulation_avg = avg_score(GameResult.GameType.ARTICULATION)
+    math_avg = counters.average_score(GameResult.GameType.MATH)
+    attention_avg = counters.average_score(GameResult.GameType.ATTENTION)
+    sound_avg = counters.average_score(GameResult.GameType.SOUND)
+    words_avg = counters.average_score(GameResult.GameType.WORDS)
+    sentences_avg = counters.average_score(GameResult.GameType.SENTENCES)
+    articulation_avg = counters.average_score(GameResult.GameType.ARTICULATION)
 
     total_stories = Story.objects.filter(is_active=True).count()
-    listened_unique = (
-        StoryListen.objects.filter(user=user)
-        .values('story_id')
-        .distinct()
-        .count()
-    )
+    listened_unique = counters.stories_listened
     stories_listen_pct = int(round((listened_unique * 100) / total_stories)) if total_stories else 0
 
     progress = [
@@ -263,7 +111,7 @@ def _build_child_stats_for_user(user):
 
     return {
         'results_count': len(results),
-        'stories_listens_count': StoryListen.objects.filter(user=user).count(),
+        'stories_listens_count': counters.story_listens,
         'stories_listened_unique': listened_unique,
         'stories_total': total_stories,
         'progress': progress,
@@ -288,8 +136,8 @@ def rewards_entry(request):
         if hasattr(request.user, 'specialist_profile'):
             return redirect('specialist_profile')
         profile, _created = ChildProfile.objects.get_or_create(user=request.user, defaults={'stars': 0})
-        _sync_badges_for_user(request.user)
-        rewards = _build_rewards_for_user(request.user)
+        unlocked = sync_badges(request.user)
+        rewards = _build_rewards_for_user(request.user, unlocked)
         unlocked_count = sum(1 for r in rewards if r['unlocked'])
         context = {
             'username': request.user.username,
@@ -355,8 +203,8 @@ def child_profile(request):
         defaults={'stars': 0},
     )
 
-    _sync_badges_for_user(request.user)
-    rewards = _build_rewards_for_user(request.user)
+    unlocked = sync_badges(request.user)
+    rewards = _build_rewards_for_user(request.user, unlocked)
 
     rewards_unlocked = [r for r in rewards if r.get('unlocked')]
     rewards_locked = [r for r in rewards if not r.get('unlocked')]
@@ -476,10 +324,14 @@ def specialist_profile(request):
         day_list = [start_date + timedelta(days=i) for i in range(perf_days)]
         perf_labels = [d.strftime('%d.%m') for d in day_list]
 
+        # Compare against local-midnight bounds instead of created_at__date so the
+        # (user, created_at) index can serve the range.
+        start_dt = timezone.make_aware(datetime.combine(start_date, time.min))
+        end_dt = timezone.make_aware(datetime.combine(today + timedelta(days=1), time.min))
         base_qs = GameResult.objects.filter(
             user_id__in=user_ids,
-            created_at__date__gte=start_date,
-            created_at__date__lte=today,
+            created_at__gte=start_dt,
+            created_at__lt=end_dt,
         )
 
         def build_series(game_type: str) -> list:
@@ -626,19 +478,12 @@ def specialist_articulation(request):
 
     cards = list(
         ArticulationCard.objects.filter(created_by=request.user)
-        .only('id', 'title', 'instruction', 'image', 'is_active', 'created_at')
+        .only('id', 'title', 'instruction', 'image', 'is_active', 'created_at', 'media_meta', 'media_available')
         .prefetch_related('images')
         .order_by('-created_at')
     )
 
-    for c in cards:
-        image_url = ''
-        if c.image:
-            try:
-                if c.image.storage.exists(c.image.name):
-                    image_url = c.image.url
-            except Exception:
-                image_url = ''
+    for c, image_url in zip(cards, stored_media_urls(cards, 'image')):
         c.safe_image_url = image_url
         c.extra_images_count = len(list(getattr(c, 'images', []).all()))
 
@@ -687,18 +532,11 @@ def specialist_my_story(request):
 
     images = list(
         MyStoryImage.objects.filter(created_by=request.user)
-        .only('id', 'title', 'image', 'is_active', 'created_at')
+        .only('id', 'title', 'image', 'is_active', 'created_at', 'media_meta', 'media_available')
         .order_by('-created_at')
     )
 
-    for img in images:
-        image_url = ''
-        if img.image:
-            try:
-                if img.image.storage.exists(img.image.name):
-                    image_url = img.image.url
-            except Exception:
-                image_url = ''
+    for img, image_url in zip(images, stored_media_urls(images, 'image')):
         img.safe_image_url = image_url
 
     context = {
@@ -794,46 +632,20 @@ def specialist_activity_builder(request):
     if activity:
         steps = list(
             SpecialistActivityStep.objects.filter(activity=activity)
-            .only('id', 'title', 'description', 'task_text', 'image', 'audio', 'position', 'created_at')
+            .only('id', 'title', 'description', 'task_text', 'image', 'audio', 'position', 'created_at', 'media_meta', 'media_available')
             .order_by('position', 'created_at')
         )
 
-        for s in steps:
-            image_url = ''
-            if s.image:
-                try:
-                    if s.image.storage.exists(s.image.name):
-                        image_url = s.image.url
-                except Exception:
-                    image_url = ''
-            audio_url = ''
-            if s.audio:
-                try:
-                    if s.audio.storage.exists(s.audio.name):
-                        audio_url = s.audio.url
-                except Exception:
-                    audio_url = ''
+        image_urls = stored_media_urls(steps, 'image')
+        audio_urls = stored_media_urls(steps, 'audio')
+        for s, image_url, audio_url in zip(steps, image_urls, audio_urls):
             s.safe_image_url = image_url
             s.safe_audio_url = audio_url
 
     preview_step = step_instance or (steps[0] if steps else None)
     if preview_step and not hasattr(preview_step, 'safe_image_url'):
-        image_url = ''
-        if preview_step.image:
-            try:
-                if preview_step.image.storage.exists(preview_step.image.name):
-                    image_url = preview_step.image.url
-            except Exception:
-                image_url = ''
-        audio_url = ''
-        if preview_step.audio:
-            try:
-                if preview_step.audio.storage.exists(preview_step.audio.name):
-                    audio_url = preview_step.audio.url
-            except Exception:
-                audio_url = ''
-        preview_step.safe_image_url = image_url
-        preview_step.safe_audio_url = audio_url
+        preview_step.safe_image_url = stored_media_urls([preview_step], 'image')[0]
+        preview_step.safe_audio_url = stored_media_urls([preview_step], 'audio')[0]
     preview_step_index = None
     if preview_step and steps:
         for idx, s in enumerate(steps, start=1):
@@ -1647,18 +1459,12 @@ def specialist_coloring_pages(request):
 
     pages = list(
         ColoringPage.objects.filter(created_by=request.user)
-        .only('id', 'title', 'file', 'file_type', 'is_active', 'created_at')
+        .only('id', 'title', 'file', 'file_type', 'is_active', 'created_at', 'media_meta', 'media_available')
         .order_by('-created_at')
     )
 
     safe_pages = []
-    for p in pages:
-        url = ''
-        try:
-            if p.file and p.file.storage.exists(p.file.name):
-                url = p.file.url
-        except Exception:
-            url = ''
+    for p, url in zip(pages, stored_media_urls(pages, 'file')):
         safe_pages.append(
             {
                 'id': p.id,
@@ -1707,28 +1513,13 @@ def specialist_sounds(request):
 
     cards = list(
         SoundCard.objects.filter(created_by=request.user)
-        .only('id', 'title', 'image', 'audio', 'created_at')
+        .only('id', 'title', 'image', 'audio', 'created_at', 'media_meta', 'media_available')
         .order_by('-created_at')
     )
 
-    for c in cards:
-        image_url = ''
-        audio_url = ''
-
-        if c.image:
-            try:
-                if c.image.storage.exists(c.image.name):
-                    image_url = c.image.url
-            except Exception:
-                image_url = ''
-
-        if c.audio:
-            try:
-                if c.audio.storage.exists(c.audio.name):
-                    audio_url = c.audio.url
-            except Exception:
-                audio_url = ''
-
+    image_urls = stored_media_urls(cards, 'image')
+    audio_urls = stored_media_urls(cards, 'audio')
+    for c, image_url, audio_url in zip(cards, image_urls, audio_urls):
         c.safe_image_url = image_url
         c.safe_audio_url = audio_url
 
@@ -1812,6 +1603,16 @@ def specialist_sound_delete(request, card_id: int):
     return redirect(next_url)
 
 
+def _attach_story_media_urls(stories):
+    image_urls = stored_media_urls(stories, 'image')
+    pdf_urls = stored_media_urls(stories, 'pdf_file')
+    audio_urls = stored_media_urls(stories, 'audio')
+    for s, image_url, pdf_url, audio_url in zip(stories, image_urls, pdf_urls, audio_urls):
+        s.safe_image_url = image_url
+        s.safe_pdf_url = pdf_url
+        s.safe_audio_url = audio_url
+
+
 @login_required
 def specialist_stories(request):
     if not hasattr(request.user, 'specialist_profile'):
@@ -1829,39 +1630,11 @@ def specialist_stories(request):
 
     stories = list(
         Story.objects.filter(created_by=request.user)
-        .only('id', 'title', 'content_type', 'image', 'text', 'pdf_file', 'audio', 'created_at')
+        .only('id', 'title', 'content_type', 'image', 'text', 'pdf_file', 'audio', 'created_at', 'media_meta', 'media_available')
         .order_by('-created_at')
     )
 
-    for s in stories:
-        image_url = ''
-        pdf_url = ''
-        audio_url = ''
-
-        if s.image:
-            try:
-                if s.image.storage.exists(s.image.name):
-                    image_url = s.image.url
-            except Exception:
-                image_url = ''
-
-        if s.pdf_file:
-            try:
-                if s.pdf_file.storage.exists(s.pdf_file.name):
-                    pdf_url = s.pdf_file.url
-            except Exception:
-                pdf_url = ''
-
-        if s.audio:
-            try:
-                if s.audio.storage.exists(s.audio.name):
-                    audio_url = s.audio.url
-            except Exception:
-                audio_url = ''
-
-        s.safe_pdf_url = pdf_url
-        s.safe_audio_url = audio_url
-        s.safe_image_url = image_url
+    _attach_story_media_urls(stories)
 
     context = {
         'username': request.user.username,
@@ -1924,34 +1697,10 @@ def specialist_story_edit(request, story_id: int):
 
     stories = list(
         Story.objects.filter(created_by=request.user)
-        .only('id', 'title', 'content_type', 'image', 'text', 'pdf_file', 'audio', 'created_at')
+        .only('id', 'title', 'content_type', 'image', 'text', 'pdf_file', 'audio', 'created_at', 'media_meta', 'media_available')
         .order_by('-created_at')
     )
-    for s in stories:
-        image_url = ''
-        pdf_url = ''
-        audio_url = ''
-        if s.image:
-            try:
-                if s.image.storage.exists(s.image.name):
-                    image_url = s.image.url
-            except Exception:
-                image_url = ''
-        if s.pdf_file:
-            try:
-                if s.pdf_file.storage.exists(s.pdf_file.name):
-                    pdf_url = s.pdf_file.url
-            except Exception:
-                pdf_url = ''
-        if s.audio:
-            try:
-                if s.audio.storage.exists(s.audio.name):
-                    audio_url = s.audio.url
-            except Exception:
-                audio_url = ''
-        s.safe_pdf_url = pdf_url
-        s.safe_audio_url = audio_url
-        s.safe_image_url = image_url
+    _attach_story_media_urls(stories)
 
     context = {
         'username': request.user.username,
@@ -2029,16 +1778,17 @@ def specialist_word_delete(request, word_id: int):
     return redirect(next_url)
 
 
-@login_required
-@require_POST
-def record_game_result(request):
-    if hasattr(request.user, 'specialist_profile'):
-        return JsonResponse({'ok': False, 'error': 'specialist_cannot_record'}, status=403)
+# Oldest accepted played_at; older offline results are stored at this bound.
+GAME_RESULT_MAX_BACKDATE = timedelta(days=30)
 
-    try:
-        payload = json.loads(request.body.decode('utf-8') or '{}')
-    except json.JSONDecodeError:
-        return JsonResponse({'ok': False, 'error': 'invalid_json'}, status=400)
+
+def _parse_game_result_payload(payload):
+    """
+    Validate one game result payload. Returns (fields, None) with the GameResult
+    field values, or (None, error_code).
+    """
+    if not isinstance(payload, dict):
+        return None, 'invalid_payload'
 
     game_type = payload.get('game_type')
     if game_type not in (
@@ -2050,7 +1800,7 @@ def record_game_result(request):
         GameResult.GameType.SENTENCES,
         GameResult.GameType.ARTICULATION,
     ):
-        return JsonResponse({'ok': False, 'error': 'invalid_game_type'}, status=400)
+        return None, 'invalid_game_type'
 
     def to_int(value, *, min_value=None, max_value=None):
         if value is None:
@@ -2067,7 +1817,7 @@ def record_game_result(request):
 
     score = to_int(payload.get('score'), min_value=0, max_value=100)
     if score is None:
-        return JsonResponse({'ok': False, 'error': 'invalid_score'}, status=400)
+        return None, 'invalid_score'
 
     raw_score = to_int(payload.get('raw_score'), min_value=0)
     max_score = to_int(payload.get('max_score'), min_value=0)
@@ -2078,7 +1828,7 @@ def record_game_result(request):
     if details is None:
         details = {}
     if not isinstance(details, dict):
-        return JsonResponse({'ok': False, 'error': 'invalid_details'}, status=400)
+        return None, 'invalid_details'
 
     failed_attempts = to_int(payload.get('failed_attempts'), min_value=0)
     hesitation_time = to_int(payload.get('hesitation_time'), min_value=0)
@@ -2101,50 +1851,174 @@ def record_game_result(request):
     if max_streak is not None:
         details['max_streak'] = max_streak
 
-    result = GameResult.objects.create(
-        user=request.user,
-        game_type=game_type,
-        score=score,
-        raw_score=raw_score,
-        max_score=max_score,
-        max_streak=max_streak,
-        duration_seconds=duration_seconds,
-        details=details,
-    )
+    fields = {
+        'game_type': game_type,
+        'score': score,
+        'raw_score': raw_score,
+        'max_score': max_score,
+        'max_streak': max_streak,
+        'duration_seconds': duration_seconds,
+        'details': details,
+    }
+
+    # Results replayed from the offline queue keep the time they were played.
+    played_at = payload.get('played_at')
+    if played_at is not None:
+        parsed = parse_datetime(played_at) if isinstance(played_at, str) else None
+        if parsed is None:
+            return None, 'invalid_played_at'
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed, dt_timezone.utc)
+        now = timezone.now()
+        fields['created_at'] = min(max(parsed, now - GAME_RESULT_MAX_BACKDATE), now)
+
+    return fields, None
+
+
+def _parse_idempotency_key(payload):
+    """The stripped client key, '' when absent, None when malformed."""
+    key = payload.get('idempotency_key') if isinstance(payload, dict) else None
+    if key is None:
+        return ''
+    key = key.strip() if isinstance(key, str) else ''
+    return key if key and len(key) <= 64 else None
+
+
+def _stars_for_score(score: int) -> int:
+    return max(1, int(score // 20))
+
+
+@login_required
+@require_POST
+def record_game_result(request):
+    if hasattr(request.user, 'specialist_profile'):
+        return JsonResponse({'ok': False, 'error': 'specialist_cannot_record'}, status=403)
+
+    try:
+        payload = json.loads(request.body.decode('utf-8') or '{}')
+    except json.JSONDecodeError:
+        return JsonResponse({'ok': False, 'error': 'invalid_json'}, status=400)
+
+    key = _parse_idempotency_key(payload)
+    if key is None:
+        return JsonResponse({'ok': False, 'error': 'invalid_idempotency_key'}, status=400)
+
+    fields, error = _parse_game_result_payload(payload)
+    if error:
+        return JsonResponse({'ok': False, 'error': error}, status=400)
 
     profile, _created = ChildProfile.objects.get_or_create(user=request.user, defaults={'stars': 0})
-    stars_earned = max(1, int(score // 20))
-    ChildProfile.objects.filter(id=profile.id).update(stars=F('stars') + stars_earned)
-
-    # Badge rules
-    total_results = GameResult.objects.filter(user=request.user).count()
-    if total_results == 1:
-        _award_badge(request.user, 'first_game')
-
-    counts_by_game = {
-        GameResult.GameType.MATH: GameResult.objects.filter(user=request.user, game_type=GameResult.GameType.MATH).count(),
-        GameResult.GameType.MEMORY: GameResult.objects.filter(user=request.user, game_type=GameResult.GameType.MEMORY).count(),
-        GameResult.GameType.ATTENTION: GameResult.objects.filter(user=request.user, game_type=GameResult.GameType.ATTENTION).count(),
-        GameResult.GameType.SOUND: GameResult.objects.filter(user=request.user, game_type=GameResult.GameType.SOUND).count(),
-        GameResult.GameType.WORDS: GameResult.objects.filter(user=request.user, game_type=GameResult.GameType.WORDS).count(),
-        GameResult.GameType.SENTENCES: GameResult.objects.filter(user=request.user, game_type=GameResult.GameType.SENTENCES).count(),
-        GameResult.GameType.ARTICULATION: GameResult.objects.filter(user=request.user, game_type=GameResult.GameType.ARTICULATION).count(),
-    }
-    if counts_by_game[GameResult.GameType.MATH] >= 5:
-        _award_badge(request.user, 'math_5')
-    if counts_by_game[GameResult.GameType.MEMORY] >= 5:
-        _award_badge(request.user, 'memory_5')
-    if counts_by_game[GameResult.GameType.WORDS] >= 5:
-        _award_badge(request.user, 'words_5')
-    if counts_by_game[GameResult.GameType.SOUND] >= 5:
-        _award_badge(request.user, 'sound_5')
-    if counts_by_game[GameResult.GameType.SENTENCES] >= 5:
-        _award_badge(request.user, 'sentences_5')
-    if counts_by_game[GameResult.GameType.ARTICULATION] >= 5:
-        _award_badge(request.user, 'articulation_5')
+    with transaction.atomic():
+        existing_id = None
+        if key:
+            # Same lock as the batch view: a result stored by either endpoint
+            # (or a concurrent retry) is found here and earns no stars again.
+            ChildProfile.objects.select_for_update().filter(id=profile.id).first()
+            existing_id = (
+                GameResult.objects.filter(user=request.user, idempotency_key=key)
+                .values_list('id', flat=True)
+                .first()
+            )
+        if existing_id is None:
+            result = GameResult.objects.create(user=request.user, idempotency_key=key or None, **fields)
+            record_game_counters(request.user, fields['game_type'], fields['score'])
+            record_game_features(request.user.id, [result])
+            stars_earned = _stars_for_score(fields['score'])
+            ChildProfile.objects.filter(id=profile.id).update(stars=F('stars') + stars_earned)
+
+    new_total_query = ChildProfile.objects.filter(id=profile.id).values_list('stars', flat=True)
+    if existing_id is not None:
+        return JsonResponse(
+            {'ok': True, 'id': existing_id, 'duplicate': True, 'stars_earned': 0, 'stars_total': new_total_query.first() or 0}
+        )
+
+    sync_badges(request.user, metrics={'games'})
+
+    return JsonResponse({'ok': True, 'id': result.id, 'stars_earned': stars_earned, 'stars_total': new_total_query.first() or 0})
+
+
+GAME_RESULTS_BATCH_MAX = 100
+
+
+@login_required
+@require_POST
+def record_game_results_batch(request):
+    """
+    Store a queue of game results recorded offline, in one request.
+
+    Body: {"results": [{...same fields as api/game-results/..., "idempotency_key": "<client uuid>"}]}.
+    Results whose key was already stored are reported as duplicates and earn no
+    stars, so the client can safely replay the whole queue after a lost response.
+    Invalid results are reported in `rejected` and the rest are still stored.
+    """
+    if hasattr(request.user, 'specialist_profile'):
+        return JsonResponse({'ok': False, 'error': 'specialist_cannot_record'}, status=403)
+
+    try:
+        payload = json.loads(request.body.decode('utf-8') or '{}')
+    except json.JSONDecodeError:
+        return JsonResponse({'ok': False, 'error': 'invalid_json'}, status=400)
+
+    items = payload.get('results') if isinstance(payload, dict) else None
+    if not isinstance(items, list):
+        return JsonResponse({'ok': False, 'error': 'invalid_results'}, status=400)
+    if len(items) > GAME_RESULTS_BATCH_MAX:
+        return JsonResponse({'ok': False, 'error': 'batch_too_large', 'max_results': GAME_RESULTS_BATCH_MAX}, status=400)
+
+    parsed = {}
+    rejected = []
+    for index, item in enumerate(items):
+        key = _parse_idempotency_key(item)
+        if not key:
+            raw_key = item.get('idempotency_key') if isinstance(item, dict) else None
+            raw_key = raw_key if isinstance(raw_key, str) and raw_key.strip() else None
+            rejected.append({'index': index, 'idempotency_key': raw_key, 'error': 'invalid_idempotency_key'})
+            continue
+        fields, error = _parse_game_result_payload(item)
+        if error:
+            rejected.append({'index': index, 'idempotency_key': key, 'error': error})
+            continue
+        # A key repeated inside one batch is stored once.
+        parsed.setdefault(key, fields)
+
+    with transaction.atomic():
+        # Lock the child's profile row so concurrent replays of the same queue
+        # are serialized and cannot both award stars for one result.
+        profile, _created = ChildProfile.objects.get_or_create(user=request.user, defaults={'stars': 0})
+        profile = ChildProfile.objects.select_for_update().get(id=profile.id)
+
+        duplicates = set(
+            GameResult.objects.filter(user=request.user, idempotency_key__in=list(parsed))
+            .values_list('idempotency_key', flat=True)
+        )
+        new_results = [
+            GameResult(user=request.user, idempotency_key=key, **fields)
+            for key, fields in parsed.items()
+            if key not in duplicates
+        ]
+
+        stars_earned = 0
+        if new_results:
+            GameResult.objects.bulk_create(new_results)
+            record_game_batch_counters(request.user, [(r.game_type, r.score) for r in new_results])
+            record_game_features(request.user.id, new_results)
+            stars_earned = sum(_stars_for_score(r.score) for r in new_results)
+            ChildProfile.objects.filter(id=profile.id).update(stars=F('stars') + stars_earned)
+
+    if new_results:
+        sync_badges(request.user, metrics={'games'})
 
     new_total = ChildProfile.objects.filter(id=profile.id).values_list('stars', flat=True).first() or 0
-    return JsonResponse({'ok': True, 'id': result.id, 'stars_earned': stars_earned, 'stars_total': new_total})
+    return JsonResponse(
+        {
+            'ok': True,
+            'accepted': [r.idempotency_key for r in new_results],
+            'duplicates': sorted(duplicates),
+            'rejected': rejected,
+            'stars_earned': stars_earned,
+            'stars_total': new_total,
+        }
+    )
 
 
 @login_required
@@ -2180,7 +2054,9 @@ def record_story_listen(request):
         if duration_seconds is not None and duration_seconds < 0:
             duration_seconds = None
 
-    listen = StoryListen.objects.create(user=request.user, story=story, duration_seconds=duration_seconds)
+    with transaction.atomic():
+        listen = StoryListen.objects.create(user=request.user, story=story, duration_seconds=duration_seconds)
+        record_story_counters(request.user, first_time_for_story)
 
     profile, _created = ChildProfile.objects.get_or_create(user=request.user, defaults={'stars': 0})
     stars_earned = 0
@@ -2188,14 +2064,7 @@ def record_story_listen(request):
         stars_earned = 2
         ChildProfile.objects.filter(id=profile.id).update(stars=F('stars') + stars_earned)
 
-    listened_unique = (
-        StoryListen.objects.filter(user=request.user)
-        .values('story_id')
-        .distinct()
-        .count()
-    )
-    if listened_unique >= 3:
-        _award_badge(request.user, 'stories_3')
+    sync_badges(request.user, metrics={'stories'})
 
     new_total = ChildProfile.objects.filter(id=profile.id).values_list('stars', flat=True).first() or 0
     return JsonResponse({'ok': True, 'id': listen.id, 'stars_earned': stars_earned, 'stars_total': new_total})
@@ -2247,7 +2116,9 @@ def predict_performance(request):
     - user_id: User ID (defaults to current user)
     - username: Username (alternative to user_id)
     - game_type: Game type to predict (required)
-    - train: If 'true', train model before prediction (optional)
+    - train: If 'true', queue a retraining job (optional) and skip the stored snapshot.
+      Training never runs in the request: without a model the job is queued and the
+      answer is the heuristic prediction (analysis_mode 'heuristic', training_job_id)
     
     Returns JSON with:
     - predicted_score: Predicted next score (0-100)
@@ -2257,7 +2128,7 @@ def predict_performance(request):
     - days_to_mastery: Estimated days to reach mastery
     - attempts_to_mastery: Estimated attempts to reach mastery
     """
-    from ml_services import ProgressPredictor
+    from ml_services import ProgressPredictor, model_registry
     import logging
     
     logger = logging.getLogger(__name__)
@@ -2275,14 +2146,7 @@ def predict_performance(request):
         }, status=400)
     
     # Validate game_type is valid choice
-    valid_game_types = {
-        GameResult.GameType.MATH,
-        GameResult.GameType.ATTENTION,
-        GameResult.GameType.SOUND,
-        GameResult.GameType.WORDS,
-        GameResult.GameType.SENTENCES,
-        GameResult.GameType.ARTICULATION,
-    }
+    valid_game_types = set(PREDICTION_GAME_TYPES)
     if game_type not in valid_game_types:
         return JsonResponse({
             'error': f'Невірний тип активності. Доступні значення: {", ".join(sorted(valid_game_types))}'
@@ -2310,212 +2174,64 @@ def predict_performance(request):
 
     def build_history(target_user_id: int, target_game_type: str):
         """Build recent activity history for UI display."""
-        recent_results = list(
+        return prediction_history(
             GameResult.objects
             .filter(user_id=target_user_id, game_type=target_game_type)
             .order_by('-created_at')
-            .values('score', 'raw_score', 'max_score', 'duration_seconds', 'details', 'created_at')[:100]
+            .values(*PREDICTION_HISTORY_FIELDS)[:PREDICTION_HISTORY_LIMIT]
         )
 
-        def to_non_negative_int(value, default=0):
-            try:
-                parsed = int(value)
-                return parsed if parsed >= 0 else default
-            except (TypeError, ValueError):
-                return default
-
-        def resolve_attempts(item):
-            details = item.get('details') or {}
-            if not isinstance(details, dict):
-                details = {}
-
-            failed_attempts = to_non_negative_int(details.get('failed_attempts'), 0)
-
-            if details.get('successful_attempts') is not None:
-                successful_attempts = to_non_negative_int(details.get('successful_attempts'), 0)
-            elif details.get('rating_stars') is not None:
-                rating_stars = to_non_negative_int(details.get('rating_stars'), 0)
-                successful_attempts = 1 if rating_stars >= 3 else 0
-                if failed_attempts == 0 and rating_stars <= 2:
-                    failed_attempts = 1
-            elif item.get('raw_score') is not None:
-                successful_attempts = to_non_negative_int(item.get('raw_score'), 0)
-            elif item.get('max_score') is not None and item.get('score') is not None:
-                max_score = to_non_negative_int(item.get('max_score'), 0)
-                successful_attempts = to_non_negative_int(round(max_score * (float(item.get('score')) / 100.0)), 0)
-            else:
-                successful_attempts = 1 if to_non_negative_int(item.get('score'), 0) >= 70 else 0
-
-            return successful_attempts, failed_attempts
-
-        history = [
-            {
-                'score': float(item['score']) if item['score'] is not None else None,
-                'duration_seconds': int(item['duration_seconds'] or 0),
-                'successful_attempts': resolve_attempts(item)[0],
-                'failed_attempts': resolve_attempts(item)[1],
-                'created_at': item['created_at'].isoformat() if item['created_at'] else None,
-            }
-            for item in recent_results
-        ]
-        history.reverse()
-        return history
-
-    def build_heuristic_prediction(history, predictor_instance: ProgressPredictor, activity_type: str):
-        """Build a heuristic prediction when training data is insufficient."""
-        scores = [item['score'] for item in history if item.get('score') is not None]
-        if not scores:
-            return None
-
-        current_score = scores[-1]
-        window_size = min(len(scores), predictor_instance.window_size)
-        window_scores = scores[-window_size:]
-        avg_score = sum(window_scores) / window_size
-        score_trend = scores[-1] - scores[-2] if len(scores) > 1 else 0.0
-
-        predicted_score = avg_score + score_trend
-        if current_score >= 90 and score_trend >= 0:
-            predicted_score = max(predicted_score, current_score - 15)
-
-        predicted_score = max(0.0, min(100.0, predicted_score))
+    def respond(prediction: dict, history):
+        return JsonResponse(prediction_entry(prediction, user_id, display_name(user_id), game_type, history))
 
-        if len(window_scores) > 1:
-            mean = sum(window_scores) / len(window_scores)
-            variance = sum((value - mean) ** 2 for value in window_scores) / len(window_scores)
-            std_dev = variance ** 0.5
-            confidence = max(0.0, min(100.0, 100 - (std_dev * 2)))
-        else:
-            confidence = 50.0
-
-        created_dates = [parse_datetime(item['created_at']) for item in history]
-        created_dates = [value for value in created_dates if value is not None]
-        if len(created_dates) >= 2:
-            days_since_start = (created_dates[-1] - created_dates[0]).total_seconds() / 86400
-        else:
-            days_since_start = 0.0
-
-        days_to_mastery, attempts_to_mastery = predictor_instance._estimate_mastery(
-            current_score=current_score,
-            predicted_score=predicted_score,
-            score_trend=score_trend,
-            days_since_start=days_since_start,
-            attempt_number=len(scores) + 1,
-            mastery_threshold=90,
-        )
-
-        insight = predictor_instance._generate_insight(
-            predicted_score=predicted_score,
-            current_score=current_score,
-            score_trend=score_trend,
-            game_type=activity_type,
-        )
-
-        return {
-            'predicted_score': round(predicted_score, 1),
-            'current_score': round(current_score, 1),
-            'confidence': round(confidence, 1),
-            'insight': insight,
-            'days_to_mastery': days_to_mastery,
-            'attempts_to_mastery': attempts_to_mastery,
-            'score_trend': round(score_trend, 2),
-        }
-    
     try:
-        # Initialize predictor
-        predictor = ProgressPredictor(
-            model_type='xgboost',
-            model_dir='ml_models',
-            window_size=3,
-        )
-        
-        # Try to load existing model
-        model_loaded = predictor.load(game_type=game_type)
-        
-        # Train if requested or model not found
+        # Loaded once per process; reloaded only when the saved artifacts change.
+        predictor = model_registry.get_for_game('xgboost', game_type, 3)
+        model_loaded = predictor is not None
+
+        # Serve the precomputed snapshot while the child has no newer result and the
+        # model that scored it is still the loaded one.
+        snapshot = None
+        if model_loaded and not should_train:
+            snapshot = fresh_snapshot(user_id, game_type, predictor.model_version)
+        if snapshot is not None:
+            return respond(snapshot_prediction(snapshot), build_history(user_id, game_type))
+
+        # Training runs in the background worker, one job per model at a time; the
+        # current model (or the heuristic, while there is none) answers meanwhile.
+        training_job = None
         if should_train or not model_loaded:
-            logger.info(f"Training model for game_type={game_type}")
-            try:
-                metrics = predictor.train(game_type=game_type, min_entries=3)
-                predictor.save(game_type=game_type)
-                model_info = {
-                    'model_trained': True,
-                    'metrics': metrics,
-                }
-            except ValueError as e:
-                logger.warning(f"Insufficient training data for {game_type}: {str(e)}")
-                history = build_history(user_id, game_type)
-                heuristic = build_heuristic_prediction(history, predictor, game_type)
-                if heuristic:
-                    heuristic['model_info'] = {
-                        'model_trained': False,
-                        'model_loaded': model_loaded,
-                        'analysis_mode': 'heuristic',
-                    }
-                    heuristic['user_id'] = user_id
-                    try:
-                        target_user = User.objects.get(id=user_id)
-                        heuristic['username'] = target_user.first_name or target_user.username
-                    except User.DoesNotExist:
-                        heuristic['username'] = f"Користувач №{user_id}"
-                    heuristic['game_type'] = game_type
-                    heuristic['history'] = history
-                    return JsonResponse(heuristic)
-                return JsonResponse({
-                    'error': 'Недостатньо даних для аналізу',
-                    'reason': 'Недостатньо даних для цього типу активності',
-                    'suggestion': 'Потрібно більше результатів активностей для аналізу. Спробуйте пізніше коли буде більше даних.',
-                    'model_info': {
-                        'model_trained': False,
-                        'model_loaded': model_loaded,
-                    },
-                    'history': build_history(user_id, game_type),
-                }, status=400)
-            except Exception as e:
-                logger.error(f"Training error for {game_type}: {str(e)}", exc_info=True)
-                history = build_history(user_id, game_type)
-                return JsonResponse({
-                    'error': 'Помилка під час аналізу',
-                    'reason': 'Технічна помилка під час аналізу даних',
-                    'suggestion': 'Зверніться до адміністратора або спробуйте інший тип активності.',
-                    'model_info': {
-                        'model_trained': False,
-                        'model_loaded': model_loaded,
-                    },
-                    'history': history,
-                }, status=500)
-        else:
-            model_info = {
-                'model_trained': False,
-                'model_loaded': True,
-            }
-        
+            training_job = enqueue_model_training(game_type)
+            logger.info(f"Training job {training_job.id} queued for game_type={game_type}")
+
+        model_info = {
+            'model_trained': False,
+            'model_loaded': model_loaded,
+        }
+        if training_job:
+            model_info['training_job_id'] = training_job.id
+
         history = build_history(user_id, game_type)
-        min_history_for_ml = 10
 
-        if len(history) < min_history_for_ml:
-            heuristic = build_heuristic_prediction(history, predictor, game_type)
+        if not model_loaded or len(history) < PREDICTION_MIN_HISTORY_FOR_ML:
+            heuristic = build_heuristic_prediction(history, ProgressPredictor, game_type)
             if heuristic:
-                heuristic['model_info'] = {
-                    'model_trained': False,
-                    'model_loaded': model_loaded,
-                    'analysis_mode': 'heuristic',
-                }
-                heuristic['user_id'] = user_id
-                try:
-                    target_user = User.objects.get(id=user_id)
-                    heuristic['username'] = target_user.first_name or target_user.username
-                except User.DoesNotExist:
-                    heuristic['username'] = f"Користувач №{user_id}"
-                heuristic['game_type'] = game_type
-                heuristic['history'] = history
-                return JsonResponse(heuristic)
+                heuristic['model_info'] = {**model_info, 'analysis_mode': 'heuristic'}
+                return respond(heuristic, history)
+        if not model_loaded:
+            return JsonResponse({
+                'error': 'Недостатньо даних для аналізу',
+                'reason': 'Недостатньо даних для цього типу активності',
+                'suggestion': 'Потрібно більше результатів активностей для аналізу. Спробуйте пізніше коли буде більше даних.',
+                'model_info': model_info,
+                'history': history,
+            }, status=400)
 
         # Make prediction
         prediction = predictor.predict(user_id=user_id, game_type=game_type)
         
         if prediction is None:
             logger.warning(f"Cannot predict for user_id={user_id}, game_type={game_type} - insufficient data")
-            history = build_history(user_id, game_type)
             return JsonResponse({
                 'error': 'Неможливо зробити прогноз',
                 'reason': f'Недостатньо даних для цього учня у активності "{game_type}"',
@@ -2523,26 +2239,9 @@ def predict_performance(request):
                 'model_info': model_info,
                 'history': history,
             }, status=400)
-        
-        # Get username for display
-        try:
-            target_user = User.objects.get(id=user_id)
-            display_name = target_user.username
-            if target_user.first_name:
-                display_name = target_user.first_name
-        except User.DoesNotExist:
-            display_name = f"Користувач №{user_id}"
 
-        history = build_history(user_id, game_type)
-        
-        # Add model info and user info to response
         prediction['model_info'] = model_info
-        prediction['user_id'] = user_id
-        prediction['username'] = display_name
-        prediction['game_type'] = game_type
-        prediction['history'] = history
-        
-        return JsonResponse(prediction)
+        return respond(prediction, history)
         
     except Exception as e:
         logger.error(f"Error in predict_performance: {str(e)}", exc_info=True)
@@ -2553,6 +2252,80 @@ def predict_performance(request):
         }, status=500)
 
 
+PREDICTION_BULK_MAX_PAIRS = 300
+
+
+@login_required
+@require_POST
+def predict_performance_bulk(request):
+    """
+    Predictions for many of a specialist's students and game types in one request.
+
+    Body: {"usernames": [...], "game_types": [...], "history": true}. Both lists are
+    optional and default to all of the specialist's students / all game types;
+    other users' usernames are reported in `errors`. Scored with score_pairs():
+    a handful of queries and one model call per game. Unlike
+    api/predict-performance/ this never trains.
+    """
+    if not hasattr(request.user, 'specialist_profile'):
+        return JsonResponse({'ok': False, 'error': 'specialist_only'}, status=403)
+
+    try:
+        payload = json.loads(request.body.decode('utf-8') or '{}')
+    except json.JSONDecodeError:
+        return JsonResponse({'ok': False, 'error': 'invalid_json'}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({'ok': False, 'error': 'invalid_json'}, status=400)
+
+    usernames = payload.get('usernames')
+    game_types = payload.get('game_types')
+    include_history = payload.get('history', True) is not False
+    if usernames is not None and not (isinstance(usernames, list) and all(isinstance(u, str) for u in usernames)):
+        return JsonResponse({'ok': False, 'error': 'invalid_usernames'}, status=400)
+    if game_types is None:
+        game_types = list(PREDICTION_GAME_TYPES)
+    elif not isinstance(game_types, list) or not all(isinstance(g, str) and g in PREDICTION_GAME_TYPES for g in game_types):
+        return JsonResponse(
+            {'ok': False, 'error': 'invalid_game_types', 'game_types': list(PREDICTION_GAME_TYPES)},
+            status=400,
+        )
+    game_types = list(dict.fromkeys(game_types))
+
+    students = request.user.specialist_profile.students.all()
+    if usernames is not None:
+        students = students.filter(user__username__in=usernames)
+    students = list(students.order_by('user__username').values_list('user_id', 'user__username', 'user__first_name'))
+
+    errors = []
+    if usernames is not None:
+        found = {username for _, username, _ in students}
+        errors.extend(
+            {'username': username, 'error': 'student_not_found'}
+            for username in dict.fromkeys(usernames) if username not in found
+        )
+    if len(students) * len(game_types) > PREDICTION_BULK_MAX_PAIRS:
+        return JsonResponse(
+            {'ok': False, 'error': 'too_many_predictions', 'max_predictions': PREDICTION_BULK_MAX_PAIRS},
+            status=400,
+        )
+
+    pairs = [(user_id, game_type) for user_id, _, _ in students for game_type in game_types]
+    histories = recent_histories([user_id for user_id, _, _ in students], game_types)
+    results, pair_errors = score_pairs(pairs, histories)
+
+    predictions = []
+    for user_id, username, first_name in students:
+        for game_type in game_types:
+            pair = (user_id, game_type)
+            if pair in pair_errors:
+                errors.append(prediction_entry({'error': pair_errors[pair]}, user_id, first_name or username, game_type))
+                continue
+            history = histories.get(pair, []) if include_history else None
+            predictions.append(prediction_entry(results[pair], user_id, first_name or username, game_type, history))
+
+    return JsonResponse({'ok': True, 'predictions': predictions, 'errors': errors})
+
+
 # Specialist ML Predictions Page
 @login_required
 def specialist_ml_predictions(request):
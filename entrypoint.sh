@@ -19,6 +19,8 @@ until python manage.py migrate --noinput; do
 	sleep 2
 done
 
+python manage.py createcachetable
+
 python manage.py collectstatic --noinput || true
 
 if [ "${CREATE_DEFAULT_SUPERUSER:-1}" = "1" ]; then
@@ -29,17 +31,21 @@ fi
 # Check and train ML models if enabled
 if [ "${TRAIN_ML_MODELS:-0}" = "1" ]; then
 	echo "Checking ML model availability..."
-	if [ -d "ml_models" ] && [ "$(ls -A ml_models/*.joblib 2>/dev/null | wc -l)" -gt 0 ]; then
+	model_dir="${ML_MODEL_DIR:-ml_models}"
+	if [ -d "$model_dir" ] && [ "$(ls -A "$model_dir"/*/CURRENT "$model_dir"/*/manifest.json "$model_dir"/*.joblib 2>/dev/null | wc -l)" -gt 0 ]; then
 		echo "ML models found, skipping training."
 	else
-		echo "Training ML models for all game types..."
-		python manage.py train_ml_model --all-game-types --min-entries=3 || {
-			echo "WARNING: ML model training failed. Models will be trained on first prediction request." >&2
+		echo "Training the all-games ML model..."
+		python manage.py train_ml_model --min-entries=3 || {
+			echo "WARNING: ML model training failed. Training will be queued for the worker on the first prediction request." >&2
 		}
 	fi
 fi
 
 if [ "${1:-}" = "gunicorn" ]; then
+	# Background jobs (ML training, image derivatives, invite emails) are only queued by the
+	# web processes; `python manage.py run_worker` must run as a separate service to do them.
+	python manage.py run_worker --check || echo "WARNING: background jobs are piling up. Start a worker (python manage.py run_worker) beside the web service; without it models are never trained." >&2
 	host="0.0.0.0"
 		port="${PORT:-8080}"
 	workers="${WEB_CONCURRENCY:-2}"
@@ -0,0 +1,28 @@
+# Loaded automatically by gunicorn from the working directory (/app in the image).
+import glob
+import logging
+import os
+
+
+def post_fork(server, worker):
+    """
+    With ML_WARM_UP=1, load the saved ML models in each worker before it takes
+    traffic, so its first prediction is not slow. Off by default: warm-up imports
+    XGBoost into every worker, and workers that never serve a model-backed
+    prediction stay lean without it. Nothing is loaded while no bundle is saved.
+    """
+    if os.getenv('ML_WARM_UP', '0') != '1':
+        return
+    if not glob.glob(os.path.join(os.getenv('ML_MODEL_DIR', 'ml_models'), '*', 'CURRENT')):
+        return
+    try:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'includoland.settings')
+        import django
+
+        django.setup()
+        from ml_services.registry import warm_up
+
+        loaded = warm_up()
+        server.log.info('Worker %s warmed up %s ML model(s)', worker.pid, loaded)
+    except Exception:
+        logging.getLogger(__name__).exception('ML model warm-up failed; models will load on first request')
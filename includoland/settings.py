@@ -2,6 +2,7 @@ import os
 from pathlib import Path
 
 import dj_database_url
+from botocore.config import Config as BotoConfig
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -174,6 +175,25 @@ AWS_DEFAULT_ACL = None
 # We keep filenames unique via upload_to (UUID) so overwrites are extremely unlikely.
 AWS_S3_FILE_OVERWRITE = os.getenv('AWS_S3_FILE_OVERWRITE', '1').lower() in {'1', 'true', 'yes'}
 
+# Live existence checks (cache misses in accounts.media) run on a bounded thread pool that
+# shares one boto3 client; keep its connection pool at least as large as the thread pool.
+MEDIA_PROBE_WORKERS = int(os.getenv('MEDIA_PROBE_WORKERS', '8'))
+# Seconds a page waits for those checks; slower files are hidden for that request only.
+MEDIA_PROBE_DEADLINE = float(os.getenv('MEDIA_PROBE_DEADLINE', '1.5'))
+# Socket timeouts of the boto3 client (botocore waits 60s by default), so a probe that
+# missed the deadline frees its pool thread soon after. Reads also cover uploads, so keep
+# them well above the deadline.
+AWS_S3_CONNECT_TIMEOUT = float(os.getenv('AWS_S3_CONNECT_TIMEOUT', '3'))
+AWS_S3_READ_TIMEOUT = float(os.getenv('AWS_S3_READ_TIMEOUT', '10'))
+
+AWS_S3_CLIENT_CONFIG = BotoConfig(
+    s3={'addressing_style': AWS_S3_ADDRESSING_STYLE},
+    signature_version=AWS_S3_SIGNATURE_VERSION,
+    max_pool_connections=max(10, MEDIA_PROBE_WORKERS + 2),
+    connect_timeout=AWS_S3_CONNECT_TIMEOUT,
+    read_timeout=AWS_S3_READ_TIMEOUT,
+)
+
 STORAGES = {
     'default': {
         'BACKEND': 'storages.backends.s3boto3.S3Boto3Storage',
@@ -186,6 +206,37 @@ STORAGES = {
 MEDIA_URL = f"https://{AWS_S3_CUSTOM_DOMAIN}/"
 MEDIA_ROOT = None
 
+# One cache for every gunicorn worker and the job worker, so a media answer dropped in
+# one process is dropped for all of them (a per-process LocMemCache would keep serving
+# it). The table is created by `manage.py createcachetable` in entrypoint.sh.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    }
+}
+
+# How long (seconds) views trust a cached storage.exists() answer for a media file.
+# Entries are also dropped whenever a model holding the file is saved or deleted.
+MEDIA_EXISTS_CACHE_TTL = int(os.getenv('MEDIA_EXISTS_CACHE_TTL', '3600'))
+
+# Hours a stored PredictionSnapshot may be served (see `manage.py snapshot_predictions`).
+# Snapshots are also skipped as soon as the child records a newer result.
+PREDICTION_SNAPSHOT_MAX_AGE = float(os.getenv('PREDICTION_SNAPSHOT_MAX_AGE', '36'))
+
+# Score every game with the all-games model (`manage.py train_ml_model` without
+# --game-type) when it exists; per-game models are the fallback.
+ML_UNIFIED_MODEL = os.getenv('ML_UNIFIED_MODEL', '1').lower() in {'1', 'true', 'yes'}
+
+# Saved model bundles (train_ml_model, `ml.train` jobs and the prediction registry).
+# Every process that trains or serves predictions must see the same directory;
+# docker-compose.prod.yml mounts one volume there for the web and worker services.
+ML_MODEL_DIR = os.getenv('ML_MODEL_DIR', str(BASE_DIR / 'ml_models'))
+
+# Cores an `ml.train` background job may use for XGBoost; 0 = half of the machine's
+# cores, so training does not starve the web processes on the same host.
+ML_TRAINING_CPUS = int(os.getenv('ML_TRAINING_CPUS', '0'))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = '/login/'
@@ -6,12 +6,18 @@ from django.shortcuts import redirect, render
 from django.urls import reverse
 from django.views.decorators.csrf import ensure_csrf_cookie
 
+from accounts.images import DERIVATIVE_SIZES
+from accounts.media import stored_media_urls
 from accounts.models import ArticulationCard, ArticulationCardImage, ColoringPage, MyStoryImage, SentenceExercise, SoundCard, SpecialistActivity, SpecialistActivityStep, Story, WordPuzzleWord
 
 # Reuse the existing attention task generator used for printable worksheets.
 from accounts.views import _generate_attention_items
 
 
+# Game payloads reference the smallest WebP derivative at least this wide.
+GAME_IMAGE_FIT = DERIVATIVE_SIZES['card']
+
+
 def _child_stars(request):
     profile = getattr(request.user, 'child_profile', None)
     return getattr(profile, 'stars', None)
@@ -20,18 +26,14 @@ def _child_stars(request):
 def _active_coloring_uploads():
     uploads = (
         ColoringPage.objects.filter(is_active=True)
-        .only('id', 'title', 'file', 'file_type', 'created_at')
+        .exclude(media_available=False)
+        .only('id', 'title', 'file', 'file_type', 'created_at', 'media_meta', 'media_available')
         .order_by('-created_at')
     )
 
+    uploads = list(uploads)
     out = []
-    for p in uploads:
-        url = ''
-        try:
-            if p.file and p.file.storage.exists(p.file.name):
-                url = p.file.url
-        except Exception:
-            url = ''
+    for p, url in zip(uploads, stored_media_urls(uploads, 'file')):
         if not url:
             continue
         out.append(
@@ -98,27 +100,16 @@ def game_specialist_activity(request, activity_id: int):
 
     steps_qs = (
         SpecialistActivityStep.objects.filter(activity=activity)
-        .only('id', 'title', 'description', 'task_text', 'image', 'audio', 'position', 'created_at')
+        .only('id', 'title', 'description', 'task_text', 'image', 'audio', 'position', 'created_at', 'media_meta', 'media_available')
         .order_by('position', 'created_at')
     )
 
-    steps = []
-    for s in steps_qs:
-        image_url = ''
-        if s.image:
-            try:
-                if s.image.storage.exists(s.image.name):
-                    image_url = s.image.url
-            except Exception:
-                image_url = ''
-        audio_url = ''
-        if s.audio:
-            try:
-                if s.audio.storage.exists(s.audio.name):
-                    audio_url = s.audio.url
-            except Exception:
-                audio_url = ''
+    steps_qs = list(steps_qs)
+    image_urls = stored_media_urls(steps_qs, 'image', fit=GAME_IMAGE_FIT)
+    audio_urls = stored_media_urls(steps_qs, 'audio')
 
+    steps = []
+    for s, image_url, audio_url in zip(steps_qs, image_urls, audio_urls):
         steps.append(
             {
                 'id': s.id,
@@ -164,29 +155,27 @@ def game_math(request):
 def game_sounds(request):
     candidates = (
         SoundCard.objects.filter(is_active=True)
-        .only('id', 'title', 'image', 'audio')
+        .exclude(media_available=False)
+        .only('id', 'title', 'image', 'audio', 'media_meta', 'media_available')
         .order_by('-created_at')
     )
 
+    candidates = [c for c in candidates if c.image and c.audio]
+    image_urls = stored_media_urls(candidates, 'image', fit=GAME_IMAGE_FIT)
+    audio_urls = stored_media_urls(candidates, 'audio')
+
     sound_cards_payload = []
-    for c in candidates:
-        if not c.image or not c.audio:
-            continue
-        try:
-            if not c.image.storage.exists(c.image.name):
-                continue
-            if not c.audio.storage.exists(c.audio.name):
-                continue
-        except Exception:
-            # If storage is unavailable/misconfigured, don't break the game page.
+    for c, image_url, audio_url in zip(candidates, image_urls, audio_urls):
+        # Missing files (or unavailable storage) just hide the card.
+        if not image_url or not audio_url:
             continue
 
         sound_cards_payload.append(
             {
                 'id': c.id,
                 'label': c.title,
-                'image_url': c.image.url,
-                'audio_url': c.audio.url,
+                'image_url': image_url,
+                'audio_url': audio_url,
             }
         )
     context = {
@@ -205,6 +194,8 @@ def game_articulation(request):
         'image',
         'created_by',
         'sounds',
+        'media_meta',
+        'media_available',
     ).prefetch_related('images')
 
     # If specialist opens the game, show their own cards.
@@ -230,25 +221,15 @@ def game_articulation(request):
     if selected_sound:
         qs = qs.filter(sounds__icontains=selected_sound)
 
-    cards = []
-    for c in qs.order_by('-created_at')[:200]:
-        image_urls = []
-        if c.image:
-            try:
-                if c.image.storage.exists(c.image.name):
-                    image_urls.append(c.image.url)
-            except Exception:
-                pass
-
-        for img in c.images.all():
-            if not img.image:
-                continue
-            try:
-                if img.image.storage.exists(img.image.name):
-                    image_urls.append(img.image.url)
-            except Exception:
-                continue
+    card_list = list(qs.order_by('-created_at')[:200])
+    extra_images = [img for c in card_list for img in c.images.all()]
+    extra_urls = dict(
+        zip((img.id for img in extra_images), stored_media_urls(extra_images, 'image', fit=GAME_IMAGE_FIT))
+    )
 
+    cards = []
+    for c, main_url in zip(card_list, stored_media_urls(card_list, 'image', fit=GAME_IMAGE_FIT)):
+        image_urls = [main_url] + [extra_urls[img.id] for img in c.images.all()]
         image_urls = [u for u in image_urls if u]
         if not image_urls:
             continue
@@ -275,7 +256,11 @@ def game_articulation(request):
 
 @ensure_csrf_cookie
 def game_my_story(request):
-    qs = MyStoryImage.objects.filter(is_active=True).only('id', 'title', 'image', 'created_by')
+    qs = (
+        MyStoryImage.objects.filter(is_active=True)
+        .exclude(media_available=False)
+        .only('id', 'title', 'image', 'created_by', 'media_meta', 'media_available')
+    )
 
     # If specialist opens the activity, show their own images.
     if request.user.is_authenticated and hasattr(request.user, 'specialist_profile'):
@@ -287,21 +272,18 @@ def game_my_story(request):
         if specialists:
             qs = qs.filter(created_by__in=[s.user for s in specialists])
 
+    image_list = list(qs.order_by('-created_at')[:200])
+
     images = []
-    for img in qs.order_by('-created_at')[:200]:
-        if not img.image:
-            continue
-        try:
-            if not img.image.storage.exists(img.image.name):
-                continue
-        except Exception:
+    for img, image_url in zip(image_list, stored_media_urls(image_list, 'image', fit=GAME_IMAGE_FIT)):
+        if not image_url:
             continue
 
         images.append(
             {
                 'id': img.id,
                 'title': img.title,
-                'image_url': img.image.url,
+                'image_url': image_url,
             }
         )
 
@@ -702,37 +684,17 @@ def learn_coloring_print(request):
 def stories_library(request):
     candidates = (
         Story.objects.filter(is_active=True)
-        .only('id', 'title', 'content_type', 'image', 'text', 'pdf_file', 'audio', 'created_at')
+        .only('id', 'title', 'content_type', 'image', 'text', 'pdf_file', 'audio', 'created_at', 'media_meta', 'media_available')
         .order_by('-created_at')
     )
 
-    stories = []
-    for s in candidates:
-        image_url = ''
-        pdf_url = ''
-        audio_url = ''
-
-        if s.image:
-            try:
-                if s.image.storage.exists(s.image.name):
-                    image_url = s.image.url
-            except Exception:
-                image_url = ''
-
-        if s.pdf_file:
-            try:
-                if s.pdf_file.storage.exists(s.pdf_file.name):
-                    pdf_url = s.pdf_file.url
-            except Exception:
-                pdf_url = ''
-
-        if s.audio:
-            try:
-                if s.audio.storage.exists(s.audio.name):
-                    audio_url = s.audio.url
-            except Exception:
-                audio_url = ''
+    candidates = list(candidates)
+    image_urls = stored_media_urls(candidates, 'image', fit=GAME_IMAGE_FIT)
+    pdf_urls = stored_media_urls(candidates, 'pdf_file')
+    audio_urls = stored_media_urls(candidates, 'audio')
 
+    stories = []
+    for s, image_url, pdf_url, audio_url in zip(candidates, image_urls, pdf_urls, audio_urls):
         stories.append(
             {
                 'id': s.id,
@@ -1,7 +1,31 @@
 """
 Machine Learning services for predictive analytics.
+
+The names below are imported from their submodules on first access (PEP 562),
+so `import ml_services` stays cheap for web workers: data_extractor brings in
+pandas, and ProgressPredictor imports scikit-learn and XGBoost only when a
+model is built, trained or loaded.
 """
-from .data_extractor import extract_game_data, preprocess_features
-from .progress_predictor import ProgressPredictor
+from importlib import import_module
+
+_EXPORTS = {
+    'extract_game_data': 'data_extractor',
+    'preprocess_features': 'data_extractor',
+    'ProgressPredictor': 'progress_predictor',
+    'ModelRegistry': 'registry',
+    'model_registry': 'registry',
+}
+
+__all__ = ['extract_game_data', 'preprocess_features', 'ProgressPredictor', 'ModelRegistry', 'model_registry']
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f'.{_EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
 
-__all__ = ['extract_game_data', 'preprocess_features', 'ProgressPredictor']
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,17 @@
+"""
+ML pipeline benchmarks: a deterministic synthetic GameResult generator, timed
+stages with tracemalloc peaks, and a JSON report that can be diffed between
+commits. Run them with `manage.py benchmark_ml_pipeline`; `manage.py
+benchmark_import_time` guards what django.setup() and the first request import.
+"""
+from .imports import HEAVY_MODULES, SCENARIOS, measure_imports, scenario_code
+from .report import build_report, compare_reports, write_report
+from .stages import StageTimer, run_pipeline
+from .synthetic import generate_results, load_synthetic_results
+
+__all__ = [
+    'HEAVY_MODULES', 'SCENARIOS', 'measure_imports', 'scenario_code',
+    'build_report', 'compare_reports', 'write_report',
+    'StageTimer', 'run_pipeline',
+    'generate_results', 'load_synthetic_results',
+]
@@ -0,0 +1,155 @@
+"""
+Import-time guard for web workers.
+
+Each scenario runs in a fresh interpreter under `python -X importtime`, so its
+numbers include every module it pulls in and nothing the caller already
+imported. django.setup(), the first request, importing the ml_services facade
+and a heuristic prediction (no saved model) should not load the ML stack: pandas, scikit-learn and XGBoost are
+imported on first use by training or by loading a saved model.
+"""
+from typing import Any, Dict, List, Optional
+import json
+import os
+import subprocess
+import sys
+
+# Top-level packages a web worker should not import before it trains or loads a model.
+HEAVY_MODULES = ('pandas', 'sklearn', 'scipy', 'xgboost', 'joblib')
+
+_SETUP = 'import django\ndjango.setup()\n'
+
+SCENARIOS = {
+    'django_setup': _SETUP,
+    'first_request': _SETUP + (
+        'from wsgiref.util import setup_testing_defaults\n'
+        'from django.core.wsgi import get_wsgi_application\n'
+        'environ = dict()\n'
+        'setup_testing_defaults(environ)\n'
+        'environ["PATH_INFO"] = {path!r}\n'
+        '_statuses = []\n'
+        'response = get_wsgi_application()(environ, lambda status, headers, *args: _statuses.append(status))\n'
+        'b"".join(response)\n'
+        'response.close()\n'
+        '_info["status"] = int(_statuses[0].split()[0])\n'
+    ),
+    'ml_facade': _SETUP + (
+        'import ml_services\n'
+        'ml_services.ProgressPredictor, ml_services.model_registry\n'
+    ),
+    # A child's prediction for a game without a saved model (empty registry
+    # directory): the heuristic answers, and the ML stack must stay unloaded. The
+    # probe user and results are rolled back; an in-memory sqlite is migrated first.
+    'heuristic_prediction': _SETUP + (
+        'import sys\n'
+        'import tempfile\n'
+        'from django.contrib.auth.models import User\n'
+        'from django.core.management import call_command\n'
+        'from django.db import connection, transaction\n'
+        'from django.test import Client\n'
+        'from django.test.utils import setup_test_environment\n'
+        'import ml_services\n'
+        'from accounts.models import GameResult\n'
+        'if connection.vendor == "sqlite" and str(connection.settings_dict["NAME"]) in ("", ":memory:"):\n'
+        '    call_command("migrate", verbosity=0, interactive=False)\n'
+        'setup_test_environment()\n'
+        'ml_services.model_registry.model_dir = tempfile.mkdtemp()\n'
+        'class _Rollback(Exception):\n'
+        '    pass\n'
+        'try:\n'
+        '    with transaction.atomic():\n'
+        '        user = User.objects.create_user("importtime-probe")\n'
+        '        GameResult.objects.bulk_create(\n'
+        '            [GameResult(user=user, game_type="math", score=score) for score in (40, 55, 70)]\n'
+        '        )\n'
+        '        client = Client()\n'
+        '        client.force_login(user)\n'
+        '        response = client.get("/api/predict-performance/", dict(game_type="math"), secure=True)\n'
+        '        _info["status"] = response.status_code\n'
+        '        raise _Rollback()\n'
+        'except _Rollback:\n'
+        '    pass\n'
+        'loaded = [name for name in ("sklearn", "xgboost") if name in sys.modules]\n'
+        'assert not loaded, f"heuristic prediction imported {{loaded}}"\n'
+    ),
+}
+
+
+def scenario_code(name: str, path: str = '/') -> str:
+    """The code of a SCENARIOS entry; `path` is the URL the first request fetches."""
+    return SCENARIOS[name].format(path=path)
+
+
+_WRAPPER = (
+    'import json, time\n'
+    '_info = {{}}\n'
+    '_started = time.perf_counter()\n'
+    '{code}'
+    '_info["seconds"] = time.perf_counter() - _started\n'
+    'print("\\n" + json.dumps(_info))\n'
+)
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """The `-X importtime` lines as {'module', 'self_us', 'cumulative_us', 'depth'} dicts."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            continue  # the header line
+        module = name.strip()
+        modules.append({
+            'module': module,
+            'self_us': self_us,
+            'cumulative_us': cumulative_us,
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+        })
+    return modules
+
+
+def measure_imports(
+    code: str,
+    env: Optional[Dict[str, str]] = None,
+    cwd: Optional[str] = None,
+    timeout: int = 300,
+    top: int = 10,
+) -> Dict[str, Any]:
+    """
+    Run `code` in a new interpreter with -X importtime (from `cwd`, which should be
+    the project root, with this environment plus `env`). Returns its wall time, the
+    total import time, the module count, the HEAVY_MODULES it imported and the
+    `top` slowest top-level imports.
+    """
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _WRAPPER.format(code=code)],
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+        env={**os.environ, **(env or {})},
+        cwd=cwd,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f'Scenario failed with exit code {proc.returncode}:\n{proc.stderr[-2000:]}')
+
+    info = json.loads(proc.stdout.strip().splitlines()[-1])
+    modules = parse_importtime(proc.stderr)
+    loaded = {entry['module'].split('.')[0] for entry in modules}
+    top_level = sorted(
+        (entry for entry in modules if entry['depth'] == 0),
+        key=lambda entry: entry['cumulative_us'],
+        reverse=True,
+    )
+    return {
+        **{key: value for key, value in info.items() if key != 'seconds'},
+        'seconds': round(info['seconds'], 4),
+        'import_seconds': round(sum(entry['self_us'] for entry in modules) / 1e6, 4),
+        'modules': len(modules),
+        'heavy_modules': [name for name in HEAVY_MODULES if name in loaded],
+        'slowest': [
+            {'module': entry['module'], 'ms': round(entry['cumulative_us'] / 1000, 1)}
+            for entry in top_level[:top]
+        ],
+    }
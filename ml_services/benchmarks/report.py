@@ -0,0 +1,76 @@
+"""
+Benchmark reports: one JSON document per run, comparable between commits.
+"""
+from typing import Any, Dict, List, Optional
+import json
+import os
+import platform
+import subprocess
+
+REPORT_FORMAT = 1
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, timeout=5, check=True,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _environment() -> Dict[str, Any]:
+    from django.db import connection
+    import numpy
+    import pandas
+    import sklearn
+    import xgboost
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'database': connection.vendor,
+        'numpy': numpy.__version__,
+        'pandas': pandas.__version__,
+        'sklearn': sklearn.__version__,
+        'xgboost': xgboost.__version__,
+    }
+
+
+def build_report(stages: Dict[str, Dict[str, Any]], params: Dict[str, Any]) -> Dict[str, Any]:
+    from django.utils import timezone
+
+    return {
+        'format': REPORT_FORMAT,
+        'created_at': timezone.now().isoformat(),
+        'git_commit': _git_commit(),
+        'environment': _environment(),
+        'params': params,
+        'stages': stages,
+    }
+
+
+def write_report(report: Dict[str, Any], path: str) -> None:
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Per stage of `current`: baseline and current seconds/peak and the time ratio (current / baseline)."""
+    rows = []
+    for name, stage in current['stages'].items():
+        before = baseline.get('stages', {}).get(name, {})
+        ratio = None
+        if before.get('seconds'):
+            ratio = round(stage['seconds'] / before['seconds'], 3)
+        rows.append({
+            'stage': name,
+            'baseline_seconds': before.get('seconds'),
+            'seconds': stage['seconds'],
+            'ratio': ratio,
+            'baseline_peak_mb': before.get('peak_mb'),
+            'peak_mb': stage.get('peak_mb'),
+        })
+    return rows
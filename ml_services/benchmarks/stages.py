@@ -0,0 +1,96 @@
+"""
+Timed ML pipeline stages.
+
+Each stage records wall time and, unless disabled, the tracemalloc peak: Python
+and NumPy/pandas buffers are traced, memory allocated inside XGBoost's C++ code
+is not. Tracing slows allocation-heavy stages somewhat, so compare reports taken
+with the same setting.
+"""
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+
+class StageTimer:
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the block; the yielded dict takes extra numbers for the report (rows, samples...)."""
+        info: Dict[str, Any] = {}
+        if self.trace_memory:
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield info
+        finally:
+            info['seconds'] = round(time.perf_counter() - started, 4)
+            if self.trace_memory:
+                info['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+                tracemalloc.stop()
+            self.stages[name] = info
+
+
+def run_pipeline(
+    timer: StageTimer,
+    game_type: Optional[str] = None,
+    model_type: str = 'xgboost',
+    window_size: int = 3,
+    min_entries: int = 5,
+    predictions: int = 200,
+    seed: int = 42,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Run extract_game_data, preprocess_features, ProgressPredictor.train, the
+    feature store rebuild, `predictions` single predict() calls and one
+    predict_many() over the same pairs against the current database. Models are kept in a temporary directory.
+    """
+    from accounts.feature_store import rebuild_feature_store
+    from ml_services.data_extractor import extract_game_data, preprocess_features
+    from ml_services.progress_predictor import ProgressPredictor
+
+    with timer.stage('extract_game_data') as info:
+        df = extract_game_data(game_type=game_type, min_entries=min_entries)
+        info['rows'] = len(df)
+
+    with timer.stage('preprocess_features') as info:
+        X, _y = preprocess_features(df, window_size=window_size)
+        info['samples'] = len(X)
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        predictor = ProgressPredictor(model_type=model_type, model_dir=model_dir, window_size=window_size)
+        with timer.stage('train') as info:
+            metrics = predictor.train(game_type=game_type, min_entries=min_entries)
+            info['samples'] = int(metrics['n_samples'])
+            info['test_mae'] = round(float(metrics['test_mae']), 3)
+
+    with timer.stage('rebuild_feature_store') as info:
+        info['rows'] = rebuild_feature_store()
+
+    pairs = df[['user_id', 'game_type']].drop_duplicates().to_numpy()
+    rng = np.random.default_rng(seed)
+    chosen = pairs[rng.choice(len(pairs), size=min(predictions, len(pairs)), replace=False)]
+    latencies = []
+    with timer.stage('predict') as info:
+        for user_id, pair_game_type in chosen:
+            started = time.perf_counter()
+            predictor.predict(int(user_id), str(pair_game_type))
+            latencies.append((time.perf_counter() - started) * 1000)
+        info['calls'] = len(latencies)
+        if latencies:
+            info['median_ms'] = round(statistics.median(latencies), 3)
+            info['p95_ms'] = round(float(np.percentile(latencies, 95)), 3)
+
+    with timer.stage('predict_many') as info:
+        batch = predictor.predict_many([(int(user_id), str(pair_game_type)) for user_id, pair_game_type in chosen])
+        info['calls'] = len(batch)
+
+    return timer.stages
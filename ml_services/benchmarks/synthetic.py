@@ -0,0 +1,137 @@
+"""
+Deterministic synthetic GameResults with realistic learning curves.
+
+Every child has an ability and a learning rate, every game type a difficulty.
+A child's scores in a game start near ability - difficulty and approach a
+personal ceiling along 1 - exp(-rate * attempt), with noise and an occasional
+bad day. Duration, hints and failed attempts fall as the score rises; sessions
+are spread over days at school-day hours. The same (children, attempts, seed)
+always produces the same rows.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Iterator, NamedTuple
+import json
+
+import numpy as np
+
+from accounts.models import GameResult
+
+# Relative difficulty per game type (0 = easiest).
+GAME_DIFFICULTY = {
+    'math': 0.25,
+    'memory': 0.15,
+    'attention': 0.2,
+    'sound': 0.1,
+    'words': 0.2,
+    'sentences': 0.3,
+    'articulation': 0.35,
+}
+TASKS_PER_GAME = 10
+START = datetime(2024, 1, 8, tzinfo=dt_timezone.utc)
+
+
+class SyntheticResult(NamedTuple):
+    child: int
+    game_type: str
+    score: int
+    raw_score: int
+    max_score: int
+    max_streak: int
+    duration_seconds: int
+    details: str
+    created_at: datetime
+
+
+def generate_results(children: int, attempts: int = 20, seed: int = 42) -> Iterator[SyntheticResult]:
+    """
+    Results for `children` children x every game type, about `attempts` per pair
+    (Poisson), in (child, game_type, created_at) order.
+    """
+    rng = np.random.default_rng(seed)
+    game_types = GameResult.GameType.values
+    for child in range(children):
+        ability = float(np.clip(rng.normal(0.65, 0.15), 0.2, 0.95))
+        rate = float(rng.uniform(0.05, 0.3))
+        ceiling = float(np.clip(ability + rng.normal(0.25, 0.05), 0.5, 1.0))
+        for game_type in game_types:
+            n = max(1, int(rng.poisson(attempts)))
+            start_level = float(np.clip(ability - GAME_DIFFICULTY.get(game_type, 0.2), 0.05, 0.9))
+            t = np.arange(n)
+            level = start_level + (ceiling - start_level) * (1 - np.exp(-rate * t))
+            level += rng.normal(0, 0.06, n) - (rng.random(n) < 0.05) * 0.25
+            level = np.clip(level, 0, 1)
+
+            raw = np.rint(level * TASKS_PER_GAME).astype(int)
+            scores = np.rint(level * 100).astype(int)
+            failed = np.maximum(0, TASKS_PER_GAME - raw + rng.integers(-1, 2, n))
+            hints = rng.poisson(np.maximum(0.05, 2.5 * (1 - level)))
+            streaks = np.minimum(raw, rng.integers(1, TASKS_PER_GAME + 1, n))
+            durations = np.maximum(15, rng.normal(240 * (1.3 - level), 30)).astype(int)
+
+            gaps = np.cumsum(rng.exponential(1.5, n))
+            hours = rng.integers(8, 20, n)
+            minutes = rng.integers(0, 60, n)
+            for i in range(n):
+                day = START + timedelta(days=int(gaps[i]))
+                yield SyntheticResult(
+                    child=child,
+                    game_type=game_type,
+                    score=int(scores[i]),
+                    raw_score=int(raw[i]),
+                    max_score=TASKS_PER_GAME,
+                    max_streak=int(streaks[i]),
+                    duration_seconds=int(durations[i]),
+                    details=json.dumps({
+                        'hints_used': int(hints[i]),
+                        'attempts': 1,
+                        'successful_attempts': int(raw[i]),
+                        'failed_attempts': int(failed[i]),
+                        'max_streak': int(streaks[i]),
+                    }),
+                    created_at=day.replace(hour=int(hours[i]), minute=int(minutes[i])),
+                )
+
+
+def load_synthetic_results(children: int, attempts: int = 20, seed: int = 42, batch_size: int = 10_000) -> dict:
+    """
+    Insert the generated children (bench_child_<n>) and their results into the
+    default database with raw INSERTs (cheaper than model instances at this size;
+    the generated created_at values are kept as given).
+    Returns {'children', 'results', 'user_ids'}.
+    """
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+
+    User = get_user_model()
+    users = User.objects.bulk_create(
+        [User(username=f'bench_child_{i}') for i in range(children)],
+        batch_size=1000,
+    )
+    user_ids = [user.pk for user in users]
+    if any(pk is None for pk in user_ids):
+        user_ids = list(
+            User.objects.filter(username__startswith='bench_child_').order_by('id').values_list('id', flat=True)
+        )
+
+    adapt = connection.ops.adapt_datetimefield_value
+    sql = (
+        f'INSERT INTO {GameResult._meta.db_table} '
+        '(user_id, game_type, score, raw_score, max_score, max_streak, duration_seconds, details, created_at) '
+        'VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)'
+    )
+    inserted = 0
+    batch = []
+    with connection.cursor() as cursor:
+        for result in generate_results(children, attempts, seed):
+            batch.append((
+                user_ids[result.child], result.game_type, result.score, result.raw_score, result.max_score,
+                result.max_streak, result.duration_seconds, result.details, adapt(result.created_at),
+            ))
+            if len(batch) == batch_size:
+                cursor.executemany(sql, batch)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+            inserted += len(batch)
+    return {'children': children, 'results': inserted, 'user_ids': user_ids}
@@ -4,35 +4,133 @@ import logging
 import numpy as np
 import pandas as pd
 from django.contrib.auth import get_user_model
-from django.db.models import QuerySet
+from django.db.models import Count, F, OuterRef, QuerySet, Subquery, Window
+from django.db.models.functions import RowNumber
 
+from accounts.feature_store import (
+    EPOCH as _EPOCH,
+    MICROSECOND as _MICROSECOND,
+    game_data_values,
+    game_type_one_hot,
+    resolve_successful_and_streak,
+    to_int as _to_int,
+    to_non_negative_int as _to_non_negative_int,
+)
 from accounts.models import GameResult
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
 
-def encode_time_of_day(timestamp) -> int:
-    if timestamp is None:
-        return 1
+class InsufficientDataError(ValueError):
+    """Too few game results to extract features or train; retrying will not help until more are played."""
 
-    hour = int(getattr(timestamp, 'hour', 12))
-    if 6 <= hour < 12:
-        return 0
-    if 12 <= hour < 18:
-        return 1
-    return 2
+
+def _stream_game_data(queryset: QuerySet, chunk_size: int) -> Optional[pd.DataFrame]:
+    """
+    Columnar extraction: only the needed columns (JSON keys extracted by the database
+    via ->>) are streamed with iterator(chunk_size) into preallocated NumPy arrays,
+    so no model instances or per-row dicts are built.
+    """
+    capacity = queryset.count()
+    if capacity == 0:
+        return None
+    return _game_data_frame(game_data_values(queryset).iterator(chunk_size=chunk_size), capacity)
+
+
+def _instance_game_data(result: GameResult) -> tuple:
+    """The GAME_DATA_COLUMNS row of a loaded GameResult (details keys as stored)."""
+    details: Dict[str, Any] = result.details or {}
+    return (
+        result.user_id, result.game_type, result.score, result.duration_seconds,
+        result.raw_score, result.max_score, result.max_streak, result.created_at,
+        details.get('hints_used'), details.get('attempts'), details.get('successful_attempts'),
+        details.get('failed_attempts'), details.get('max_streak'),
+    )
+
+
+def _game_data_frame(rows, capacity: int) -> Optional[pd.DataFrame]:
+    """
+    Fill the extract_game_data() columns from GAME_DATA_COLUMNS rows into NumPy
+    arrays sized `capacity` (grown if more rows arrive); None when there are no rows.
+
+    A details key that is missing or holds JSON null gets its default.
+    """
+    user_ids = np.empty(capacity, dtype=np.int64)
+    game_types = np.empty(capacity, dtype=object)
+    scores = np.empty(capacity, dtype=np.int64)
+    durations = np.empty(capacity, dtype=np.int64)
+    hints = np.empty(capacity, dtype=np.int64)
+    attempts = np.empty(capacity, dtype=np.int64)
+    successful = np.empty(capacity, dtype=np.int64)
+    failed = np.empty(capacity, dtype=np.int64)
+    streaks = np.empty(capacity, dtype=np.int64)
+    created_us = np.empty(capacity, dtype=np.int64)
+
+    n = 0
+    for (uid, gtype, score, duration, raw_score, max_score, max_streak, created_at,
+         d_hints, d_attempts, d_successful, d_failed, d_streak) in rows:
+        if n == capacity:
+            # Rows inserted after count(): grow instead of failing.
+            capacity = max(capacity * 2, 1024)
+            for arr in (user_ids, game_types, scores, durations, hints, attempts,
+                        successful, failed, streaks, created_us):
+                arr.resize(capacity, refcheck=False)
+
+        successful_attempts, streak = resolve_successful_and_streak(
+            score, raw_score, max_score, max_streak, d_successful, d_streak,
+        )
+
+        user_ids[n] = uid
+        game_types[n] = gtype
+        scores[n] = score
+        durations[n] = duration or 0
+        hints[n] = _to_int(d_hints, 0)
+        attempts[n] = _to_int(d_attempts, 1)
+        successful[n] = successful_attempts
+        failed[n] = _to_non_negative_int(d_failed, 0)
+        streaks[n] = streak
+        created_us[n] = (created_at - _EPOCH) // _MICROSECOND
+        n += 1
+
+    if n == 0:
+        return None
+
+    # encode_time_of_day() on the UTC hour, vectorized.
+    hours = (created_us[:n] // 3_600_000_000) % 24
+    time_of_day = np.where((hours >= 6) & (hours < 12), 0, np.where((hours >= 12) & (hours < 18), 1, 2))
+
+    return pd.DataFrame({
+        'user_id': user_ids[:n],
+        'game_type': game_types[:n],
+        'score': scores[:n],
+        'duration_seconds': durations[:n],
+        'hints_used': hints[:n],
+        'attempts': attempts[:n],
+        'successful_attempts': successful[:n],
+        'failed_attempts': failed[:n],
+        'max_streak': streaks[:n],
+        'time_of_day': time_of_day,
+        'created_at': pd.to_datetime(created_us[:n], unit='us', utc=True).as_unit('ns'),
+    })
 
 
 def extract_game_data(
     user_id: Optional[int] = None,
     game_type: Optional[str] = None,
     min_entries: int = 5,
+    streaming: bool = True,
+    chunk_size: int = 2000,
 ) -> pd.DataFrame:
+    """
+    One row per GameResult ordered by (user_id, game_type, created_at), keeping only
+    user/game groups with at least `min_entries` results.
 
+    streaming=True (default) reads columns with values_list().iterator(); set it to
+    False to read through model instances instead. Both fill the same columns.
+    """
     try:
-        # Build query with optimized select_related and filters
-        queryset: QuerySet[GameResult] = GameResult.objects.select_related('user')
+        queryset: QuerySet[GameResult] = GameResult.objects.all()
         
         if user_id is not None:
             queryset = queryset.filter(user_id=user_id)
@@ -42,84 +140,235 @@ def extract_game_data(
         
         # Order by user and creation time for sequential analysis
         queryset = queryset.order_by('user_id', 'game_type', 'created_at')
-        
-        # Extract data into a list of dictionaries
-        data: List[Dict[str, Any]] = []
-        
-        for result in queryset:
-            details: Dict[str, Any] = result.details or {}
-
-            def _to_non_negative_int(value: Any, default: int = 0) -> int:
-                try:
-                    parsed = int(value)
-                    return parsed if parsed >= 0 else default
-                except (TypeError, ValueError):
-                    return default
-
-            failed_attempts = _to_non_negative_int(details.get('failed_attempts'), 0)
-            max_streak = _to_non_negative_int(result.max_streak, 0)
-            if max_streak == 0:
-                max_streak = _to_non_negative_int(details.get('max_streak'), 0)
-            if details.get('successful_attempts') is not None:
-                successful_attempts = _to_non_negative_int(details.get('successful_attempts'), 0)
-            elif result.raw_score is not None:
-                successful_attempts = _to_non_negative_int(result.raw_score, 0)
-            elif result.max_score is not None and result.score is not None:
-                successful_attempts = _to_non_negative_int(round(result.max_score * (result.score / 100.0)), 0)
-            else:
-                successful_attempts = 1 if int(result.score or 0) >= 70 else 0
-            
-            data.append({
-                'user_id': result.user_id,
-                'game_type': result.game_type,
-                'score': result.score,
-                'duration_seconds': result.duration_seconds or 0,
-                'hints_used': details.get('hints_used', 0),
-                'attempts': details.get('attempts', 1),
-                'successful_attempts': successful_attempts,
-                'failed_attempts': failed_attempts,
-                'max_streak': max_streak,
-                'time_of_day': encode_time_of_day(result.created_at),
-                'created_at': result.created_at,
-            })
-        
-        if not data:
+
+        if streaming:
+            df = _stream_game_data(queryset, chunk_size)
+        else:
+            rows = [_instance_game_data(result) for result in queryset]
+            df = _game_data_frame(rows, len(rows))
+
+        if df is None:
             logger.warning(
                 f"No game results found for user_id={user_id}, game_type={game_type}"
             )
-            raise ValueError("Insufficient data: no game results found")
-        
-        df = pd.DataFrame(data)
-        
-        # Filter out user-game combinations with insufficient data
-        if min_entries > 1:
-            group_counts = df.groupby(['user_id', 'game_type']).size()
-            valid_groups = group_counts[group_counts >= min_entries].index
-            
-            if len(valid_groups) == 0:
-                raise ValueError(
-                    f"Insufficient data: minimum {min_entries} entries per user-game required"
-                )
-            
-            df = df.set_index(['user_id', 'game_type'])
-            df = df.loc[df.index.isin(valid_groups)]
-            df = df.reset_index()
-        
-        logger.info(
-            f"Extracted {len(df)} game results for {df['user_id'].nunique()} users"
-        )
-        
-        return df
+            raise InsufficientDataError("Insufficient data: no game results found")
+
+        return _filter_min_entries(df, min_entries)
         
     except Exception as e:
         logger.error(f"Error extracting game data: {str(e)}")
         raise
 
 
+def extract_game_data_since(
+    after_id: int,
+    window_size: int = 3,
+    game_type: Optional[str] = None,
+    up_to_id: Optional[int] = None,
+    chunk_size: int = 2000,
+    min_entries: int = 5,
+) -> Optional[pd.DataFrame]:
+    """
+    The rows a warm-start update trains on: every GameResult with id > after_id plus,
+    per affected (user, game_type), the `window_size` latest older results recorded
+    before its earliest new one, so the first new result still gets a full feature
+    window. The older rows never become samples themselves. up_to_id caps the new
+    rows (the caller's next watermark). Pairs with fewer than `min_entries` results
+    in total are left out, as extract_game_data() leaves them out of a rebuild.
+    Same columns and order as extract_game_data(); None when there is nothing new.
+
+    A backdated result (new id, older created_at) gets its window from the rows
+    before it, but the already trained rows between it and the later new results
+    are not read, so those results' windows skip them until the next full rebuild.
+    """
+    new_results = GameResult.objects.filter(id__gt=after_id)
+    if up_to_id is not None:
+        new_results = new_results.filter(id__lte=up_to_id)
+    if game_type is not None:
+        new_results = new_results.filter(game_type=game_type)
+    new_df = _stream_game_data(new_results.order_by('user_id', 'game_type', 'created_at'), chunk_size)
+    if new_df is None:
+        return None
+
+    pairs = pd.MultiIndex.from_frame(new_df[['user_id', 'game_type']].drop_duplicates())
+    in_pairs = {
+        'user_id__in': pairs.get_level_values('user_id').unique().tolist(),
+        'game_type__in': pairs.get_level_values('game_type').unique().tolist(),
+    }
+    if min_entries > 1:
+        totals = GameResult.objects.filter(**in_pairs)
+        if up_to_id is not None:
+            totals = totals.filter(id__lte=up_to_id)
+        eligible = [
+            (row['user_id'], row['game_type'])
+            for row in totals.values('user_id', 'game_type').annotate(n=Count('id')).order_by()
+            if row['n'] >= min_entries
+        ]
+        pairs = pairs[pairs.isin(eligible)]
+        if len(pairs) == 0:
+            return None
+        new_df = new_df[pd.MultiIndex.from_frame(new_df[['user_id', 'game_type']]).isin(pairs)]
+
+    first_new = (
+        new_results
+        .filter(user_id=OuterRef('user_id'), game_type=OuterRef('game_type'))
+        .order_by('created_at')
+        .values('created_at')[:1]
+    )
+    tail_results = (
+        GameResult.objects
+        .filter(id__lte=after_id, created_at__lt=Subquery(first_new), **in_pairs)
+        .annotate(tail_rank=Window(
+            RowNumber(),
+            partition_by=[F('user_id'), F('game_type')],
+            order_by=F('created_at').desc(),
+        ))
+        .filter(tail_rank__lte=window_size)
+        .order_by('user_id', 'game_type', 'created_at')
+    )
+    tail_df = _stream_game_data(tail_results, chunk_size)
+    if tail_df is not None:
+        # The IN filters select a user x game grid; keep only the affected pairs.
+        tail_df = tail_df[pd.MultiIndex.from_frame(tail_df[['user_id', 'game_type']]).isin(pairs)]
+        new_df = pd.concat([tail_df, new_df], ignore_index=True)
+
+    df = new_df.sort_values(['user_id', 'game_type', 'created_at'], kind='stable').reset_index(drop=True)
+    logger.info(
+        f"Extracted {len(df)} game results (id > {after_id} plus window tails) for {len(pairs)} user-game pairs"
+    )
+    return df
+
+
+def _filter_min_entries(df: pd.DataFrame, min_entries: int) -> pd.DataFrame:
+    # Filter out user-game combinations with insufficient data
+    if min_entries > 1:
+        group_counts = df.groupby(['user_id', 'game_type']).size()
+        valid_groups = group_counts[group_counts >= min_entries].index
+        
+        if len(valid_groups) == 0:
+            raise InsufficientDataError(
+                f"Insufficient data: minimum {min_entries} entries per user-game required"
+            )
+        
+        df = df.set_index(['user_id', 'game_type'])
+        df = df.loc[df.index.isin(valid_groups)]
+        df = df.reset_index()
+    
+    logger.info(
+        f"Extracted {len(df)} game results for {df['user_id'].nunique()} users"
+    )
+    
+    return df
+
+
+PREPROCESS_REQUIRED_COLUMNS = [
+    'user_id', 'game_type', 'score', 'duration_seconds',
+    'hints_used', 'attempts', 'successful_attempts', 'failed_attempts',
+    'max_streak', 'time_of_day', 'created_at'
+]
+_WINDOW_NUMERIC_COLUMNS = [
+    'score', 'duration_seconds', 'hints_used', 'successful_attempts',
+    'failed_attempts', 'max_streak', 'time_of_day',
+]
+
+
 def preprocess_features(
     df: pd.DataFrame,
     window_size: int = 3,
 ) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Rolling-window training samples: one row per attempt that has `window_size`
+    earlier attempts in the same (user, game_type), target = that attempt's score.
+
+    Vectorized over all groups at once with strided window views; the output is
+    identical to the per-row reference (`_preprocess_features_loop`), which is
+    still used when a window column is not numeric (e.g. odd `details` values).
+    """
+    missing_cols = set(PREPROCESS_REQUIRED_COLUMNS) - set(df.columns)
+    if missing_cols:
+        raise ValueError(f"Missing required columns: {missing_cols}")
+    
+    if len(df) < window_size + 1:
+        raise InsufficientDataError(
+            f"Insufficient data: need at least {window_size + 1} entries, got {len(df)}"
+        )
+
+    if not all(pd.api.types.is_numeric_dtype(df[col]) for col in _WINDOW_NUMERIC_COLUMNS):
+        return _preprocess_features_loop(df, window_size=window_size)
+
+    # Same (stable, multi-key) sort as the reference implementation.
+    df = df.sort_values(['user_id', 'game_type', 'created_at']).reset_index(drop=True)
+    w = window_size
+
+    group_keys = df.groupby(['user_id', 'game_type'], sort=False)
+    position = group_keys.cumcount().to_numpy()
+    # Row j is a sample when it has w earlier rows in its group; its window is rows [j - w, j).
+    rows = np.flatnonzero(position >= w)
+    if len(rows) == 0:
+        raise ValueError(
+            f"Could not generate features: need at least {window_size + 1} "
+            "sequential entries per user-game combination"
+        )
+    starts = rows - w
+
+    def windows(column: str) -> np.ndarray:
+        values = df[column].to_numpy()
+        return np.lib.stride_tricks.sliding_window_view(values, w)[starts]
+
+    def window_mean(column: str) -> np.ndarray:
+        # pandas' Series.mean(): float64 sum divided by the count.
+        return windows(column).sum(axis=1, dtype=np.float64) / w
+
+    def at(column: str, offset: int) -> np.ndarray:
+        return df[column].to_numpy()[rows + offset]
+
+    score_windows = windows('score')
+    if w > 1:
+        # pandas' Series.std() (ddof=1): two-pass variance on float64 values.
+        score_values = score_windows.astype(np.float64)
+        score_mean = score_values.sum(axis=1, dtype=np.float64) / w
+        squared = (score_mean[:, None] - score_values) ** 2
+        std_score = np.sqrt(squared.sum(axis=1, dtype=np.float64) / (w - 1))
+        # np.polyfit fits every window in one least-squares call (same x for all windows).
+        slope = np.polyfit(np.arange(w), score_values.T, 1)[0]
+        score_improvement = at('score', -1) - at('score', -2)
+    else:
+        std_score = np.zeros(len(rows), dtype=np.int64)
+        slope = np.zeros(len(rows), dtype=np.int64)
+        score_improvement = np.zeros(len(rows), dtype=np.int64)
+
+    first_created = group_keys['created_at'].transform('first')
+    days_since_start = ((df['created_at'] - first_created).dt.total_seconds() / 86400).to_numpy()
+
+    X = pd.DataFrame({
+        'user_id': at('user_id', 0),
+        'game_type': at('game_type', 0),
+        'attempt_number': position[rows] + 1,
+        'avg_score': score_windows.sum(axis=1, dtype=np.float64) / w,
+        'std_score': std_score,
+        'avg_duration': window_mean('duration_seconds'),
+        'total_hints': windows('hints_used').sum(axis=1),
+        'avg_successful_attempts': window_mean('successful_attempts'),
+        'avg_failed_attempts': window_mean('failed_attempts'),
+        'failed_attempts_trend': at('failed_attempts', -1) - at('failed_attempts', -w),
+        'avg_max_streak': window_mean('max_streak'),
+        'time_of_day': at('time_of_day', -1).astype(np.int64),
+        'score_trend': slope,
+        'last_score': at('score', -1),
+        'score_improvement': score_improvement,
+        'days_since_start': days_since_start[rows - 1],
+    })
+    y = pd.Series(at('score', 0), name='next_score')
+
+    logger.info(f"Generated {len(X)} training samples with {X.shape[1]} features")
+
+    return X, y
+
+
+def _preprocess_features_loop(
+    df: pd.DataFrame,
+    window_size: int = 3,
+) -> Tuple[pd.DataFrame, pd.Series]:
     
     required_cols = [
         'user_id', 'game_type', 'score', 'duration_seconds',
@@ -132,7 +381,7 @@ def preprocess_features(
         raise ValueError(f"Missing required columns: {missing_cols}")
     
     if len(df) < window_size + 1:
-        raise ValueError(
+        raise InsufficientDataError(
             f"Insufficient data: need at least {window_size + 1} entries, got {len(df)}"
         )
     
@@ -285,7 +534,6 @@ def extract_user_features(
         
         features = {
             'user_id': float(user_id),
-            'game_type': float(hash(game_type) % 10000),  # Simple encoding
             'attempt_number': float(attempt_number),
             'avg_score': float(avg_score),
             'std_score': float(std_score),
@@ -300,6 +548,7 @@ def extract_user_features(
             'last_score': float(last_score),
             'score_improvement': float(score_improvement),
             'days_since_start': float(days_since_start),
+            **game_type_one_hot(game_type),
         }
         
         return features
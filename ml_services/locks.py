@@ -0,0 +1,57 @@
+"""
+Cross-process single flight for training.
+
+Training and publishing a model holds an exclusive flock() on
+<model_dir>/.locks/<model_type>_<game_type|all>.lock, so a second trainer of the
+same model sees the lock taken and skips instead of repeating the fit. The lock
+only reaches processes that open the same directory on the same kernel: the
+processes of one container, and containers that mount one volume there (as the
+web and worker services of docker-compose.prod.yml mount `ml_models`). Trainers
+on other hosts are not serialized. The kernel drops the lock when its holder
+exits, so a killed trainer never leaves it behind.
+"""
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock(); training is not single-flight there.
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def lock_path_for(model_dir, model_type: str, game_type: Optional[str] = None) -> Path:
+    return Path(model_dir) / '.locks' / f"{model_type}_{game_type or 'all'}.lock"
+
+
+@contextmanager
+def model_training_lock(
+    model_dir,
+    model_type: str,
+    game_type: Optional[str] = None,
+    blocking: bool = False,
+) -> Iterator[bool]:
+    """
+    Yields True while this process holds the model's training lock, or False when
+    another process holds it (never with blocking=True, which waits instead).
+    """
+    path = lock_path_for(model_dir, model_type, game_type)
+    if fcntl is None:
+        yield True
+        return
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a') as fh:
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.info(f"Model {path.stem} is being trained by another process")
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
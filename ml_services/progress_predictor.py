@@ -1,21 +1,68 @@
-from typing import Dict, Optional, Tuple, Any
+"""
+Progress prediction model: training, bundles on disk and inference.
+
+pandas, scikit-learn, XGBoost and joblib are imported where training or loading
+needs them, not with this module. Inference reads the loaded model through
+InferenceParams: NumPy arrays and, for XGBoost, the raw Booster.
+"""
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple, Any
+import hashlib
 import logging
+import os
 from pathlib import Path
 import json
+import shutil
+import threading
+import time
 
 import numpy as np
-import pandas as pd
-from sklearn.linear_model import LinearRegression
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from sklearn.preprocessing import StandardScaler
-from xgboost import XGBRegressor
-import joblib
 
-from .data_extractor import extract_game_data, preprocess_features, extract_user_features
+from accounts.feature_store import GAME_TYPE_FEATURES, get_feature_states, user_window_features, window_features
+from accounts.models import GameFeatureState, GameResult
+from django.db.models import Max
+from django.utils import timezone
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+# Bumped whenever the bundle layout changes; older bundles are treated as outdated.
+BUNDLE_FORMAT_VERSION = 1
+# File in the bundle directory naming the version directory readers load.
+BUNDLE_POINTER = 'CURRENT'
+# Staging directories older than this were left by a crashed save.
+STALE_STAGING_SECONDS = 3600
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class InferenceParams(NamedTuple):
+    """What inference needs from a trained model, as arrays in feature_columns order."""
+    mean: np.ndarray
+    scale: np.ndarray
+    # XGBoost: the Booster, called through inplace_predict(). Linear: None.
+    booster: Any
+    # Linear: coefficients and intercept. XGBoost: None.
+    coef: Optional[np.ndarray]
+    intercept: float
+
+
+def _replace_file(path: Path, write) -> None:
+    """
+    Write through a temporary file and rename, so readers never see a partial file.
+    The temporary name keeps the extension (XGBoost and NumPy go by it).
+    """
+    tmp = path.with_name(f'.tmp.{os.getpid()}.{path.name}')
+    write(str(tmp))
+    os.replace(tmp, path)
+
 
 class ProgressPredictor:
     FEATURE_COLUMNS = [
@@ -34,6 +81,84 @@ class ProgressPredictor:
         'score_improvement',
         'days_since_start',
     ]
+    # One-hot game type, added for the all-games model (game_type=None).
+    GAME_TYPE_COLUMNS = GAME_TYPE_FEATURES
+
+    XGBOOST_PARAMS = {
+        'n_estimators': 300,
+        'learning_rate': 0.05,
+        'max_depth': 10,
+        'subsample': 0.9,
+        'colsample_bytree': 0.9,
+        'objective': 'reg:squarederror',
+        'random_state': 42,
+        'n_jobs': -1,
+    }
+    
+    # Ukrainian locative labels for insight texts.
+    INSIGHT_GAME_LABELS = {
+        'math': 'математиці',
+        'memory': 'іграх на пам\'ять',
+        'words': 'пазлах зі словами',
+        'sound': 'іграх зі звуками',
+        'sentences': 'побудові речень',
+        'articulation': 'артикуляційній гімнастиці',
+        'attention': 'вправах на увагу',
+    }
+    INSIGHT_STATUSES = (
+        'Рівень майстерності.',
+        'Впевнене володіння навичкою.',
+        'Етап активного формування навички.',
+        'Потребує посиленої уваги.',
+    )
+    # Four cases per status, in _insight_codes() order; {game_label} is filled in.
+    INSIGHT_ADVICE = (
+        # Mastery (90-100): expected decline, absolute top, stable growth, high plateau
+        'Попри високі результати, прогнозується зниження ефективності у {game_label}. '
+        'Ймовірно, дитина відчуває втому або втрачає інтерес до одноманітних завдань. '
+        'Рекомендується зробити перерву або змінити тип активності.',
+        'Навичка у {game_label} засвоєна на відмінно. '
+        'Для підтримки нейропластичності варто переходити до значно складніших завдань '
+        "або використовувати цю гру як 'бонус' для мотивації.",
+        'Спостерігається стійка позитивна динаміка. Дитина впевнено закріплює матеріал. '
+        'Можна сміливо підвищувати рівень складності.',
+        'Результати стабільно високі. Рекомендується періодична практика у {game_label} '
+        'для профілактики забування, але основний акцент варто змістити на інші навички.',
+        # Confident skill (75-89): sharp jump, expected improvement, expected decline, steady progress
+        'Зафіксовано стрімкий прогрес у {game_label}! Дитина увійшла в стан потоку. '
+        'Важливо підтримати цей імпульс похвалою та не переривати серію занять.',
+        'Аналіз показує високий потенціал до росту. У наступних спробах очікується покращення результатів. '
+        'Продовжуйте заняття в поточному темпі.',
+        'Увага: модель прогнозує суттєвий спад результативності. '
+        'Можливо, завдання стало занадто складним або нудним. Спробуйте спростити умови.',
+        'Хороший робочий рівень у {game_label}. Є простір для вдосконалення швидкості реакції. '
+        'Рекомендується регулярна практика.',
+        # Skill formation (60-74): positive shift, negative trend, unstable, moderate progress
+        'Позитивний зсув у {game_label}. Дитина починає розуміти алгоритм виконання. '
+        'Зараз критично важливо не підвищувати складність, щоб закріпити успіх.',
+        'Спостерігається негативна динаміка. Дитина може відчувати фрустрацію. '
+        'Варто збільшити кількість підказок або повернутися на крок назад.',
+        'Результати у {game_label} нестабільні. Прогнозується коливання ефективності. '
+        'Потребує додаткового контролю з боку спеціаліста.',
+        'Помірний прогрес. Дитина виконує завдання, але потребує більше часу на обдумування. '
+        'Не підганяйте учня, дайте можливість працювати у власному темпі.',
+        # Needs attention (<60): breakthrough, first improvement, critically low, systematic difficulties
+        'Модель прогнозує значний прорив у {game_label}! '
+        "Схоже, дитина нарешті зрозуміла принцип завдання. Обов'язково підтримайте ці спроби.",
+        'Є перші ознаки покращення, але навичка у {game_label} ще не сформована. '
+        'Рекомендується використання наочних матеріалів та спільне виконання завдань.',
+        'Критично низькі показники. Дитина не справляється із завданням у {game_label}. '
+        'Необхідно змінити методику навчання або тимчасово виключити цю вправу.',
+        'Виникають систематичні труднощі. Рекомендується розбити завдання на простіші етапи '
+        'та збільшити частоту коротких сесій.',
+    )
+    
+    @classmethod
+    def feature_columns_for(cls, game_type: Optional[str] = None) -> List[str]:
+        """A per-game model's features, or the all-games model's features plus the game type."""
+        if game_type:
+            return list(cls.FEATURE_COLUMNS)
+        return cls.FEATURE_COLUMNS + cls.GAME_TYPE_COLUMNS
     
     def __init__(
         self,
@@ -50,25 +175,31 @@ class ProgressPredictor:
         self.model_dir.mkdir(exist_ok=True)
         
         # Initialize model
+        from sklearn.preprocessing import StandardScaler
+        
         if model_type == 'linear':
+            from sklearn.linear_model import LinearRegression
+            
             self.model = LinearRegression()
         else:
-            self.model = XGBRegressor(
-                n_estimators=300,
-                learning_rate=0.05,
-                max_depth=10,
-                subsample=0.9,
-                colsample_bytree=0.9,
-                objective='reg:squarederror',
-                random_state=42,
-                n_jobs=-1,
-            )
+            from xgboost import XGBRegressor
+            
+            self.model = XGBRegressor(**self.XGBOOST_PARAMS)
         
         # Feature scaler
         self.scaler = StandardScaler()
+        # Built from model and scaler on the first prediction, reset when they change.
+        self._inference: Optional[InferenceParams] = None
+        # Per-thread feature matrix reused by predictions.
+        self._buffers = threading.local()
+        self.feature_columns = list(self.FEATURE_COLUMNS)
+        # Set by the model registry: short hash of the loaded artifacts.
+        self.model_version: Optional[str] = None
         
         # Training metrics
         self.metrics: Dict[str, float] = {}
+        # Which data the model saw (rows, latest created_at / GameResult id).
+        self.training_watermark: Dict[str, Any] = {}
         self.is_trained = False
         
         logger.info(
@@ -82,28 +213,51 @@ class ProgressPredictor:
         test_size: float = 0.2,
         min_entries: int = 5,
     ) -> Dict[str, float]:
+        from .data_extractor import extract_game_data
+        
+        logger.info(f"Starting training for game_type={game_type}")
         try:
-            logger.info(f"Starting training for game_type={game_type}")
-            
-            # Extract and preprocess data
+            # Read before extracting: every result up to this id is in the frame.
+            max_result_id = GameResult.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+            # Extract data
             df = extract_game_data(
                 user_id=None,
                 game_type=game_type,
                 min_entries=min_entries,
             )
-            
-            X, y = preprocess_features(df, window_size=self.window_size)
-            
-            # Encode game_type if present
-            if 'game_type' in X.columns:
-                # Simple hash encoding for game types
-                X['game_type'] = X['game_type'].apply(lambda x: hash(x) % 10000)
-            
-            # Select only numeric features
-            X_features = X[self.FEATURE_COLUMNS].copy()
-            
-            # Handle missing values
-            X_features = X_features.fillna(0)
+        except Exception as e:
+            logger.error(f"Error during training: {str(e)}")
+            raise
+        
+        return self.train_on_data(
+            df,
+            test_size=test_size,
+            watermark={'max_result_id': max_result_id},
+            game_type=game_type,
+        )
+    
+    def train_on_data(
+        self,
+        df: 'pd.DataFrame',
+        test_size: float = 0.2,
+        watermark: Optional[Dict[str, Any]] = None,
+        game_type: Optional[str] = None,
+    ) -> Dict[str, float]:
+        """
+        Train on an already extracted extract_game_data() frame (no database access).
+        game_type=None trains the all-games model, which sees the game as one-hot columns.
+        """
+        import pandas as pd
+        from sklearn.model_selection import train_test_split
+        
+        try:
+            self.feature_columns = self.feature_columns_for(game_type)
+            self.training_watermark = {
+                'rows': int(len(df)),
+                'max_created_at': pd.Timestamp(df['created_at'].max()).isoformat() if len(df) else None,
+                **(watermark or {}),
+            }
+            X_features, y = self._training_matrix(df)
             
             # Split data
             X_train, X_test, y_train, y_test = train_test_split(
@@ -119,28 +273,18 @@ class ProgressPredictor:
             )
             
             # Scale features
-            X_train_scaled = self.scaler.fit_transform(X_train)
-            X_test_scaled = self.scaler.transform(X_test)
+            # Plain arrays: a saved scaler is loaded without feature names, and the
+            # inference path passes arrays too.
+            X_train_scaled = self.scaler.fit_transform(X_train.to_numpy())
+            X_test_scaled = self.scaler.transform(X_test.to_numpy())
             
             # Train model
             logger.info(f"Training {self.model_type} model...")
             self.model.fit(X_train_scaled, y_train)
-            
-            # Make predictions
-            y_pred_train = self.model.predict(X_train_scaled)
-            y_pred_test = self.model.predict(X_test_scaled)
+            self._inference = None
             
             # Calculate metrics
-            self.metrics = {
-                'train_mae': mean_absolute_error(y_train, y_pred_train),
-                'train_rmse': np.sqrt(mean_squared_error(y_train, y_pred_train)),
-                'train_r2': r2_score(y_train, y_pred_train),
-                'test_mae': mean_absolute_error(y_test, y_pred_test),
-                'test_rmse': np.sqrt(mean_squared_error(y_test, y_pred_test)),
-                'test_r2': r2_score(y_test, y_pred_test),
-                'n_samples': len(X),
-                'n_features': X_features.shape[1],
-            }
+            self.metrics = self._evaluate(X_train_scaled, y_train, X_test_scaled, y_test)
             
             self.is_trained = True
             
@@ -153,7 +297,7 @@ class ProgressPredictor:
             # Feature importance (for tree-based models)
             if self.model_type == 'xgboost':
                 feature_importance = dict(zip(
-                    self.FEATURE_COLUMNS,
+                    self.feature_columns,
                     self.model.feature_importances_
                 ))
                 logger.info(f"Feature importance: {feature_importance}")
@@ -164,6 +308,93 @@ class ProgressPredictor:
             logger.error(f"Error during training: {str(e)}")
             raise
     
+    def update_on_data(
+        self,
+        df: 'pd.DataFrame',
+        test_size: float = 0.2,
+        watermark: Optional[Dict[str, Any]] = None,
+        rounds: int = 50,
+    ) -> Dict[str, float]:
+        """
+        Warm start: add `rounds` trees to the loaded XGBoost model, fitted on the
+        samples of an extract_game_data_since() frame. The scaler is kept as is,
+        because the existing trees split on values it scaled. Metrics are computed
+        on the new samples only.
+        """
+        if self.model_type != 'xgboost' or not self.is_trained:
+            raise ValueError("Incremental training needs a trained XGBoost model")
+        
+        import pandas as pd
+        from sklearn.model_selection import train_test_split
+        
+        from .data_extractor import InsufficientDataError
+        
+        X_features, y = self._training_matrix(df)
+        if len(X_features) < 2:
+            raise InsufficientDataError(f"Insufficient data: {len(X_features)} new training sample(s)")
+        
+        X_train, X_test, y_train, y_test = train_test_split(
+            X_features,
+            y,
+            test_size=test_size,
+            random_state=42,
+        )
+        X_train_scaled = self.scaler.transform(X_train.to_numpy())
+        X_test_scaled = self.scaler.transform(X_test.to_numpy())
+        
+        # A loaded XGBRegressor has default parameters; continue with the training ones.
+        booster = self.model.get_booster()
+        n_jobs = self.model.get_params().get('n_jobs')
+        self.model.set_params(**{**self.XGBOOST_PARAMS, 'n_estimators': rounds})
+        if n_jobs is not None:
+            self.model.set_params(n_jobs=n_jobs)
+        logger.info(f"Adding {rounds} trees to a model with {booster.num_boosted_rounds()} trees...")
+        self.model.fit(X_train_scaled, y_train, xgb_model=booster)
+        self._inference = None
+        
+        self.metrics = self._evaluate(X_train_scaled, y_train, X_test_scaled, y_test)
+        self.metrics['n_trees'] = self.model.get_booster().num_boosted_rounds()
+        self.training_watermark = {
+            **self.training_watermark,
+            'max_created_at': pd.Timestamp(df['created_at'].max()).isoformat(),
+            **(watermark or {}),
+            'incremental_updates': self.training_watermark.get('incremental_updates', 0) + 1,
+        }
+        
+        logger.info(
+            f"Incremental update complete. New-data Test MAE: {self.metrics['test_mae']:.2f}, "
+            f"trees: {int(self.metrics['n_trees'])}"
+        )
+        return self.metrics
+    
+    def _training_matrix(self, df: 'pd.DataFrame') -> Tuple['pd.DataFrame', 'pd.Series']:
+        from .data_extractor import preprocess_features
+        
+        X, y = preprocess_features(df, window_size=self.window_size)
+        
+        # One-hot encode game_type (stable across processes, unlike hash())
+        for column, value in zip(self.GAME_TYPE_COLUMNS, GameResult.GameType.values):
+            X[column] = (X['game_type'] == value).astype(np.float64)
+        
+        # Select only numeric features and handle missing values
+        return X[self.feature_columns].fillna(0), y
+    
+    def _evaluate(self, X_train_scaled, y_train, X_test_scaled, y_test) -> Dict[str, float]:
+        from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+        
+        y_pred_train = self.model.predict(X_train_scaled)
+        y_pred_test = self.model.predict(X_test_scaled)
+        return {
+            'train_mae': mean_absolute_error(y_train, y_pred_train),
+            'train_rmse': np.sqrt(mean_squared_error(y_train, y_pred_train)),
+            'train_r2': r2_score(y_train, y_pred_train),
+            'test_mae': mean_absolute_error(y_test, y_pred_test),
+            'test_rmse': np.sqrt(mean_squared_error(y_test, y_pred_test)),
+            'test_r2': r2_score(y_test, y_pred_test),
+            'n_samples': len(y_train) + len(y_test),
+            'n_features': X_train_scaled.shape[1],
+        }
+    
     def predict(
         self,
         user_id: int,
@@ -174,68 +405,27 @@ class ProgressPredictor:
             return None
         
         try:
-            # Extract features for this user
-            features = extract_user_features(
-                user_id=user_id,
-                game_type=game_type,
-                window_size=self.window_size,
-            )
+            # Extract features for this user: one feature-store row, or the
+            # full history when the window is larger than the store keeps.
+            if self.window_size <= GameFeatureState.WINDOW_CAPACITY:
+                features = user_window_features(user_id, game_type, self.window_size)
+            else:
+                from .data_extractor import extract_user_features
+                
+                features = extract_user_features(
+                    user_id=user_id,
+                    game_type=game_type,
+                    window_size=self.window_size,
+                )
             
             if features is None:
                 return None
             
-            # Prepare feature vector
-            X_pred = pd.DataFrame([features])
-            X_pred = X_pred[self.FEATURE_COLUMNS].fillna(0)
-            
-            # Scale features
-            X_pred_scaled = self.scaler.transform(X_pred)
-            
-            # Make prediction
-            predicted_score = float(self.model.predict(X_pred_scaled)[0])
-            
-            # Clip to valid score range
-            predicted_score = np.clip(predicted_score, 0, 100)
-
-            # Prevent sharp drop when current score is high and trend is positive
-            if features['last_score'] >= 90 and features['score_trend'] > 0:
-                predicted_score = max(predicted_score, features['last_score'] - 15)
-            
-            # Calculate confidence based on model quality metrics
-            confidence = max(0, min(100, 100 - self.metrics.get('test_rmse', 20)))
-            
-            # Generate insight
-            insight = self._generate_insight(
-                predicted_score=predicted_score,
-                current_score=features['last_score'],
-                score_trend=features['score_trend'],
-                game_type=game_type,
-            )
-            
-            # Estimate mastery timeline
-            mastery_threshold = 90
-            days_to_mastery, attempts_to_mastery = self._estimate_mastery(
-                current_score=features['last_score'],
-                predicted_score=predicted_score,
-                score_trend=features['score_trend'],
-                days_since_start=features['days_since_start'],
-                attempt_number=features['attempt_number'],
-                mastery_threshold=mastery_threshold,
-            )
-            
-            result = {
-                'predicted_score': round(predicted_score, 1),
-                'current_score': features['last_score'],
-                'confidence': round(confidence, 1),
-                'insight': insight,
-                'days_to_mastery': days_to_mastery,
-                'attempts_to_mastery': attempts_to_mastery,
-                'score_trend': round(features['score_trend'], 2),
-            }
+            result = self.predict_from_features([features], game_type)[0]
             
             logger.info(
                 f"Prediction for user {user_id}, game {game_type}: "
-                f"score={predicted_score:.1f}, insight_generated=True"
+                f"score={result['predicted_score']:.1f}, insight_generated=True"
             )
             
             return result
@@ -244,143 +434,193 @@ class ProgressPredictor:
             logger.error(f"Error during prediction: {str(e)}")
             return None
     
-    def _generate_insight(
+    def predict_from_features(
         self,
+        features_rows: List[Dict[str, float]],
+        game_type: str,
+    ) -> List[Dict[str, Any]]:
+        """
+        Predictions for already extracted feature dicts of one game type, scaled
+        and scored with a single model call. Same result fields as predict().
+        """
+        return self._predict_rows(features_rows, [game_type] * len(features_rows))
+    
+    def predict_many(self, pairs) -> Dict[Tuple[int, str], Optional[Dict[str, Any]]]:
+        """
+        predict() for many (user_id, game_type) pairs: the feature-store rows of all
+        pairs come from one query and the whole batch is scaled and scored with one
+        model call. Pairs without enough history map to None.
+        """
+        pairs = list(dict.fromkeys((int(user_id), game_type) for user_id, game_type in pairs))
+        if not self.is_trained:
+            logger.warning("Model is not trained. Call train() first.")
+            return {pair: None for pair in pairs}
+        
+        if self.window_size <= GameFeatureState.WINDOW_CAPACITY:
+            states = get_feature_states(pairs)
+            features = {pair: window_features(states[pair], self.window_size) for pair in pairs}
+        else:
+            from .data_extractor import extract_user_features
+            
+            features = {
+                pair: extract_user_features(user_id=pair[0], game_type=pair[1], window_size=self.window_size)
+                for pair in pairs
+            }
+        
+        ready = [pair for pair in pairs if features[pair] is not None]
+        results = dict.fromkeys(pairs)
+        results.update(zip(ready, self._predict_rows([features[pair] for pair in ready], [pair[1] for pair in ready])))
+        return results
+    
+    def inference_params(self) -> InferenceParams:
+        """
+        The trained model and scaler as plain arrays, built once per model. The
+        scaler is applied as (x - mean) / scale, which is what
+        StandardScaler.transform() computes.
+        
+        Scaling stays in float64: the trees split on float32 casts of float64-scaled
+        features, and scaling in float32 moves predictions by whole points.
+        """
+        params = self._inference
+        if params is None:
+            mean = np.ascontiguousarray(self.scaler.mean_, dtype=np.float64)
+            scale = np.ascontiguousarray(self.scaler.scale_, dtype=np.float64)
+            if self.model_type == 'xgboost':
+                params = InferenceParams(mean, scale, self.model.get_booster(), None, 0.0)
+            else:
+                coef = np.ascontiguousarray(self.model.coef_, dtype=np.float64)
+                params = InferenceParams(mean, scale, None, coef, float(self.model.intercept_))
+            self._inference = params
+        return params
+    
+    def _feature_buffer(self, rows: int) -> np.ndarray:
+        """A (rows, n_features) matrix, reused by this thread's later predictions."""
+        buffer = getattr(self._buffers, 'matrix', None)
+        if buffer is None or buffer.shape[0] < rows or buffer.shape[1] != len(self.feature_columns):
+            buffer = np.empty((max(rows, 1), len(self.feature_columns)), dtype=np.float64)
+            self._buffers.matrix = buffer
+        return buffer[:rows]
+    
+    def _score_matrix(self, X: np.ndarray) -> np.ndarray:
+        """Raw model output for an unscaled feature matrix; X is scaled in place."""
+        params = self.inference_params()
+        np.nan_to_num(X, copy=False, nan=0.0)
+        np.subtract(X, params.mean, out=X)
+        np.divide(X, params.scale, out=X)
+        if params.booster is not None:
+            return np.asarray(params.booster.inplace_predict(X), dtype=np.float64).reshape(-1)
+        return X @ params.coef + params.intercept
+    
+    def _predict_rows(self, features_rows: List[Dict[str, float]], game_types: List[str]) -> List[Dict[str, Any]]:
+        if not features_rows:
+            return []
+        
+        # Feature matrix in feature_columns order; missing values count as 0.
+        X = self._feature_buffer(len(features_rows))
+        columns = self.feature_columns
+        for i, row in enumerate(features_rows):
+            X[i] = [row.get(column, 0.0) for column in columns]
+        predicted = np.clip(self._score_matrix(X), 0, 100)
+        
+        def column(name: str) -> np.ndarray:
+            return np.array([row[name] for row in features_rows], dtype=np.float64)
+        
+        current = column('last_score')
+        trend = column('score_trend')
+        # Prevent sharp drop when current score is high and trend is positive
+        predicted = np.where((current >= 90) & (trend > 0), np.maximum(predicted, current - 15), predicted)
+        
+        insight_codes = self._insight_codes(predicted, current, trend)
+        days_to_mastery, attempts_to_mastery = self._estimate_mastery_many(
+            current, trend, column('days_since_start'), column('attempt_number'),
+        )
+        
+        # Calculate confidence based on model quality metrics
+        confidence = round(max(0, min(100, 100 - self.metrics.get('test_rmse', 20))), 1)
+        
+        return [
+            {
+                'predicted_score': round(float(predicted[i]), 1),
+                'current_score': row['last_score'],
+                'confidence': confidence,
+                'insight': self._insight_text(int(insight_codes[i]), game_types[i]),
+                'days_to_mastery': days_to_mastery[i],
+                'attempts_to_mastery': attempts_to_mastery[i],
+                'score_trend': round(row['score_trend'], 2),
+            }
+            for i, row in enumerate(features_rows)
+        ]
+    
+    @classmethod
+    def _generate_insight(
+        cls,
         predicted_score: float,
         current_score: float,
         score_trend: float,
         game_type: str,
     ) -> str:
-        # Dictionary with proper Ukrainian cases for activity labels
-        game_labels = {
-            'math': 'математиці',
-            'memory': 'іграх на пам\'ять',
-            'words': 'пазлах зі словами',
-            'sound': 'іграх зі звуками',
-            'sentences': 'побудові речень',
-            'articulation': 'артикуляційній гімнастиці',
-            'attention': 'вправах на увагу',
-        }
-        game_label = game_labels.get(game_type, 'цій активності')
-
-        # Delta: difference between predicted and current score.
+        code = cls._insight_codes(
+            np.array([predicted_score], dtype=np.float64),
+            np.array([current_score], dtype=np.float64),
+            np.array([score_trend], dtype=np.float64),
+        )[0]
+        return cls._insight_text(int(code), game_type)
+    
+    @staticmethod
+    def _insight_codes(predicted: np.ndarray, current: np.ndarray, trend: np.ndarray) -> np.ndarray:
+        """
+        Index into INSIGHT_ADVICE: level * 4 + case. Levels are the predicted score
+        bands (mastery, confident, forming, needs attention); within a level the first
+        matching case wins and case 3 is the default.
+        """
         # delta > 0 means expected improvement, delta < 0 means expected decline.
-        delta = predicted_score - current_score
-
-        # === Level 1: Mastery (90-100) ===
-        if predicted_score >= 90:
-            status = 'Рівень майстерності.'
-
-            if delta < -5:
-                advice = (
-                    f'Попри високі результати, прогнозується зниження ефективності у {game_label}. '
-                    f'Ймовірно, дитина відчуває втому або втрачає інтерес до одноманітних завдань. '
-                    f'Рекомендується зробити перерву або змінити тип активності.'
-                )
-            elif current_score >= 95 and delta >= 0:
-                # Absolute top performance
-                advice = (
-                    f'Навичка у {game_label} засвоєна на відмінно. '
-                    f'Для підтримки нейропластичності варто переходити до значно складніших завдань '
-                    f"або використовувати цю гру як 'бонус' для мотивації."
-                )
-            elif score_trend > 0.5:
-                # Stable growth at high performance level
-                advice = (
-                    f'Спостерігається стійка позитивна динаміка. Дитина впевнено закріплює матеріал. '
-                    f'Можна сміливо підвищувати рівень складності.'
-                )
-            else:
-                # Stable high plateau
-                advice = (
-                    f'Результати стабільно високі. Рекомендується періодична практика у {game_label} '
-                    f'для профілактики забування, але основний акцент варто змістити на інші навички.'
-                )
-
-        # === Level 2: Confident skill (75-89) ===
-        elif predicted_score >= 75:
-            status = 'Впевнене володіння навичкою.'
-
-            if score_trend > 2.0:
-                # Sharp upward jump
-                advice = (
-                    f'Зафіксовано стрімкий прогрес у {game_label}! Дитина увійшла в стан потоку. '
-                    f'Важливо підтримати цей імпульс похвалою та не переривати серію занять.'
-                )
-            elif delta > 5:
-                # Model expects meaningful improvement
-                advice = (
-                    f'Аналіз показує високий потенціал до росту. У наступних спробах очікується покращення результатів. '
-                    f'Продовжуйте заняття в поточному темпі.'
-                )
-            elif delta < -10:
-                # Model expects sharp decline
-                advice = (
-                    f'Увага: модель прогнозує суттєвий спад результативності. '
-                    f'Можливо, завдання стало занадто складним або нудним. Спробуйте спростити умови.'
-                )
-            else:
-                # Slow, steady progress
-                advice = (
-                    f'Хороший робочий рівень у {game_label}. Є простір для вдосконалення швидкості реакції. '
-                    f'Рекомендується регулярна практика.'
-                )
-
-        # === Level 3: Skill formation (60-74) ===
-        elif predicted_score >= 60:
-            status = 'Етап активного формування навички.'
-
-            if score_trend > 1.5 and delta > 0:
-                advice = (
-                    f'Позитивний зсув у {game_label}. Дитина починає розуміти алгоритм виконання. '
-                    f'Зараз критично важливо не підвищувати складність, щоб закріпити успіх.'
-                )
-            elif score_trend < -1.0:
-                advice = (
-                    f'Спостерігається негативна динаміка. Дитина може відчувати фрустрацію. '
-                    f'Варто збільшити кількість підказок або повернутися на крок назад.'
-                )
-            elif delta < 0:
-                advice = (
-                    f'Результати у {game_label} нестабільні. Прогнозується коливання ефективності. '
-                    f'Потребує додаткового контролю з боку спеціаліста.'
-                )
-            else:
-                advice = (
-                    f'Помірний прогрес. Дитина виконує завдання, але потребує більше часу на обдумування. '
-                    f'Не підганяйте учня, дайте можливість працювати у власному темпі.'
-                )
-
-        # === Level 4: Entry level / difficulties (<60) ===
-        else:
-            status = 'Потребує посиленої уваги.'
-
-            if delta > 10:
-                # Low score but optimistic breakthrough prediction
-                advice = (
-                    f'Модель прогнозує значний прорив у {game_label}! '
-                    f"Схоже, дитина нарешті зрозуміла принцип завдання. Обов'язково підтримайте ці спроби."
-                )
-            elif score_trend > 0:
-                advice = (
-                    f'Є перші ознаки покращення, але навичка у {game_label} ще не сформована. '
-                    f'Рекомендується використання наочних матеріалів та спільне виконання завдань.'
-                )
-            elif score_trend < 0 and current_score < 30:
-                advice = (
-                    f'Критично низькі показники. Дитина не справляється із завданням у {game_label}. '
-                    f'Необхідно змінити методику навчання або тимчасово виключити цю вправу.'
-                )
-            else:
-                advice = (
-                    f'Виникають систематичні труднощі. Рекомендується розбити завдання на простіші етапи '
-                    f'та збільшити частоту коротких сесій.'
-                )
-
-        return f'{status} {advice}'
+        delta = predicted - current
+        level = np.select([predicted >= 90, predicted >= 75, predicted >= 60], [0, 1, 2], 3)
+        cases_by_level = [
+            [delta < -5, (current >= 95) & (delta >= 0), trend > 0.5],
+            [trend > 2.0, delta > 5, delta < -10],
+            [(trend > 1.5) & (delta > 0), trend < -1.0, delta < 0],
+            [delta > 10, trend > 0, (trend < 0) & (current < 30)],
+        ]
+        case = np.full(len(predicted), 3)
+        for band, conditions in enumerate(cases_by_level):
+            case = np.where(level == band, np.select(conditions, [0, 1, 2], 3), case)
+        return level * 4 + case
     
+    @classmethod
+    def _insight_text(cls, code: int, game_type: str) -> str:
+        game_label = cls.INSIGHT_GAME_LABELS.get(game_type, 'цій активності')
+        status = cls.INSIGHT_STATUSES[code // 4]
+        return f'{status} {cls.INSIGHT_ADVICE[code].format(game_label=game_label)}'
+    
+    @staticmethod
+    def _estimate_mastery_many(
+        current: np.ndarray,
+        trend: np.ndarray,
+        days_since_start: np.ndarray,
+        attempt_number: np.ndarray,
+        mastery_threshold: float = 90,
+    ) -> Tuple[List[Optional[int]], List[Optional[int]]]:
+        """_estimate_mastery() over arrays; the same arithmetic, so the same numbers."""
+        mastered = current >= mastery_threshold
+        estimable = ~mastered & (trend > 0.1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            attempts = np.ceil((mastery_threshold - current) / trend)
+            days = np.ceil(attempts * (days_since_start / (attempt_number - 1)))
+        has_pace = estimable & (attempt_number > 1) & (days_since_start > 0)
+        
+        days_to_mastery = [
+            0 if mastered[i] else int(days[i]) if has_pace[i] else None
+            for i in range(len(current))
+        ]
+        attempts_to_mastery = [
+            0 if mastered[i] else int(attempts[i]) if estimable[i] else None
+            for i in range(len(current))
+        ]
+        return days_to_mastery, attempts_to_mastery
+    
+    @staticmethod
     def _estimate_mastery(
-        self,
         current_score: float,
         predicted_score: float,
         score_trend: float,
@@ -408,61 +648,185 @@ class ProgressPredictor:
         
         return (days_needed, attempts_needed)
     
+    @staticmethod
+    def feature_schema_hash(feature_columns: List[str], window_size: int) -> str:
+        """Identifies the feature vector a model was trained on."""
+        schema = json.dumps({'columns': list(feature_columns), 'window_size': window_size})
+        return hashlib.sha256(schema.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def bundle_dir_for(model_dir, model_type: str, game_type: Optional[str] = None) -> Path:
+        game_suffix = f"_{game_type}" if game_type else "_all"
+        return Path(model_dir) / f"progress_predictor_{model_type}{game_suffix}"
+
+    @staticmethod
+    def artifact_names(model_type: str) -> Tuple[str, str, str]:
+        return ('model.ubj' if model_type == 'xgboost' else 'model.npy', 'scaler.npy', 'manifest.json')
+
+    @staticmethod
+    def artifact_paths_for(model_dir, model_type: str, game_type: Optional[str] = None) -> Tuple[Path, Path, Path]:
+        """
+        (model, scaler, manifest) files of the bundle's current version; None means
+        the all-games model. XGBoost models are stored as native UBJSON, a linear
+        model as [coef..., intercept] and the scaler as a (2, n_features)
+        [mean, scale] array, both raw .npy files that load() memory-maps.
+
+        Every save() writes a new version directory and then swaps the CURRENT
+        pointer with os.replace(), so the three paths always belong to one complete
+        save. Bundles saved before versioning keep their files in the bundle directory.
+        """
+        bundle = ProgressPredictor.bundle_dir_for(model_dir, model_type, game_type)
+        try:
+            version = os.path.basename((bundle / BUNDLE_POINTER).read_text().strip())
+        except FileNotFoundError:
+            version = ''
+        base = bundle / version if version else bundle
+        return tuple(base / name for name in ProgressPredictor.artifact_names(model_type))
+
+    @staticmethod
+    def legacy_artifact_paths_for(model_dir, model_type: str, game_type: Optional[str] = None) -> Tuple[Path, Path, Path]:
+        """Pre-bundle joblib files, still loaded when no bundle exists."""
+        model_dir = Path(model_dir)
+        game_suffix = f"_{game_type}" if game_type else "_all"
+        return (
+            model_dir / f"progress_predictor_{model_type}{game_suffix}.joblib",
+            model_dir / f"scaler_{model_type}{game_suffix}.joblib",
+            model_dir / f"metrics_{model_type}{game_suffix}.json",
+        )
+
+    def artifact_paths(self, game_type: Optional[str] = None) -> Tuple[Path, Path, Path]:
+        return self.artifact_paths_for(self.model_dir, self.model_type, game_type)
+
     def save(self, game_type: Optional[str] = None) -> Path:
+        """
+        Write a new bundle version and make it current. Readers that resolved the
+        previous version keep loading it: it is only removed by the next save.
+        """
         if not self.is_trained:
             raise ValueError("Cannot save untrained model")
         
-        # Create filename
-        game_suffix = f"_{game_type}" if game_type else "_all"
-        model_file = self.model_dir / f"progress_predictor_{self.model_type}{game_suffix}.joblib"
-        scaler_file = self.model_dir / f"scaler_{self.model_type}{game_suffix}.joblib"
-        metrics_file = self.model_dir / f"metrics_{self.model_type}{game_suffix}.json"
+        bundle = self.bundle_dir_for(self.model_dir, self.model_type, game_type)
+        bundle.mkdir(parents=True, exist_ok=True)
+        version = f"v{timezone.now():%Y%m%dT%H%M%S%f}-{os.getpid()}"
+        staging = bundle / f'.tmp.{version}'
+        staging.mkdir()
+        model_file, scaler_file, manifest_file = (staging / name for name in self.artifact_names(self.model_type))
+        
+        # Model in a library-native format, scaler as raw arrays
+        if self.model_type == 'xgboost':
+            self.model.save_model(str(model_file))
+        else:
+            params = np.append(np.asarray(self.model.coef_, dtype=np.float64), float(self.model.intercept_))
+            np.save(model_file, params)
+        np.save(scaler_file, np.vstack([self.scaler.mean_, self.scaler.scale_]).astype(np.float64))
         
-        # Save model, scaler, and metrics
-        joblib.dump(self.model, model_file)
-        joblib.dump(self.scaler, scaler_file)
+        manifest = {
+            'format_version': BUNDLE_FORMAT_VERSION,
+            'model_type': self.model_type,
+            'game_type': game_type,
+            'window_size': self.window_size,
+            'feature_columns': self.feature_columns,
+            'feature_schema_hash': self.feature_schema_hash(self.feature_columns, self.window_size),
+            'training_watermark': self.training_watermark,
+            'metrics': {key: float(value) for key, value in self.metrics.items()},
+            'files': {
+                path.name: {'sha256': _file_sha256(path), 'size': path.stat().st_size}
+                for path in (model_file, scaler_file)
+            },
+            'created_at': timezone.now().isoformat(),
+        }
+        manifest_file.write_text(json.dumps(manifest, indent=2))
         
-        with open(metrics_file, 'w') as f:
-            json.dump(self.metrics, f, indent=2)
+        # Publish: complete the version directory, then swap the pointer atomically.
+        os.rename(staging, bundle / version)
+        pointer = bundle / BUNDLE_POINTER
+        previous = pointer.read_text().strip() if pointer.exists() else None
+        _replace_file(pointer, lambda path: Path(path).write_text(version))
+        self._prune_versions(bundle, keep={version, previous})
         
-        logger.info(f"Model saved to {model_file}")
+        logger.info(f"Model saved to {bundle / version}")
         
-        return model_file
+        return bundle / version / model_file.name
     
-    def load(self, game_type: Optional[str] = None) -> bool:
+    def _prune_versions(self, bundle: Path, keep) -> None:
+        """Drop versions other than `keep`, stale staging directories and pre-versioning files."""
+        now = time.time()
+        for entry in bundle.iterdir():
+            if entry.is_dir():
+                if entry.name.startswith('v') and entry.name not in keep:
+                    shutil.rmtree(entry, ignore_errors=True)
+                elif entry.name.startswith('.tmp.') and now - entry.stat().st_mtime > STALE_STAGING_SECONDS:
+                    shutil.rmtree(entry, ignore_errors=True)
+            elif entry.name in self.artifact_names(self.model_type):
+                entry.unlink(missing_ok=True)
+    
+    def load(self, game_type: Optional[str] = None, verify_checksums: bool = False) -> bool:
+        """
+        Load the saved bundle (or legacy joblib files). File sizes are always checked
+        against the manifest; verify_checksums=True also re-hashes the files.
+        """
         try:
-            # Create filename
-            game_suffix = f"_{game_type}" if game_type else "_all"
-            model_file = self.model_dir / f"progress_predictor_{self.model_type}{game_suffix}.joblib"
-            scaler_file = self.model_dir / f"scaler_{self.model_type}{game_suffix}.joblib"
-            metrics_file = self.model_dir / f"metrics_{self.model_type}{game_suffix}.json"
+            self.feature_columns = self.feature_columns_for(game_type)
+            model_file, scaler_file, manifest_file = self.artifact_paths(game_type)
             
-            if not model_file.exists():
-                logger.warning(f"Model file not found: {model_file}")
+            if not manifest_file.exists():
+                if self.legacy_artifact_paths_for(self.model_dir, self.model_type, game_type)[0].exists():
+                    return self._load_legacy(game_type)
+                logger.warning(f"Model bundle not found: {model_file.parent}")
                 return False
             
-            # Load model and scaler
-            self.model = joblib.load(model_file)
-            self.scaler = joblib.load(scaler_file)
-
-            expected_features = len(self.FEATURE_COLUMNS)
-            scaler_features = getattr(self.scaler, 'n_features_in_', None)
-            if scaler_features is not None and int(scaler_features) != expected_features:
+            manifest = json.loads(manifest_file.read_text())
+            if (
+                manifest.get('format_version') != BUNDLE_FORMAT_VERSION
+                or manifest.get('model_type') != self.model_type
+                or manifest.get('feature_schema_hash') != self.feature_schema_hash(self.feature_columns, self.window_size)
+            ):
                 logger.warning(
-                    "Loaded scaler expects %s features, but current schema has %s. "
+                    "Model bundle %s was written for another format or feature schema. "
                     "Model will be treated as outdated.",
-                    scaler_features,
-                    expected_features,
+                    model_file.parent,
                 )
                 return False
+            for path in (model_file, scaler_file):
+                expected = manifest['files'].get(path.name) or {}
+                if path.stat().st_size != expected.get('size') or (
+                    verify_checksums and _file_sha256(path) != expected.get('sha256')
+                ):
+                    logger.warning(f"{path} does not match the manifest; model will not be loaded.")
+                    return False
             
-            # Load metrics if available
-            if metrics_file.exists():
-                with open(metrics_file, 'r') as f:
-                    self.metrics = json.load(f)
+            # Load model and scaler
+            from sklearn.preprocessing import StandardScaler
             
+            if self.model_type == 'xgboost':
+                from xgboost import XGBRegressor
+                
+                model = XGBRegressor()
+                model.load_model(str(model_file))
+            else:
+                from sklearn.linear_model import LinearRegression
+                
+                params = np.load(model_file, mmap_mode='r')
+                model = LinearRegression()
+                model.coef_ = params[:-1]
+                model.intercept_ = float(params[-1])
+                model.n_features_in_ = len(params) - 1
+            
+            # Read-only pages shared by every process that maps the file.
+            scaler_params = np.load(scaler_file, mmap_mode='r')
+            scaler = StandardScaler()
+            scaler.mean_ = scaler_params[0]
+            scaler.scale_ = scaler_params[1]
+            scaler.var_ = np.square(scaler_params[1])
+            scaler.n_features_in_ = scaler_params.shape[1]
+            
+            self.model = model
+            self.scaler = scaler
+            self._inference = None
+            self.metrics = manifest.get('metrics', {})
+            self.training_watermark = manifest.get('training_watermark', {})
             self.is_trained = True
-            logger.info(f"Model loaded from {model_file}")
+            logger.info(f"Model loaded from {model_file.parent}")
             
             return True
             
@@ -470,11 +834,42 @@ class ProgressPredictor:
             logger.error(f"Error loading model: {str(e)}")
             return False
     
+    def _load_legacy(self, game_type: Optional[str] = None) -> bool:
+        model_file, scaler_file, metrics_file = self.legacy_artifact_paths_for(self.model_dir, self.model_type, game_type)
+        
+        import joblib
+        
+        # Load model and scaler
+        self.model = joblib.load(model_file)
+        self.scaler = joblib.load(scaler_file)
+        self._inference = None
+
+        expected_features = len(self.feature_columns)
+        scaler_features = getattr(self.scaler, 'n_features_in_', None)
+        if scaler_features is not None and int(scaler_features) != expected_features:
+            logger.warning(
+                "Loaded scaler expects %s features, but current schema has %s. "
+                "Model will be treated as outdated.",
+                scaler_features,
+                expected_features,
+            )
+            return False
+        
+        # Load metrics if available
+        if metrics_file.exists():
+            with open(metrics_file, 'r') as f:
+                self.metrics = json.load(f)
+        
+        self.is_trained = True
+        logger.info(f"Model loaded from {model_file} (legacy joblib files)")
+        
+        return True
+    
     def get_model_info(self) -> Dict[str, Any]:
         return {
             'model_type': self.model_type,
             'is_trained': self.is_trained,
             'window_size': self.window_size,
             'metrics': self.metrics,
-            'feature_columns': self.FEATURE_COLUMNS,
+            'feature_columns': self.feature_columns,
         }
@@ -0,0 +1,187 @@
+"""
+Process-wide cache of loaded ProgressPredictor models.
+
+predict_performance used to build a ProgressPredictor and joblib.load() its model
+and scaler on every request. The registry loads each (model_type, game_type,
+window_size) once per process and only reloads it when the artifact files change:
+a cheap os.stat() check runs per lookup, and the files are re-hashed only when
+their mtime/size moved, so a `touch` keeps the loaded model. save() publishes a
+model by swapping the bundle's CURRENT pointer, so watching the pointer (plus the
+pre-versioning and legacy file names) is enough to see new models.
+
+game_type=None is the all-games model; get_for_game() picks between it and the
+per-game model.
+"""
+from typing import Dict, Iterable, Optional, Tuple
+import hashlib
+import logging
+import os
+import threading
+
+from .progress_predictor import BUNDLE_POINTER, ProgressPredictor
+
+logger = logging.getLogger(__name__)
+
+RegistryKey = Tuple[str, Optional[str], int]
+
+
+class _Entry:
+    __slots__ = ('predictor', 'stat', 'digest')
+
+    def __init__(self, predictor: Optional[ProgressPredictor], stat: tuple, digest: Optional[str]):
+        self.predictor = predictor
+        self.stat = stat
+        self.digest = digest
+
+
+class ModelRegistry:
+    def __init__(self, model_dir: Optional[str] = None):
+        self._model_dir = model_dir
+        self._entries: Dict[RegistryKey, _Entry] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def model_dir(self) -> str:
+        """The directory given to the registry, else settings.ML_MODEL_DIR (read on every lookup)."""
+        if self._model_dir is not None:
+            return self._model_dir
+        from django.conf import settings
+
+        return settings.ML_MODEL_DIR
+
+    @model_dir.setter
+    def model_dir(self, value: Optional[str]) -> None:
+        self._model_dir = value
+
+    def _paths(self, key: RegistryKey):
+        """Files whose stat() changes when a new model is published."""
+        model_type, game_type, _window_size = key
+        bundle = ProgressPredictor.bundle_dir_for(self.model_dir, model_type, game_type)
+        return (
+            (bundle / BUNDLE_POINTER,)
+            + tuple(bundle / name for name in ProgressPredictor.artifact_names(model_type))
+            + ProgressPredictor.legacy_artifact_paths_for(self.model_dir, model_type, game_type)
+        )
+
+    def _content_paths(self, key: RegistryKey):
+        """Files of the published model, hashed into its version."""
+        model_type, game_type, _window_size = key
+        return (
+            ProgressPredictor.artifact_paths_for(self.model_dir, model_type, game_type)
+            + ProgressPredictor.legacy_artifact_paths_for(self.model_dir, model_type, game_type)
+        )
+
+    @staticmethod
+    def _stat(paths) -> tuple:
+        out = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+                out.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                out.append(None)
+        return tuple(out)
+
+    @staticmethod
+    def _digest(paths) -> Optional[str]:
+        digest = hashlib.sha256()
+        for path in paths:
+            try:
+                with open(path, 'rb') as fh:
+                    for chunk in iter(lambda: fh.read(1 << 20), b''):
+                        digest.update(chunk)
+            except FileNotFoundError:
+                digest.update(b'\0missing')
+        return digest.hexdigest()
+
+    def get(
+        self,
+        model_type: str = 'xgboost',
+        game_type: Optional[str] = None,
+        window_size: int = 3,
+    ) -> Optional[ProgressPredictor]:
+        """The loaded predictor for the key, or None when no usable model is saved."""
+        key = (model_type, game_type, window_size)
+        entry = self._entries.get(key)
+        paths = self._paths(key)
+        stat = self._stat(paths)
+        if entry is not None and entry.stat == stat:
+            return entry.predictor
+
+        with self._lock:
+            entry = self._entries.get(key)
+            stat = self._stat(paths)
+            if entry is not None and entry.stat == stat:
+                return entry.predictor
+
+            digest = self._digest(self._content_paths(key)) if any(stat) else None
+            if entry is not None and entry.digest == digest:
+                entry.stat = stat
+                return entry.predictor
+
+            predictor = None
+            # No model file: nothing to load, and no ML libraries to import for it.
+            if any(stat):
+                candidate = ProgressPredictor(model_type=model_type, model_dir=self.model_dir, window_size=window_size)
+                if candidate.load(game_type=game_type):
+                    candidate.model_version = digest[:12]
+                    predictor = candidate
+            self._entries[key] = _Entry(predictor, stat, digest)
+            logger.info('Model registry %s %s', 'loaded' if predictor else 'has no model for', key)
+            return predictor
+
+    def get_for_game(
+        self,
+        model_type: str = 'xgboost',
+        game_type: Optional[str] = None,
+        window_size: int = 3,
+    ) -> Optional[ProgressPredictor]:
+        """
+        The model to score `game_type` with: the all-games model when ML_UNIFIED_MODEL
+        is on (falling back to the per-game one), otherwise the per-game model first.
+        """
+        from django.conf import settings
+
+        if getattr(settings, 'ML_UNIFIED_MODEL', True):
+            order = (None, game_type)
+        else:
+            order = (game_type, None)
+        for candidate in dict.fromkeys(order):
+            predictor = self.get(model_type, candidate, window_size)
+            if predictor is not None:
+                return predictor
+        return None
+
+    def invalidate(self, model_type: str = None, game_type: str = None, window_size: int = None) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                if (
+                    (model_type is None or key[0] == model_type)
+                    and (game_type is None or key[1] == game_type)
+                    and (window_size is None or key[2] == window_size)
+                ):
+                    del self._entries[key]
+
+    def warm_up(
+        self,
+        game_types: Optional[Iterable[Optional[str]]] = None,
+        model_type: str = 'xgboost',
+        window_size: int = 3,
+    ) -> int:
+        """Load models ahead of the first request (e.g. from gunicorn post_fork). Returns how many loaded."""
+        if game_types is None:
+            from accounts.models import GameResult
+
+            game_types = [None, *GameResult.GameType.values]
+        loaded = 0
+        for game_type in game_types:
+            if self.get(model_type, game_type, window_size) is not None:
+                loaded += 1
+        return loaded
+
+
+model_registry = ModelRegistry()
+
+
+def warm_up(**kwargs) -> int:
+    return model_registry.warm_up(**kwargs)
@@ -0,0 +1,254 @@
+"""
+Training several per-game models at once.
+
+The GameResult corpus is extracted once and partitioned by game type; each
+partition is trained in its own process. XGBoost's n_jobs is divided between the
+workers so the pool never runs more threads than there are cores.
+
+update_partition() is the incremental path: it continues boosting a saved XGBoost
+model on the results recorded after its manifest's watermark.
+
+Both hold the model's training lock (ml_services.locks) while they train and
+save; a model that another process is already training is skipped.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+import logging
+import multiprocessing
+import os
+import time
+
+import pandas as pd
+
+from .data_extractor import InsufficientDataError, extract_game_data, extract_game_data_since
+from .locks import model_training_lock
+from .progress_predictor import ProgressPredictor
+
+logger = logging.getLogger(__name__)
+
+TRAINING_IN_PROGRESS = 'Another process is training this model'
+
+
+@dataclass
+class TrainingOutcome:
+    game_type: Optional[str]
+    seconds: float
+    metrics: Dict[str, float] = field(default_factory=dict)
+    model_path: Optional[str] = None
+    error: Optional[str] = None
+    # 'full', 'incremental', or 'unchanged' (an incremental run with no new results).
+    mode: str = 'full'
+    extract_seconds: float = 0.0
+    rows: int = 0
+    # Incremental runs: what a full rebuild would take, scaled from the last one.
+    rebuild_estimate_seconds: Optional[float] = None
+
+
+def plan_workers(n_models: int, max_workers: Optional[int] = None, cpu_count: Optional[int] = None):
+    """
+    (processes, n_jobs per model) so that processes * n_jobs <= cores. An explicit
+    max_workers is honoured even above the core count.
+    """
+    cpus = cpu_count or os.cpu_count() or 1
+    processes = max(1, min(n_models, max_workers or cpus))
+    return processes, max(1, cpus // processes)
+
+
+def read_watermark() -> Dict:
+    """Call before extracting: every GameResult up to this id is in the extracted data."""
+    from django.db.models import Max
+
+    from accounts.models import GameResult
+
+    return {'max_result_id': GameResult.objects.aggregate(max_id=Max('id'))['max_id'] or 0}
+
+
+def _init_worker():
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def train_partition(
+    df: pd.DataFrame,
+    game_type: Optional[str],
+    model_type: str,
+    window_size: int,
+    test_size: float,
+    model_dir: str,
+    n_jobs: Optional[int] = None,
+    watermark: Optional[Dict] = None,
+    extract_seconds: float = 0.0,
+) -> TrainingOutcome:
+    """Train and save one model from its partition. Runs in a pool worker; never touches the database."""
+    started = time.perf_counter()
+    try:
+        if df.empty:
+            raise InsufficientDataError('Insufficient data: no game results found')
+        with model_training_lock(model_dir, model_type, game_type) as acquired:
+            if not acquired:
+                return TrainingOutcome(game_type, 0.0, error=TRAINING_IN_PROGRESS)
+            predictor = ProgressPredictor(model_type=model_type, model_dir=model_dir, window_size=window_size)
+            if n_jobs is not None and model_type == 'xgboost':
+                predictor.model.set_params(n_jobs=n_jobs)
+            metrics = predictor.train_on_data(df, test_size=test_size, watermark=watermark, game_type=game_type)
+            # Baseline that incremental runs compare themselves against.
+            predictor.training_watermark['rebuild'] = {
+                'rows': int(len(df)),
+                'extract_seconds': extract_seconds,
+                'train_seconds': time.perf_counter() - started,
+            }
+            model_path = predictor.save(game_type=game_type)
+    except ValueError as e:
+        return TrainingOutcome(game_type, time.perf_counter() - started, error=str(e))
+    except Exception as e:
+        logger.error(f"Unexpected training error for game_type={game_type}: {str(e)}", exc_info=True)
+        return TrainingOutcome(game_type, time.perf_counter() - started, error=f'{type(e).__name__}: {e}')
+    return TrainingOutcome(
+        game_type,
+        time.perf_counter() - started,
+        metrics={key: float(value) for key, value in metrics.items()},
+        model_path=str(model_path),
+        extract_seconds=extract_seconds,
+        rows=int(len(df)),
+    )
+
+
+def update_partition(
+    game_type: Optional[str],
+    model_type: str = 'xgboost',
+    window_size: int = 3,
+    test_size: float = 0.2,
+    model_dir: str = 'ml_models',
+    rounds: int = 50,
+    min_entries: int = 5,
+) -> Optional[TrainingOutcome]:
+    """
+    Warm-start the saved model for `game_type` with the results recorded after its
+    watermark, and save it; user/game pairs with fewer than `min_entries` results
+    are skipped as in a rebuild. None when there is no saved XGBoost bundle with a
+    watermark to continue from; the caller should run a full rebuild instead.
+    """
+    if model_type != 'xgboost':
+        return None
+    with model_training_lock(model_dir, model_type, game_type) as acquired:
+        if not acquired:
+            return TrainingOutcome(game_type, 0.0, error=TRAINING_IN_PROGRESS, mode='incremental')
+        return _update_partition(game_type, model_type, window_size, test_size, model_dir, rounds, min_entries)
+
+
+def _update_partition(
+    game_type, model_type, window_size, test_size, model_dir, rounds, min_entries,
+) -> Optional[TrainingOutcome]:
+    from accounts.models import GameResult
+
+    predictor = ProgressPredictor(model_type=model_type, model_dir=model_dir, window_size=window_size)
+    if not predictor.load(game_type=game_type):
+        return None
+    previous = dict(predictor.training_watermark)
+    after_id = previous.get('max_result_id')
+    if after_id is None:
+        return None
+
+    started = time.perf_counter()
+    watermark = read_watermark()
+    new_results = GameResult.objects.filter(id__gt=after_id, id__lte=watermark['max_result_id'])
+    if game_type is not None:
+        new_results = new_results.filter(game_type=game_type)
+    new_rows = new_results.count()
+    df = extract_game_data_since(
+        after_id, window_size, game_type=game_type, up_to_id=watermark['max_result_id'], min_entries=min_entries,
+    )
+    extract_seconds = time.perf_counter() - started
+    if df is None:
+        return TrainingOutcome(game_type, 0.0, mode='unchanged', extract_seconds=extract_seconds)
+
+    total_rows = previous.get('rows', 0) + new_rows
+    rebuild_estimate = None
+    rebuild = previous.get('rebuild')
+    if rebuild and rebuild.get('rows'):
+        rebuild_estimate = (rebuild['extract_seconds'] + rebuild['train_seconds']) * total_rows / rebuild['rows']
+
+    train_started = time.perf_counter()
+    try:
+        metrics = predictor.update_on_data(
+            df,
+            test_size=test_size,
+            watermark={**watermark, 'rows': total_rows},
+            rounds=rounds,
+        )
+        model_path = predictor.save(game_type=game_type)
+    except ValueError as e:
+        # Too few new samples yet; the watermark is unchanged, so they are used next time.
+        logger.info(f"Incremental update skipped for game_type={game_type}: {str(e)}")
+        return TrainingOutcome(
+            game_type, time.perf_counter() - train_started,
+            mode='unchanged', extract_seconds=extract_seconds, rows=len(df),
+        )
+    return TrainingOutcome(
+        game_type,
+        time.perf_counter() - train_started,
+        metrics={key: float(value) for key, value in metrics.items()},
+        model_path=str(model_path),
+        mode='incremental',
+        extract_seconds=extract_seconds,
+        rows=len(df),
+        rebuild_estimate_seconds=rebuild_estimate,
+    )
+
+
+def train_game_types(
+    game_types: Iterable[str],
+    model_type: str = 'xgboost',
+    window_size: int = 3,
+    min_entries: int = 5,
+    test_size: float = 0.2,
+    model_dir: str = 'ml_models',
+    max_workers: Optional[int] = None,
+) -> List[TrainingOutcome]:
+    """
+    Train one model per game type from a single extraction. Outcomes are returned in
+    `game_types` order; a game with too little data gets an outcome with `error` set.
+    """
+    game_types = list(game_types)
+    watermark = read_watermark()
+    started = time.perf_counter()
+    try:
+        corpus = extract_game_data(game_type=None, min_entries=min_entries)
+    except ValueError as e:
+        return [TrainingOutcome(gt, 0.0, error=str(e)) for gt in game_types]
+    extract_seconds = time.perf_counter() - started
+
+    partitions = {gt: part.reset_index(drop=True) for gt, part in corpus.groupby('game_type', sort=False)}
+    empty = corpus.iloc[0:0]
+    processes, n_jobs = plan_workers(len(game_types), max_workers)
+    logger.info(f"Training {len(game_types)} model(s) with {processes} process(es), n_jobs={n_jobs}")
+
+    def args_for(gt):
+        return (
+            partitions.get(gt, empty), gt, model_type, window_size, test_size, model_dir, n_jobs, watermark,
+            extract_seconds,
+        )
+
+    if processes == 1:
+        outcomes = {gt: train_partition(*args_for(gt)) for gt in game_types}
+    else:
+        from django.db import connections
+
+        # Forked workers must not share the parent's database sockets.
+        connections.close_all()
+        context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+        outcomes = {}
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=_init_worker) as pool:
+            futures = {pool.submit(train_partition, *args_for(gt)): gt for gt in game_types}
+            for future in as_completed(futures):
+                gt = futures[future]
+                try:
+                    outcomes[gt] = future.result()
+                except Exception as e:  # e.g. BrokenProcessPool
+                    logger.error(f"Training worker failed for game_type={gt}: {str(e)}")
+                    outcomes[gt] = TrainingOutcome(gt, 0.0, error=f'{type(e).__name__}: {e}')
+    return [outcomes[gt] for gt in game_types]
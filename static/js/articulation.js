@@ -106,6 +106,24 @@ document.addEventListener('DOMContentLoaded', () => {
     async function sendResult({ score, rawScore, maxScore, ratingStars, durationSeconds, failedAttempts, hesitationTime, sessionMaxStreak, successfulAttempts }) {
         const csrfToken = getCookie('csrftoken') || document.querySelector('[name=csrfmiddlewaretoken]')?.value;
         if (!csrfToken) return;
+        const payload = {
+            game_type: 'articulation',
+            score,
+            raw_score: rawScore,
+            max_score: maxScore,
+            duration_seconds: durationSeconds,
+            failed_attempts: failedAttempts,
+            hesitation_time: hesitationTime,
+            max_streak: sessionMaxStreak,
+            details: {
+                card_id: current?.id,
+                card_title: current?.title,
+                rating_stars: ratingStars,
+                successful_attempts: successfulAttempts,
+            },
+        };
+        // Same key and play time for this send and any offline replay of it.
+        window.IncludoResultQueue?.prepare(payload);
         try {
             await fetch('/api/game-results/', {
                 method: 'POST',
@@ -114,25 +132,11 @@ document.addEventListener('DOMContentLoaded', () => {
                     'X-CSRFToken': csrfToken,
                 },
                 credentials: 'same-origin',
-                body: JSON.stringify({
-                    game_type: 'articulation',
-                    score,
-                    raw_score: rawScore,
-                    max_score: maxScore,
-                    duration_seconds: durationSeconds,
-                    failed_attempts: failedAttempts,
-                    hesitation_time: hesitationTime,
-                    max_streak: sessionMaxStreak,
-                    details: {
-                        card_id: current?.id,
-                        card_title: current?.title,
-                        rating_stars: ratingStars,
-                        successful_attempts: successfulAttempts,
-                    },
-                }),
+                body: JSON.stringify(payload),
             });
         } catch (_e) {
-            /* ignore */
+            // Offline: keep the result and replay it via the batch endpoint later.
+            window.IncludoResultQueue?.enqueue(payload);
         }
     }
 
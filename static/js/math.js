@@ -49,6 +49,8 @@
     }
 
     async function postResult(payload) {
+        // Same key and play time for this send and any offline replay of it.
+        window.IncludoResultQueue?.prepare(payload);
         try {
             const csrf = getCookie('csrftoken');
             const res = await fetch('/api/game-results/', {
@@ -62,6 +64,8 @@
             });
             return res.ok;
         } catch (_e) {
+            // Offline: keep the result and replay it via the batch endpoint later.
+            window.IncludoResultQueue?.enqueue(payload);
             return false;
         }
     }
@@ -0,0 +1,118 @@
+(function () {
+    // Game results that could not be sent (tablet offline) are kept in
+    // localStorage and replayed in one request to /api/game-results/batch/.
+    // prepare() gives a result its idempotency key and played_at before the
+    // first POST, so a replay of a result whose response was lost (or of a
+    // queued batch) is not stored, or awarded stars, twice, and keeps the
+    // time it was played.
+    var STORAGE_KEY = 'includo:pendingGameResults';
+    var BATCH_URL = '/api/game-results/batch/';
+    var MAX_BATCH = 100;
+    var flushing = false;
+
+    function getCookie(name) {
+        var value = '; ' + document.cookie;
+        var parts = value.split('; ' + name + '=');
+        if (parts.length === 2) return parts.pop().split(';').shift();
+        return null;
+    }
+
+    function newKey() {
+        if (window.crypto && typeof window.crypto.randomUUID === 'function') {
+            return window.crypto.randomUUID();
+        }
+        return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2, 12);
+    }
+
+    function readQueue() {
+        try {
+            var items = JSON.parse(localStorage.getItem(STORAGE_KEY) || '[]');
+            return Array.isArray(items) ? items : [];
+        } catch (_e) {
+            return [];
+        }
+    }
+
+    function writeQueue(items) {
+        try {
+            if (items.length) {
+                localStorage.setItem(STORAGE_KEY, JSON.stringify(items));
+            } else {
+                localStorage.removeItem(STORAGE_KEY);
+            }
+        } catch (_e) {
+            /* storage full or disabled */
+        }
+    }
+
+    function prepare(payload) {
+        if (!payload || typeof payload !== 'object') return payload;
+        if (!payload.idempotency_key) payload.idempotency_key = newKey();
+        if (!payload.played_at) payload.played_at = new Date().toISOString();
+        return payload;
+    }
+
+    function enqueue(payload) {
+        if (!payload || typeof payload !== 'object') return;
+        var item = prepare(Object.assign({}, payload));
+        var items = readQueue();
+        items.push(item);
+        writeQueue(items);
+    }
+
+    function flush() {
+        if (flushing || navigator.onLine === false) return;
+        var items = readQueue();
+        if (!items.length) return;
+
+        var csrf = getCookie('csrftoken') || (document.querySelector('[name=csrfmiddlewaretoken]') || {}).value;
+        if (!csrf) return;
+
+        var batch = items.slice(0, MAX_BATCH);
+        var more = false;
+        flushing = true;
+        fetch(BATCH_URL, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrf,
+            },
+            credentials: 'same-origin',
+            body: JSON.stringify({ results: batch }),
+        })
+            .then(function (res) {
+                if (!res.ok) return null;
+                return res.json();
+            })
+            .then(function (data) {
+                if (!data || !data.ok) return;
+                var done = {};
+                (data.accepted || []).concat(data.duplicates || []).forEach(function (key) {
+                    done[key] = true;
+                });
+                (data.rejected || []).forEach(function (r) {
+                    if (r.idempotency_key) done[r.idempotency_key] = true;
+                });
+                writeQueue(readQueue().filter(function (item) {
+                    return !done[item.idempotency_key];
+                }));
+                more = readQueue().length > 0;
+            })
+            .catch(function () {
+                /* still offline; retry on the next online event */
+            })
+            .finally(function () {
+                flushing = false;
+                if (more) flush();
+            });
+    }
+
+    window.IncludoResultQueue = { prepare: prepare, enqueue: enqueue, flush: flush };
+
+    window.addEventListener('online', flush);
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', flush);
+    } else {
+        flush();
+    }
+})();
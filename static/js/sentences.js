@@ -292,6 +292,8 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     async function postResult(payload) {
+        // Same key and play time for this send and any offline replay of it.
+        window.IncludoResultQueue?.prepare(payload);
         try {
             const csrf = getCookie('csrftoken') || document.querySelector('[name=csrfmiddlewaretoken]')?.value;
             const res = await fetch('/api/game-results/', {
@@ -305,6 +307,8 @@ document.addEventListener('DOMContentLoaded', () => {
             });
             return res.ok;
         } catch (_e) {
+            // Offline: keep the result and replay it via the batch endpoint later.
+            window.IncludoResultQueue?.enqueue(payload);
             return false;
         }
     }
@@ -164,6 +164,18 @@ document.addEventListener('DOMContentLoaded', () => {
     const sendResult = (scoreVal, durationMs) => {
         const csrfToken = getCookie('csrftoken') || document.querySelector('[name=csrfmiddlewaretoken]')?.value;
         if (!csrfToken) return;
+        const payload = {
+            game_type: 'sound',
+            score: scoreVal,
+            duration_seconds: Math.round(durationMs / 1000),
+            failed_attempts: failedAttempts,
+            hesitation_time: firstGuessAt && startTime
+                ? Math.max(0, Math.floor((firstGuessAt - startTime) / 1000))
+                : 0,
+            max_streak: maxStreak,
+        };
+        // Same key and play time for this send and any offline replay of it.
+        window.IncludoResultQueue?.prepare(payload);
         fetch('/api/game-results/', {
             method: 'POST',
             headers: {
@@ -171,18 +183,10 @@ document.addEventListener('DOMContentLoaded', () => {
                 'X-CSRFToken': csrfToken,
             },
             credentials: 'same-origin',
-            body: JSON.stringify({
-                game_type: 'sound',
-                score: scoreVal,
-                duration_seconds: Math.round(durationMs / 1000),
-                failed_attempts: failedAttempts,
-                hesitation_time: firstGuessAt && startTime
-                    ? Math.max(0, Math.floor((firstGuessAt - startTime) / 1000))
-                    : 0,
-                max_streak: maxStreak,
-            }),
+            body: JSON.stringify(payload),
         }).catch(() => {
-            /* ignore network errors for now */
+            // Offline: keep the result and replay it via the batch endpoint later.
+            window.IncludoResultQueue?.enqueue(payload);
         });
     };
 